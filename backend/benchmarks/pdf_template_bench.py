@@ -0,0 +1,91 @@
+"""Per-PDF render time for PDFGenerator at 10, 100 and 1000 line items.
+
+Run from the backend directory:
+
+    python benchmarks/pdf_template_bench.py [--runs 20]
+
+Rendering is measured in-process (render_invoice_pdf), without the worker pool
+or the PDF cache, so the numbers reflect the template layer alone.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from server import ClientInfo, Invoice, PDFGenerator, Project  # noqa: E402
+
+DESCRIPTIONS = [
+    "Supply and laying of M20 grade concrete for foundations including shuttering, curing and all incidental works as directed",
+    "Structural steel fabrication",
+    "Providing and fixing 12mm thick gypsum board false ceiling with GI framework, including cutouts for light fixtures and AC grilles",
+]
+
+def build_models(item_count: int):
+    items = []
+    for idx in range(item_count):
+        quantity = 1.5 + idx % 7
+        rate = 250.0 + (idx * 37) % 900
+        amount = quantity * rate
+        items.append({
+            "boq_item_id": f"item-{idx}",
+            "serial_number": str(idx + 1),
+            "description": DESCRIPTIONS[idx % len(DESCRIPTIONS)],
+            "unit": "cum",
+            "quantity": quantity,
+            "rate": rate,
+            "amount": amount,
+            "gst_rate": 18.0,
+            "gst_amount": amount * 0.18,
+            "total_with_gst": amount * 1.18
+        })
+    subtotal = sum(item["amount"] for item in items)
+    invoice = Invoice(
+        invoice_number="INV-2025-0001",
+        ra_number="RA1",
+        project_id="bench-project",
+        project_name="Benchmark Plant Expansion",
+        client_id="bench-client",
+        client_name="Benchmark Industries Pvt Ltd",
+        invoice_type="tax_invoice",
+        items=items,
+        subtotal=subtotal,
+        total_gst_amount=subtotal * 0.18,
+        total_amount=subtotal * 1.18,
+        invoice_date=datetime(2025, 1, 15)
+    )
+    project = Project(project_name="Benchmark Plant Expansion", architect="Benchmark Architects", client_name="Benchmark Industries Pvt Ltd")
+    client = ClientInfo(name="Benchmark Industries Pvt Ltd", bill_to_address="Plot 12, Industrial Area, Bengaluru, Karnataka", gst_no="29ABCDE1234F1Z5")
+    return invoice, project, client
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="renders per size (fewer are used for 1000 items)")
+    args = parser.parse_args()
+
+    generator = PDFGenerator()
+    # Warm-up so one-time setup (fonts, compiled template) is not counted
+    generator.render_invoice_pdf(*build_models(1))
+
+    print(f"{'items':>6} {'runs':>5} {'median ms':>10} {'p95 ms':>8} {'size KB':>8}")
+    for item_count in (10, 100, 1000):
+        models = build_models(item_count)
+        runs = max(3, args.runs // 4) if item_count >= 1000 else args.runs
+        timings = []
+        size = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            size = len(generator.render_invoice_pdf(*models))
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{item_count:>6} {runs:>5} {statistics.median(timings):>10.1f} {p95:>8.1f} {size / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,34 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks, Query, Request
 from fastapi.responses import StreamingResponse, JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError, ExecutionTimeout
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 import os
 import logging
 import uuid
 import io
+import asyncio
+import signal
+import tempfile
+import time
+import random
+import base64
+import json
+import difflib
+import copy
+import hashlib
+import heapq
+from collections import Counter, OrderedDict, deque
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import openpyxl
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import re
 from pathlib import Path
@@ -23,6 +40,7 @@ from reportlab.lib.units import mm
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
 from io import BytesIO
+from xml.sax.saxutils import escape as xml_escape
 from enum import Enum
 import bcrypt
 import jwt
@@ -64,8 +82,142 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Shared worker pool for CPU-bound work (reportlab, openpyxl, pdf engines, bcrypt)
+WORKER_THREAD_POOL_SIZE = int(os.environ.get("WORKER_THREAD_POOL_SIZE", "8"))
+WORKER_PROCESS_POOL_SIZE = int(os.environ.get("WORKER_PROCESS_POOL_SIZE", str(max(2, os.cpu_count() or 2))))
+WORKER_QUEUE_LIMIT = int(os.environ.get("WORKER_QUEUE_LIMIT", "64"))
+
+class WorkerPoolSaturated(HTTPException):
+    """Raised when a worker lane already has too many tasks waiting"""
+    def __init__(self, lane_name: str):
+        super().__init__(status_code=503, detail=f"Server is busy ({lane_name} workers saturated), please retry shortly")
+
+class WorkerLane:
+    """A bounded lane of the worker pool backed by a thread or process executor"""
+    
+    def __init__(self, name: str, executor_factory, size: int, queue_limit: int):
+        self.name = name
+        self.size = size
+        self.queue_limit = queue_limit
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._slots = asyncio.Semaphore(size)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+    
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self._executor_factory(max_workers=self.size)
+        return self._executor
+    
+    async def run(self, fn, *args, timeout: Optional[float] = None, share: Optional[asyncio.Semaphore] = None):
+        """Run fn(*args) on this lane, waiting for a free slot first; timeout covers execution only
+        
+        share, if given, caps how many lane slots one kind of work may hold; it is taken
+        before queueing and held until the job itself ends, like the lane slot.
+        """
+        if share is not None:
+            await share.acquire()
+        if self.queued >= self.queue_limit:
+            if share is not None:
+                share.release()
+            self.rejected += 1
+            raise WorkerPoolSaturated(self.name)
+        
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            if share is not None:
+                share.release()
+            raise
+        finally:
+            self.queued -= 1
+        
+        loop = asyncio.get_running_loop()
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            if share is not None:
+                share.release()
+            self.failed += 1
+            raise
+        
+        # The slot is freed when the executor job finishes, not when the caller stops
+        # waiting: a timed-out or cancelled job still occupies a worker until it ends
+        self.running += 1
+        job.add_done_callback(lambda _: self._release_from_executor(loop, share))
+        try:
+            future = asyncio.wrap_future(job)
+            result = await asyncio.wait_for(future, timeout) if timeout else await future
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+    
+    def _release_slot(self, share: Optional[asyncio.Semaphore] = None):
+        self.running -= 1
+        self._slots.release()
+        if share is not None:
+            share.release()
+    
+    def _release_from_executor(self, loop, share: Optional[asyncio.Semaphore] = None):
+        # Called from the executor's thread
+        try:
+            loop.call_soon_threadsafe(self._release_slot, share)
+        except RuntimeError:
+            pass  # loop already closed at shutdown
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "queue_limit": self.queue_limit,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "max_queued": self.max_queued
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+class WorkerPool:
+    """Shared pool with a thread lane (GIL-releasing work) and a process lane (pure-Python CPU work)"""
+    
+    def __init__(self, thread_size: int, process_size: int, queue_limit: int):
+        self.threads = WorkerLane("thread", ThreadPoolExecutor, thread_size, queue_limit)
+        self.processes = WorkerLane("process", ProcessPoolExecutor, process_size, queue_limit)
+    
+    async def run_in_thread(self, fn, *args, timeout: Optional[float] = None):
+        return await self.threads.run(fn, *args, timeout=timeout)
+    
+    async def run_in_process(self, fn, *args, timeout: Optional[float] = None, share: Optional[asyncio.Semaphore] = None):
+        # fn and args must be picklable: module-level functions or methods of picklable objects
+        return await self.processes.run(fn, *args, timeout=timeout, share=share)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"thread": self.threads.stats(), "process": self.processes.stats()}
+    
+    def shutdown(self):
+        self.threads.shutdown()
+        self.processes.shutdown()
+
+worker_pool = WorkerPool(WORKER_THREAD_POOL_SIZE, WORKER_PROCESS_POOL_SIZE, WORKER_QUEUE_LIMIT)
+
 # Health check endpoint
 @app.get("/")
 async def health_check():
@@ -97,15 +249,48 @@ class POExtractedData(BaseModel):
     extraction_method: Optional[str] = None
     confidence_score: Optional[float] = None
 
+# PO extraction engine settings
+PO_EXTRACTION_CONFIDENCE_THRESHOLD = float(os.environ.get("PO_EXTRACTION_CONFIDENCE_THRESHOLD", "0.8"))
+PO_EXTRACTION_ENGINE_TIMEOUT = float(os.environ.get("PO_EXTRACTION_ENGINE_TIMEOUT", "30"))
+# Extraction engines may hold at most this many process lane slots, so extraction
+# bursts leave room for interactive PDF rendering and BOQ parsing
+PO_EXTRACTION_MAX_ENGINES = int(os.environ.get("PO_EXTRACTION_MAX_ENGINES", str(max(1, WORKER_PROCESS_POOL_SIZE // 2))))
+po_extraction_engine_slots = asyncio.Semaphore(max(1, min(PO_EXTRACTION_MAX_ENGINES, WORKER_PROCESS_POOL_SIZE - 1)))
+
+class POExtractionTimeout(Exception):
+    """Raised inside a worker process when an extraction engine exceeds its time budget"""
+
+def _raise_po_extraction_timeout(signum, frame):
+    raise POExtractionTimeout("Extraction engine timed out")
+
+def _run_po_extraction_engine(method: str, file_content: bytes, filename: str, timeout: float) -> Optional[dict]:
+    """Run one extraction engine inside a worker process, interrupting it if it hangs"""
+    previous_handler = signal.signal(signal.SIGALRM, _raise_po_extraction_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = POPDFParser()._run_engine(method, file_content, filename)
+        return result.dict() if result else None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
 class POPDFParser:
     """Comprehensive PDF text extraction engine for Purchase Orders"""
     
-    def __init__(self):
+    def __init__(self, confidence_threshold: Optional[float] = None, engine_timeout: Optional[float] = None):
         self.supported_formats = ['.pdf', '.docx']
         self.extraction_methods = ['pdfplumber', 'pdfminer', 'pypdf2', 'tabula']
+        self.confidence_threshold = (
+            confidence_threshold if confidence_threshold is not None else PO_EXTRACTION_CONFIDENCE_THRESHOLD
+        )
+        self.engine_timeout = engine_timeout if engine_timeout is not None else PO_EXTRACTION_ENGINE_TIMEOUT
     
-    async def extract_from_file(self, file_content: bytes, original_filename: str) -> POExtractedData:
-        """Main method to extract data from uploaded file"""
+    async def extract_from_file(self, file_content: bytes, original_filename: str, on_engine_result=None) -> POExtractedData:
+        """Main method to extract data from uploaded file
+        
+        on_engine_result, if given, is awaited as on_engine_result(method, outcome, detail)
+        as each PDF engine finishes; outcome is completed, no_result, timeout or failed.
+        """
         file_extension = Path(original_filename).suffix.lower()
         
         if file_extension not in self.supported_formats:
@@ -113,9 +298,11 @@ class POPDFParser:
         
         try:
             if file_extension == '.pdf':
-                return await self._extract_from_pdf(file_content, original_filename)
+                return await self._extract_from_pdf(file_content, original_filename, on_engine_result)
             elif file_extension == '.docx':
                 return await self._extract_from_docx(file_content, original_filename)
+        except WorkerPoolSaturated:
+            raise
         except Exception as e:
             logger.error(f"Error extracting from {original_filename}: {str(e)}")
             return POExtractedData(
@@ -124,76 +311,117 @@ class POPDFParser:
                 confidence_score=0.0
             )
     
-    async def _extract_from_pdf(self, file_content: bytes, filename: str) -> POExtractedData:
-        """Extract data from PDF using multiple methods"""
-        pdf_file = BytesIO(file_content)
-        results = []
+    async def _extract_from_pdf(self, file_content: bytes, filename: str, on_engine_result=None) -> POExtractedData:
+        """Extract data from PDF by running all extraction engines in parallel worker processes"""
+        # Each engine enforces its own timeout inside the worker; the lane timeout is a backstop
+        pending = {}
+        for method in self.extraction_methods:
+            engine_run = worker_pool.run_in_process(
+                _run_po_extraction_engine, method, file_content, filename, self.engine_timeout,
+                timeout=self.engine_timeout + 5, share=po_extraction_engine_slots
+            )
+            pending[asyncio.ensure_future(engine_run)] = method
         
-        # Method 1: PDFPlumber (best for structured PDFs)
+        results = []
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                text_content = ""
-                tables = []
-                for page in pdf.pages:
-                    text_content += page.extract_text() or ""
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        tables.extend(page_tables)
+            while pending:
+                done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    method = pending.pop(task)
+                    try:
+                        result_data = task.result()
+                    except WorkerPoolSaturated:
+                        raise
+                    except (asyncio.TimeoutError, POExtractionTimeout):
+                        logger.warning(f"{method} timed out after {self.engine_timeout}s for {filename}")
+                        if on_engine_result:
+                            await on_engine_result(method, "timeout", None)
+                        continue
+                    except Exception as e:
+                        logger.warning(f"{method} failed for {filename}: {str(e)}")
+                        if on_engine_result:
+                            await on_engine_result(method, "failed", str(e))
+                        continue
+                    
+                    if result_data:
+                        results.append(POExtractedData(**result_data))
+                    if on_engine_result:
+                        await on_engine_result(method, "completed" if result_data else "no_result", result_data)
                 
-                result = self._parse_po_text(text_content, "pdfplumber")
-                result.line_items = self._extract_line_items_from_tables(tables)
-                results.append(result)
-        except Exception as e:
-            logger.warning(f"PDFPlumber failed for {filename}: {str(e)}")
-        
-        # Method 2: PDFMiner (good for complex layouts)
-        try:
-            pdf_file.seek(0)
-            text_content = pdfminer_extract_text(pdf_file, laparams=LAParams())
-            result = self._parse_po_text(text_content, "pdfminer")
-            results.append(result)
-        except Exception as e:
-            logger.warning(f"PDFMiner failed for {filename}: {str(e)}")
+                # Stop early once any engine is confident enough
+                if any((r.confidence_score or 0) >= self.confidence_threshold for r in results):
+                    break
+        finally:
+            # Engines still queued are dropped; running ones stop at their own timeout and
+            # keep their extraction slot until then, so a retry queues behind them
+            for task in pending:
+                task.cancel()
         
-        # Method 3: PyPDF2 (fallback)
-        try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+        # Return the best result
+        return self._select_best_result(results)
+    
+    def _run_engine(self, method: str, file_content: bytes, filename: str) -> Optional[POExtractedData]:
+        """Run a single extraction engine synchronously"""
+        engine = getattr(self, f"_extract_with_{method}", None)
+        if engine is None:
+            raise ValueError(f"Unknown extraction method: {method}")
+        return engine(file_content, filename)
+    
+    def _extract_with_pdfplumber(self, file_content: bytes, filename: str) -> Optional[POExtractedData]:
+        """PDFPlumber (best for structured PDFs)"""
+        with pdfplumber.open(BytesIO(file_content)) as pdf:
             text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text()
-            result = self._parse_po_text(text_content, "pypdf2")
-            results.append(result)
-        except Exception as e:
-            logger.warning(f"PyPDF2 failed for {filename}: {str(e)}")
+            tables = []
+            for page in pdf.pages:
+                text_content += page.extract_text() or ""
+                page_tables = page.extract_tables()
+                if page_tables:
+                    tables.extend(page_tables)
+            
+            result = self._parse_po_text(text_content, "pdfplumber")
+            result.line_items = self._extract_line_items_from_tables(tables)
+            return result
+    
+    def _extract_with_pdfminer(self, file_content: bytes, filename: str) -> Optional[POExtractedData]:
+        """PDFMiner (good for complex layouts)"""
+        text_content = pdfminer_extract_text(BytesIO(file_content), laparams=LAParams())
+        return self._parse_po_text(text_content, "pdfminer")
+    
+    def _extract_with_pypdf2(self, file_content: bytes, filename: str) -> Optional[POExtractedData]:
+        """PyPDF2 (fallback)"""
+        pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
+        text_content = ""
+        for page in pdf_reader.pages:
+            text_content += page.extract_text()
+        return self._parse_po_text(text_content, "pypdf2")
+    
+    def _extract_with_tabula(self, file_content: bytes, filename: str) -> Optional[POExtractedData]:
+        """Tabula (for table-heavy PDFs)"""
+        # Tabula needs a real file; engines run concurrently so use a unique temp path
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            temp_file.write(file_content)
+            temp_file_path = temp_file.name
         
-        # Method 4: Tabula (for table-heavy PDFs)
         try:
-            pdf_file.seek(0)
-            # Save to temporary file for tabula
-            temp_file_path = f"/tmp/{filename}"
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(file_content)
-            
             tables = tabula.read_pdf(temp_file_path, pages='all', multiple_tables=True)
-            if tables:
-                result = POExtractedData(
-                    line_items = self._extract_line_items_from_dataframes(tables),
-                    extraction_method="tabula",
-                    confidence_score=0.7
-                )
-                results.append(result)
-            
-            # Clean up temp file
+        finally:
             os.remove(temp_file_path)
-        except Exception as e:
-            logger.warning(f"Tabula failed for {filename}: {str(e)}")
         
-        # Return the best result
-        return self._select_best_result(results)
+        if not tables:
+            return None
+        
+        return POExtractedData(
+            line_items = self._extract_line_items_from_dataframes(tables),
+            extraction_method="tabula",
+            confidence_score=0.7
+        )
     
     async def _extract_from_docx(self, file_content: bytes, filename: str) -> POExtractedData:
         """Extract data from DOCX file"""
+        return await worker_pool.run_in_process(self._parse_docx, file_content, filename)
+    
+    def _parse_docx(self, file_content: bytes, filename: str) -> POExtractedData:
+        """Parse DOCX content synchronously (runs in a worker process)"""
         try:
             doc = docx.Document(BytesIO(file_content))
             text_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
@@ -871,8 +1099,91 @@ def determine_gst_type(client_address: str, company_state: str = "karnataka") ->
             "company_state": "Karnataka"
         }
 
+# BOQ parser settings
+BOQ_STREAMING_PARSE = os.environ.get("BOQ_STREAMING_PARSE", "true").lower() in ("1", "true", "yes")
+BOQ_TRACE_LEVEL = os.environ.get("BOQ_TRACE_LEVEL", "off")
+BOQ_TRACE_SAMPLE_RATE = float(os.environ.get("BOQ_TRACE_SAMPLE_RATE", "0.01"))
+
+class _TracePhase:
+    """Accumulates wall time for one parser phase; reusable across many enters"""
+    
+    __slots__ = ("_timings", "_name", "_started")
+    
+    def __init__(self, timings: Dict[str, float], name: str):
+        self._timings = timings
+        self._name = name
+        self._started = 0.0
+    
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._timings[self._name] = self._timings.get(self._name, 0.0) + time.perf_counter() - self._started
+        return False
+
+class ParserTrace:
+    """Per-upload BOQ parser tracing with levels, row sampling and a timing summary
+    
+    Levels: off < info (header/mapping decisions) < debug (every header probe)
+    < trace (per-cell row detail, sampled at sample_rate). Messages use logging's
+    lazy %-formatting and are only formatted when their level is enabled.
+    """
+    
+    LEVELS = {"off": 0, "info": 1, "debug": 2, "trace": 3}
+    
+    def __init__(self, label: str = "", level: str = "off", sample_rate: float = 0.0):
+        self.label = label
+        self.level_name = level.lower() if level.lower() in self.LEVELS else "off"
+        self.level = self.LEVELS[self.level_name]
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.rows_scanned = 0
+        self.rows_accepted = 0
+        self.header_row = None
+        self.phase_seconds: Dict[str, float] = {}
+        self._phases: Dict[str, _TracePhase] = {}
+        self._random = random.Random()
+    
+    def phase(self, name: str) -> _TracePhase:
+        timer = self._phases.get(name)
+        if timer is None:
+            timer = self._phases[name] = _TracePhase(self.phase_seconds, name)
+        return timer
+    
+    def _log(self, level: int, msg: str, *args):
+        if self.level >= level:
+            logger.info("BOQ trace [%s] " + msg, self.label, *args)
+    
+    def info(self, msg: str, *args):
+        self._log(1, msg, *args)
+    
+    def debug(self, msg: str, *args):
+        self._log(2, msg, *args)
+    
+    def sample_row(self) -> bool:
+        """Decide once per row whether its per-cell detail is traced"""
+        return self.level >= 3 and self._random.random() < self.sample_rate
+    
+    def row(self, msg: str, *args):
+        self._log(3, msg, *args)
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows_scanned": self.rows_scanned,
+            "rows_accepted": self.rows_accepted,
+            "header_row": self.header_row,
+            "phase_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phase_seconds.items()},
+            "trace_level": self.level_name,
+            "trace_sample_rate": self.sample_rate
+        }
+
 class ExcelParser:
-    def __init__(self):
+    def __init__(
+        self,
+        streaming: Optional[bool] = None,
+        trace_level: Optional[str] = None,
+        trace_sample_rate: Optional[float] = None
+    ):
         self.metadata_patterns = {
             'project_name': [r'project\s*name', r'project\s*:', r'job\s*name'],
             'architect': [r'architect', r'architect\s*name', r'architect\s*:'],
@@ -880,46 +1191,137 @@ class ExcelParser:
             'location': [r'location', r'site', r'address'],
             'date': [r'date', r'project\s*date']
         }
+        # Streaming mode reads the sheet once with read_only=True instead of random cell access
+        self.streaming = BOQ_STREAMING_PARSE if streaming is None else streaming
+        self.trace_level = trace_level or BOQ_TRACE_LEVEL
+        self.trace_sample_rate = BOQ_TRACE_SAMPLE_RATE if trace_sample_rate is None else trace_sample_rate
+        self.trace = ParserTrace()
     
     async def parse_excel_file(self, file_content: bytes, filename: str) -> Dict[str, Any]:
         try:
+            return await worker_pool.run_in_process(self._parse_workbook, file_content, filename)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error parsing Excel file {filename}: {e}")
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Error parsing Excel file: {str(e)}. Please ensure the file contains BOQ data in the expected format."
+            )
+    
+    def _parse_workbook(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        """Parse the workbook synchronously (runs in a worker process)"""
+        self.trace = ParserTrace(filename, self.trace_level, self.trace_sample_rate)
+        
+        if self.streaming:
+            return self._parse_workbook_streaming(file_content, filename)
+        
+        with self.trace.phase("load"):
             workbook = openpyxl.load_workbook(io.BytesIO(file_content), data_only=True)
+        with self.trace.phase("select_sheet"):
             worksheet = self._select_worksheet(workbook)
+        
+        if not worksheet:
+            raise ValueError("No valid worksheet found in the Excel file")
+        
+        # Extract metadata
+        with self.trace.phase("metadata"):
+            metadata = self._extract_metadata(worksheet)
+        
+        # Extract BOQ items
+        items = self._extract_boq_items(worksheet)
+        
+        return self._build_parse_result(metadata, items, filename)
+    
+    def _parse_workbook_streaming(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        """Single pass over a read-only sheet for metadata, header detection, column mapping and rows"""
+        trace = self.trace
+        with trace.phase("load"):
+            workbook = openpyxl.load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+        try:
+            with trace.phase("select_sheet"):
+                worksheet = self._select_worksheet(workbook)
             
             if not worksheet:
                 raise ValueError("No valid worksheet found in the Excel file")
             
-            # Extract metadata
-            metadata = self._extract_metadata(worksheet)
-            
-            # Extract BOQ items
-            items = self._extract_boq_items(worksheet)
+            metadata = {}
+            items = []
+            header_row = None
+            header_values = ()
+            column_mapping = None
+            # Rows after the header are held back until the unit fallback has seen its sample
+            pending_rows = []
+            rows_phase = trace.phase("rows")
             
-            if not items:
-                logger.warning(f"No BOQ items found in file {filename}")
-                # Still allow processing with empty items
-            
-            # Calculate totals with validation
-            total_value = 0.0
-            try:
-                total_value = sum(item['amount'] for item in items if item.get('amount'))
-            except (TypeError, ValueError) as e:
-                logger.warning(f"Error calculating total value: {e}")
-                total_value = 0.0
+            for row_idx, values in enumerate(worksheet.iter_rows(values_only=True), 1):
+                if row_idx <= 20:
+                    with trace.phase("metadata"):
+                        self._extract_metadata_from_values(values, metadata)
+                
+                if header_row is None:
+                    with trace.phase("header"):
+                        is_header = row_idx < 30 and self._is_header_row(row_idx, values)
+                    if is_header:
+                        header_row = row_idx
+                        header_values = values
+                    elif row_idx >= 29:
+                        trace.info("No suitable header row found, using fallback")
+                        break
+                    continue
+                
+                if column_mapping is None:
+                    pending_rows.append((row_idx, values))
+                    if len(pending_rows) < 5:
+                        continue
+                    column_mapping = self._map_streamed_header(worksheet, header_row, header_values, pending_rows, items)
+                    pending_rows = []
+                    continue
+                
+                with rows_phase:
+                    self._append_boq_item(items, self._row_data_from_values(row_idx, values, column_mapping))
             
-            return {
-                'metadata': metadata,
-                'items': items,
-                'total_value': total_value,
-                'filename': filename,
-                'items_count': len(items)
-            }
-        except Exception as e:
-            logger.error(f"Error parsing Excel file {filename}: {e}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Error parsing Excel file: {str(e)}. Please ensure the file contains BOQ data in the expected format."
+            # Sheet ended within the sample window after the header
+            if header_row is not None and column_mapping is None:
+                self._map_streamed_header(worksheet, header_row, header_values, pending_rows, items)
+        finally:
+            workbook.close()
+        
+        return self._build_parse_result(metadata, items, filename)
+    
+    def _map_streamed_header(self, worksheet, header_row: int, header_values, pending_rows: List, items: List[Dict]) -> Dict[str, int]:
+        """Finalise the column mapping from the buffered sample rows, then emit those rows"""
+        max_column = worksheet.max_column or len(header_values)
+        with self.trace.phase("mapping"):
+            column_mapping = self._map_header_values(
+                header_row, header_values, [values for _, values in pending_rows], max_column
             )
+        with self.trace.phase("rows"):
+            for row_idx, values in pending_rows:
+                self._append_boq_item(items, self._row_data_from_values(row_idx, values, column_mapping))
+        return column_mapping
+    
+    def _build_parse_result(self, metadata: Dict[str, Any], items: List[Dict], filename: str) -> Dict[str, Any]:
+        if not items:
+            logger.warning(f"No BOQ items found in file {filename}")
+            # Still allow processing with empty items
+        
+        # Calculate totals with validation
+        total_value = 0.0
+        try:
+            total_value = sum(item['amount'] for item in items if item.get('amount'))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Error calculating total value: {e}")
+            total_value = 0.0
+        
+        return {
+            'metadata': metadata,
+            'items': items,
+            'total_value': total_value,
+            'filename': filename,
+            'items_count': len(items),
+            'parse_summary': self.trace.summary()
+        }
     
     def _select_worksheet(self, workbook: openpyxl.Workbook):
         """Select the appropriate worksheet containing BOQ data"""
@@ -933,170 +1335,216 @@ class ExcelParser:
                     return workbook[sheet_name]
         
         # If no preferred name found, return the first non-empty sheet
+        # (read-only sheets without stored dimensions report None; treat them as non-empty)
         for sheet_name in workbook.sheetnames:
             worksheet = workbook[sheet_name]
-            if worksheet.max_row > 1 and worksheet.max_column > 1:
+            if (worksheet.max_row or 2) > 1 and (worksheet.max_column or 2) > 1:
                 return worksheet
         
         # Return active worksheet as last resort
         return workbook.active
     
+    @staticmethod
+    def _value_at(values, col_idx: int):
+        """1-based column lookup that tolerates short rows"""
+        if 0 < col_idx <= len(values):
+            return values[col_idx - 1]
+        return None
+    
     def _extract_metadata(self, worksheet) -> Dict[str, Any]:
         metadata = {}
         
-        # Search first 20 rows for metadata
+        # Search first 20 rows for metadata (one extra column for the adjacent value)
         for row_idx in range(1, min(21, worksheet.max_row + 1)):
-            for col_idx in range(1, min(10, worksheet.max_column + 1)):
-                cell = worksheet.cell(row=row_idx, column=col_idx)
-                if cell.value and isinstance(cell.value, str):
-                    self._extract_metadata_field(cell.value, worksheet, row_idx, col_idx, metadata)
+            values = [
+                worksheet.cell(row=row_idx, column=col_idx).value
+                for col_idx in range(1, min(11, worksheet.max_column + 1))
+            ]
+            self._extract_metadata_from_values(values, metadata)
         
         return metadata
     
-    def _extract_metadata_field(self, cell_value: str, worksheet, row_idx: int, col_idx: int, metadata: Dict):
+    def _extract_metadata_from_values(self, values, metadata: Dict):
+        for col_idx in range(1, min(10, len(values) + 1)):
+            cell_value = values[col_idx - 1]
+            if cell_value and isinstance(cell_value, str):
+                self._extract_metadata_field(cell_value, values, col_idx, metadata)
+    
+    def _extract_metadata_field(self, cell_value: str, values, col_idx: int, metadata: Dict):
         cell_lower = cell_value.lower().strip()
         
         for field, patterns in self.metadata_patterns.items():
             for pattern in patterns:
                 if re.search(pattern, cell_lower):
-                    value = self._find_adjacent_value(worksheet, row_idx, col_idx)
+                    value = self._find_adjacent_value(values, col_idx)
                     if value:
                         metadata[field] = value
                         break
     
-    def _find_adjacent_value(self, worksheet, row_idx: int, col_idx: int) -> Optional[str]:
+    def _find_adjacent_value(self, values, col_idx: int) -> Optional[str]:
         # Check same cell after colon/dash
-        current_cell = worksheet.cell(row=row_idx, column=col_idx)
-        if current_cell.value and (':' in str(current_cell.value) or '-' in str(current_cell.value)):
-            parts = re.split(r'[:\-]', str(current_cell.value), 1)
+        current_value = self._value_at(values, col_idx)
+        if current_value and (':' in str(current_value) or '-' in str(current_value)):
+            parts = re.split(r'[:\-]', str(current_value), 1)
             if len(parts) > 1 and parts[1].strip():
                 return parts[1].strip()
         
         # Check right cell
-        right_cell = worksheet.cell(row=row_idx, column=col_idx + 1)
-        if right_cell.value and str(right_cell.value).strip():
-            return str(right_cell.value).strip()
+        right_value = self._value_at(values, col_idx + 1)
+        if right_value and str(right_value).strip():
+            return str(right_value).strip()
         
         return None
     
     def _extract_boq_items(self, worksheet) -> List[Dict]:
         items = []
-        header_row = self._find_header_row(worksheet)
+        with self.trace.phase("header"):
+            header_row = self._find_header_row(worksheet)
         
         if not header_row:
             return items
         
-        column_mapping = self._map_columns(worksheet, header_row)
-        serial_number = 1
+        with self.trace.phase("mapping"):
+            column_mapping = self._map_columns(worksheet, header_row)
         
-        for row_idx in range(header_row + 1, worksheet.max_row + 1):
-            row_data = self._extract_row_data(worksheet, row_idx, column_mapping)
-            
-            if self._is_valid_item_row(row_data):
-                # Extract description using safe string conversion
-                description = self._safe_string_conversion(row_data.get('description'))
-                if len(description) < 3:  # Skip very short descriptions
-                    continue
-                
-                # Extract other fields with better handling
-                unit = "nos"  # default unit
-                unit_value = row_data.get('unit')
-                if unit_value and str(unit_value).strip():
-                    unit_text = str(unit_value).strip()
-                    # Handle common unit patterns
-                    if unit_text.lower() in ['cum', 'cu.m', 'cubic meter', 'cubicmeter']:
-                        unit = 'Cum'
-                    elif unit_text.lower() in ['sqm', 'sq.m', 'square meter', 'squaremeter']:
-                        unit = 'Sqm'
-                    elif unit_text.lower() in ['rmt', 'rm', 'running meter']:
-                        unit = 'Rmt'
-                    elif unit_text.lower() in ['nos', 'no', 'number', 'each']:
-                        unit = 'Nos'
-                    elif unit_text.lower() in ['kg', 'kilogram']:
-                        unit = 'Kg'
-                    elif unit_text.lower() in ['ton', 'tonne', 'mt']:
-                        unit = 'Ton'
-                    elif unit_text.lower() in ['ltr', 'litre', 'liter']:
-                        unit = 'Ltr'
-                    else:
-                        # If it's not a common numeric value, keep as is
-                        try:
-                            float_val = float(unit_text)
-                            # If it converts to float successfully and is a large number, it's probably wrong data
-                            if float_val > 100:
-                                unit = 'Nos'  # fallback
-                            else:
-                                unit = unit_text
-                        except ValueError:
-                            # If it can't be converted to float, it's likely the correct unit text
-                            unit = unit_text
-                
-                quantity = self._safe_float_conversion(row_data.get('quantity'))
-                if quantity == 0.0:
-                    quantity = 1.0  # default quantity
-                
-                rate = self._safe_float_conversion(row_data.get('rate'))
-                
-                amount = self._safe_float_conversion(row_data.get('amount'))
-                if amount == 0.0:
-                    amount = quantity * rate if rate > 0 else 0.0
-                
-                items.append({
-                    'serial_number': serial_number,
-                    'description': description,
-                    'unit': unit,
-                    'quantity': quantity,
-                    'rate': rate,
-                    'amount': amount,
-                    'gst_rate': 18.0  # Default GST rate
-                })
-                
-                serial_number += 1
+        with self.trace.phase("rows"):
+            for row_idx in range(header_row + 1, worksheet.max_row + 1):
+                row_data = self._extract_row_data(worksheet, row_idx, column_mapping)
+                self._append_boq_item(items, row_data)
         
         return items
     
-    def _find_header_row(self, worksheet) -> Optional[int]:
-        # Look for rows that contain typical BOQ headers
-        header_keywords = ['description', 'quantity', 'rate', 'amount', 'item', 'particular', 'unit', 'uom']
+    def _append_boq_item(self, items: List[Dict], row_data: Dict) -> bool:
+        """Normalise a mapped row into a BOQ item and append it; returns False for skipped rows"""
+        self.trace.rows_scanned += 1
+        if not self._is_valid_item_row(row_data):
+            return False
+        
+        # Extract description using safe string conversion
+        description = self._safe_string_conversion(row_data.get('description'))
+        if len(description) < 3:  # Skip very short descriptions
+            return False
         
+        # Extract other fields with better handling
+        unit = "nos"  # default unit
+        unit_value = row_data.get('unit')
+        if unit_value and str(unit_value).strip():
+            unit_text = str(unit_value).strip()
+            # Handle common unit patterns
+            if unit_text.lower() in ['cum', 'cu.m', 'cubic meter', 'cubicmeter']:
+                unit = 'Cum'
+            elif unit_text.lower() in ['sqm', 'sq.m', 'square meter', 'squaremeter']:
+                unit = 'Sqm'
+            elif unit_text.lower() in ['rmt', 'rm', 'running meter']:
+                unit = 'Rmt'
+            elif unit_text.lower() in ['nos', 'no', 'number', 'each']:
+                unit = 'Nos'
+            elif unit_text.lower() in ['kg', 'kilogram']:
+                unit = 'Kg'
+            elif unit_text.lower() in ['ton', 'tonne', 'mt']:
+                unit = 'Ton'
+            elif unit_text.lower() in ['ltr', 'litre', 'liter']:
+                unit = 'Ltr'
+            else:
+                # If it's not a common numeric value, keep as is
+                try:
+                    float_val = float(unit_text)
+                    # If it converts to float successfully and is a large number, it's probably wrong data
+                    if float_val > 100:
+                        unit = 'Nos'  # fallback
+                    else:
+                        unit = unit_text
+                except ValueError:
+                    # If it can't be converted to float, it's likely the correct unit text
+                    unit = unit_text
+        
+        quantity = self._safe_float_conversion(row_data.get('quantity'))
+        if quantity == 0.0:
+            quantity = 1.0  # default quantity
+        
+        rate = self._safe_float_conversion(row_data.get('rate'))
+        
+        amount = self._safe_float_conversion(row_data.get('amount'))
+        if amount == 0.0:
+            amount = quantity * rate if rate > 0 else 0.0
+        
+        items.append({
+            'serial_number': len(items) + 1,
+            'description': description,
+            'unit': unit,
+            'quantity': quantity,
+            'rate': rate,
+            'amount': amount,
+            'gst_rate': 18.0  # Default GST rate
+        })
+        self.trace.rows_accepted += 1
+        return True
+    
+    def _find_header_row(self, worksheet) -> Optional[int]:
         for row_idx in range(1, min(30, worksheet.max_row + 1)):
-            row_cells = []
-            for col in range(1, min(20, worksheet.max_column + 1)):
-                cell_value = worksheet.cell(row=row_idx, column=col).value
-                if cell_value:
-                    row_cells.append(str(cell_value).lower().strip())
-            
-            row_text = ' '.join(row_cells)
-            print(f"Checking row {row_idx}: {row_text[:100]}...")
-            
-            # Count matches and ensure we have essential columns
-            matches = sum(1 for keyword in header_keywords if keyword in row_text)
-            has_description = any(desc in row_text for desc in ['description', 'item', 'particular', 'work'])
-            has_quantity = any(qty in row_text for qty in ['quantity', 'qty'])
-            has_rate = any(rate in row_text for rate in ['rate', 'price'])
-            
-            print(f"Row {row_idx} matches: {matches}, has_desc: {has_description}, has_qty: {has_quantity}, has_rate: {has_rate}")
-            
-            if matches >= 3 and has_description and (has_quantity or has_rate):
-                print(f"Selected header row: {row_idx}")
+            values = [
+                worksheet.cell(row=row_idx, column=col).value
+                for col in range(1, min(20, worksheet.max_column + 1))
+            ]
+            if self._is_header_row(row_idx, values):
                 return row_idx
         
-        print("No suitable header row found, using fallback")
+        self.trace.info("No suitable header row found, using fallback")
         return None
     
+    def _is_header_row(self, row_idx: int, values) -> bool:
+        # Look for rows that contain typical BOQ headers
+        header_keywords = ['description', 'quantity', 'rate', 'amount', 'item', 'particular', 'unit', 'uom']
+        
+        row_cells = []
+        for cell_value in values[:19]:
+            if cell_value:
+                row_cells.append(str(cell_value).lower().strip())
+        
+        row_text = ' '.join(row_cells)
+        self.trace.debug("Checking row %s: %.100s...", row_idx, row_text)
+        
+        # Count matches and ensure we have essential columns
+        matches = sum(1 for keyword in header_keywords if keyword in row_text)
+        has_description = any(desc in row_text for desc in ['description', 'item', 'particular', 'work'])
+        has_quantity = any(qty in row_text for qty in ['quantity', 'qty'])
+        has_rate = any(rate in row_text for rate in ['rate', 'price'])
+        
+        self.trace.debug(
+            "Row %s matches: %s, has_desc: %s, has_qty: %s, has_rate: %s",
+            row_idx, matches, has_description, has_quantity, has_rate
+        )
+        
+        if matches >= 3 and has_description and (has_quantity or has_rate):
+            self.trace.info("Selected header row: %s", row_idx)
+            self.trace.header_row = row_idx
+            return True
+        return False
+    
     def _map_columns(self, worksheet, header_row: int) -> Dict[str, int]:
+        header_values = [
+            worksheet.cell(row=header_row, column=col_idx).value
+            for col_idx in range(1, worksheet.max_column + 1)
+        ]
+        # The unit fallback samples up to five rows below the header
+        sample_rows = [
+            [worksheet.cell(row=row, column=col_idx).value for col_idx in range(1, min(7, worksheet.max_column + 1))]
+            for row in range(header_row + 1, min(header_row + 6, worksheet.max_row + 1))
+        ]
+        return self._map_header_values(header_row, header_values, sample_rows, worksheet.max_column)
+    
+    def _map_header_values(self, header_row: int, header_values, sample_rows: List, max_column: int) -> Dict[str, int]:
         column_mapping = {}
         
-        print(f"Mapping columns from header row {header_row}")
+        self.trace.debug("Mapping columns from header row %s", header_row)
         
         # First pass: collect all headers and their positions
         headers = []
-        for col_idx in range(1, worksheet.max_column + 1):
-            cell_value = worksheet.cell(row=header_row, column=col_idx).value
+        for col_idx, cell_value in enumerate(header_values, 1):
             if cell_value:
                 cell_lower = str(cell_value).lower().strip()
                 headers.append((col_idx, cell_lower, str(cell_value)))
-                print(f"Column {col_idx}: '{cell_value}' -> '{cell_lower}'")
+                self.trace.debug("Column %s: '%s' -> '%s'", col_idx, cell_value, cell_lower)
         
         # Second pass: map columns with priority and exclusions
         for col_idx, cell_lower, original_value in headers:
@@ -1104,72 +1552,78 @@ class ExcelParser:
             # Serial Number - must be first
             if col_idx <= 2 and any(h in cell_lower for h in ['s.no', 'sr.no', 'serial', 'sl', 'sno']):
                 column_mapping['serial'] = col_idx
-                print(f"Serial column mapped to {col_idx}")
+                self.trace.debug("Serial column mapped to %s", col_idx)
                 
             # Description - usually first text column after serial
             elif any(h in cell_lower for h in ['description', 'item', 'particular', 'work', 'scope']) and 'unit' not in cell_lower and 'rate' not in cell_lower:
                 column_mapping['description'] = col_idx
-                print(f"Description column mapped to {col_idx}")
+                self.trace.debug("Description column mapped to %s", col_idx)
                 
             # Unit - specific keywords, exclude rate-related terms
             elif any(h in cell_lower for h in ['unit', 'uom', 'u.o.m']) and 'rate' not in cell_lower and 'price' not in cell_lower and 'amount' not in cell_lower:
                 column_mapping['unit'] = col_idx
-                print(f"Unit column mapped to {col_idx}")
+                self.trace.debug("Unit column mapped to %s", col_idx)
                 
             # Quantity - before rate column
             elif any(h in cell_lower for h in ['qty', 'quantity']) and 'rate' not in cell_lower and 'unit' not in cell_lower:
                 column_mapping['quantity'] = col_idx
-                print(f"Quantity column mapped to {col_idx}")
+                self.trace.debug("Quantity column mapped to %s", col_idx)
                 
             # Rate - must have rate/price but not be amount/total
             elif any(h in cell_lower for h in ['rate', 'price']) and 'amount' not in cell_lower and 'total' not in cell_lower:
                 if 'unit' in cell_lower:
                     column_mapping['rate'] = col_idx
-                    print(f"Rate column mapped to {col_idx} (unit rate)")
+                    self.trace.debug("Rate column mapped to %s (unit rate)", col_idx)
                 elif not column_mapping.get('rate'):  # Only if rate not already mapped
                     column_mapping['rate'] = col_idx
-                    print(f"Rate column mapped to {col_idx}")
+                    self.trace.debug("Rate column mapped to %s", col_idx)
                     
             # Amount - must have amount/total but not be rate
             elif any(h in cell_lower for h in ['amount', 'total']) and 'rate' not in cell_lower and 'unit' not in cell_lower:
                 column_mapping['amount'] = col_idx
-                print(f"Amount column mapped to {col_idx}")
+                self.trace.debug("Amount column mapped to %s", col_idx)
         
         # Validation: ensure we have essential columns
         if not column_mapping.get('description'):
             # Fallback: find first text-heavy column
-            for col_idx in range(1, min(6, worksheet.max_column + 1)):
+            for col_idx in range(1, min(6, max_column + 1)):
                 if col_idx not in column_mapping.values():
                     column_mapping['description'] = col_idx
-                    print(f"Fallback: Description mapped to column {col_idx}")
+                    self.trace.debug("Fallback: Description mapped to column %s", col_idx)
                     break
                     
         if not column_mapping.get('unit'):
             # Look for column that typically has text values, not numbers
-            for col_idx in range(2, min(7, worksheet.max_column + 1)):
+            for col_idx in range(2, min(7, max_column + 1)):
                 if col_idx not in column_mapping.values():
                     # Check if this column has text values in the next few rows
                     text_count = 0
-                    for row in range(header_row + 1, min(header_row + 6, worksheet.max_row + 1)):
-                        cell_val = worksheet.cell(row=row, column=col_idx).value
+                    for row_values in sample_rows:
+                        cell_val = self._value_at(row_values, col_idx)
                         if cell_val and isinstance(cell_val, str) and not cell_val.replace('.', '').isdigit():
                             text_count += 1
                     if text_count > 0:
                         column_mapping['unit'] = col_idx
-                        print(f"Fallback: Unit mapped to column {col_idx} based on text content")
+                        self.trace.debug("Fallback: Unit mapped to column %s based on text content", col_idx)
                         break
         
-        print(f"Final column mapping: {column_mapping}")
+        self.trace.info("Final column mapping: %s", column_mapping)
         return column_mapping
     
     def _extract_row_data(self, worksheet, row_idx: int, column_mapping: Dict[str, int]) -> Dict:
+        last_col = max(column_mapping.values(), default=0)
+        values = [worksheet.cell(row=row_idx, column=col_idx).value for col_idx in range(1, last_col + 1)]
+        return self._row_data_from_values(row_idx, values, column_mapping)
+    
+    def _row_data_from_values(self, row_idx: int, values, column_mapping: Dict[str, int]) -> Dict:
         row_data = {}
+        row_sampled = self.trace.sample_row()
         
         for field, col_idx in column_mapping.items():
-            cell = worksheet.cell(row=row_idx, column=col_idx)
-            cell_value = cell.value
+            cell_value = self._value_at(values, col_idx)
             
-            print(f"Row {row_idx}, Column {col_idx} ({field}): '{cell_value}' (type: {type(cell_value)})")
+            if row_sampled:
+                self.trace.row("Row %s, Column %s (%s): '%s' (type: %s)", row_idx, col_idx, field, cell_value, type(cell_value))
             
             # Special handling for different field types
             if field == 'unit':
@@ -1185,7 +1639,8 @@ class ExcelParser:
                     else:
                         # If it's purely numeric and doesn't look like a unit, set default
                         row_data[field] = 'Nos'
-                        print(f"Warning: Column {col_idx} has numeric value '{unit_str}' for unit, using default 'Nos'")
+                        if row_sampled:
+                            self.trace.row("Warning: Column %s has numeric value '%s' for unit, using default 'Nos'", col_idx, unit_str)
                 else:
                     row_data[field] = 'Nos'  # default unit
                     
@@ -1241,43 +1696,35 @@ class ExcelParser:
             return ""
         return str(value).strip()
 
-# PDF Generator Class
-class PDFGenerator:
+# Compiled invoice template
+class InvoicePDFTemplate:
+    """Styles, table styles, column layouts and static text for the invoice PDF
+    
+    Built once per process by get_invoice_pdf_template(); rendering an invoice then
+    only builds the flowables and rows that go into the document.
+    """
+    
+    company_color = colors.HexColor('#127285')
+    light_bg_color = colors.HexColor('#f8f9fa')
+    details_col_widths = [80, 200, 60, 120]
+    items_col_widths = [30, 240, 50, 50, 80, 90]  # Total: 540
+    items_header = ['S.No', 'Description', 'Unit', 'Qty', 'Rate (Rs)', 'Amount (Rs)']
+    
     def __init__(self):
-        self.page_size = A4
-        self.margin = 20 * mm
-        
-    async def generate_invoice_pdf(self, invoice: Invoice, project: Project, client: ClientInfo) -> BytesIO:
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=self.page_size,
-            rightMargin=self.margin,
-            leftMargin=self.margin,
-            topMargin=self.margin,
-            bottomMargin=self.margin
-        )
-        
-        # Build PDF content
-        elements = []
         styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
         
-        # Company brand color
-        company_color = colors.HexColor('#127285')
-        light_bg_color = colors.HexColor('#f8f9fa')
-        
-        # Add custom styles
-        title_style = ParagraphStyle(
+        self.title_style = ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=20,
-            textColor=company_color,
+            textColor=self.company_color,
             alignment=TA_CENTER,
             spaceAfter=12,
             fontName='Helvetica-Bold'
         )
         
-        subtitle_style = ParagraphStyle(
+        self.subtitle_style = ParagraphStyle(
             'CustomSubtitle',
             parent=styles['Normal'],
             fontSize=12,
@@ -1286,34 +1733,17 @@ class PDFGenerator:
             spaceAfter=20
         )
         
-        header_style = ParagraphStyle(
+        self.header_style = ParagraphStyle(
             'CustomHeader',
             parent=styles['Heading2'],
             fontSize=16,
-            textColor=company_color,
+            textColor=self.company_color,
             spaceAfter=10,
             fontName='Helvetica-Bold'
         )
         
-        # Company Header with Logo Space
-        elements.append(Paragraph("ACTIVUS INDUSTRIAL DESIGN & BUILD LLP", title_style))
-        elements.append(Paragraph("One Stop Solution for Industrial Projects", subtitle_style))
-        
-        # Invoice Title
-        invoice_type_display = "TAX INVOICE" if invoice.invoice_type.value == "tax_invoice" else "PROFORMA INVOICE"
-        elements.append(Paragraph(invoice_type_display, header_style))
-        elements.append(Spacer(1, 20))
-        
-        # Invoice Details Table
-        details_data = [
-            ['Invoice Number:', invoice.invoice_number, 'Date:', invoice.invoice_date.strftime('%d/%m/%Y')],
-            ['Project:', project.project_name, 'Client:', client.name],
-            ['Architect:', project.architect, '', '']
-        ]
-        
-        details_table = Table(details_data, colWidths=[80, 200, 60, 120])
-        details_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), light_bg_color),
+        self.details_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), self.light_bg_color),
             ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
@@ -1324,75 +1754,11 @@ class PDFGenerator:
             ('RIGHTPADDING', (0, 0), (-1, -1), 8),
             ('TOPPADDING', (0, 0), (-1, -1), 6),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        elements.append(details_table)
-        elements.append(Spacer(1, 20))
-        
-        # Bill To Section
-        elements.append(Paragraph("Bill To:", header_style))
-        bill_to_text = f"""
-        <b>{client.name}</b><br/>
-        {client.bill_to_address}<br/>
-        <b>GST No:</b> {client.gst_no if client.gst_no else 'Not Available'}
-        """
-        elements.append(Paragraph(bill_to_text, styles['Normal']))
-        elements.append(Spacer(1, 20))
-        
-        # Items Table with proper text wrapping
-        table_data = [
-            ['S.No', 'Description', 'Unit', 'Qty', 'Rate (Rs)', 'Amount (Rs)']
-        ]
-        
-        for idx, item in enumerate(invoice.items, 1):
-            # Format currency properly - use Rs instead of ₹ symbol
-            rate_formatted = f"Rs {item.rate:,.2f}"
-            amount_formatted = f"Rs {item.amount:,.2f}"
-            
-            # Wrap long descriptions
-            description_wrapped = item.description
-            if len(description_wrapped) > 60:
-                # Break into multiple lines for long descriptions
-                words = description_wrapped.split(' ')
-                lines = []
-                current_line = []
-                current_length = 0
-                
-                for word in words:
-                    if current_length + len(word) > 60:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                        else:
-                            lines.append(word)
-                            current_length = 0
-                    else:
-                        current_line.append(word)
-                        current_length += len(word) + 1
-                
-                if current_line:
-                    lines.append(' '.join(current_line))
-                
-                description_wrapped = '<br/>'.join(lines)
-            
-            table_data.append([
-                str(idx),
-                Paragraph(description_wrapped, styles['Normal']),
-                item.unit,
-                f"{item.quantity:,.1f}",
-                rate_formatted,
-                amount_formatted
-            ])
+        ])
         
-        # Create table with fixed column widths
-        col_widths = [30, 240, 50, 50, 80, 90]  # Total: 540
-        items_table = Table(table_data, colWidths=col_widths)
-        
-        # Enhanced table styling
-        items_table.setStyle(TableStyle([
+        self.items_table_style = TableStyle([
             # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), company_color),
+            ('BACKGROUND', (0, 0), (-1, 0), self.company_color),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
@@ -1420,33 +1786,9 @@ class PDFGenerator:
             # Special styling for description column
             ('LEFTPADDING', (1, 1), (1, -1), 6),
             ('RIGHTPADDING', (1, 1), (1, -1), 6),
-        ]))
-        
-        elements.append(items_table)
-        elements.append(Spacer(1, 20))
-        
-        # Determine GST breakdown
-        gst_info = invoice.gst_info if hasattr(invoice, 'gst_info') else {"gst_type": "IGST"}
+        ])
         
-        # Totals Table with proper GST display
-        if gst_info.get("gst_type") == "CGST+SGST":
-            totals_data = [
-                ['', '', '', '', 'Subtotal:', f"Rs {invoice.subtotal:,.2f}"],
-                ['', '', '', '', 'CGST (9%):', f"Rs {invoice.total_gst_amount/2:,.2f}"],
-                ['', '', '', '', 'SGST (9%):', f"Rs {invoice.total_gst_amount/2:,.2f}"],
-                ['', '', '', '', 'Total Amount:', f"Rs {invoice.total_amount:,.2f}"]
-            ]
-        else:
-            # IGST
-            gst_rate = 18  # Default, could be calculated from items
-            totals_data = [
-                ['', '', '', '', 'Subtotal:', f"Rs {invoice.subtotal:,.2f}"],
-                ['', '', '', '', f'IGST ({gst_rate}%):', f"Rs {invoice.total_gst_amount:,.2f}"],
-                ['', '', '', '', 'Total Amount:', f"Rs {invoice.total_amount:,.2f}"]
-            ]
-        
-        totals_table = Table(totals_data, colWidths=col_widths)
-        totals_table.setStyle(TableStyle([
+        self.totals_table_style = TableStyle([
             ('ALIGN', (4, 0), (-1, -1), 'RIGHT'),
             ('FONTNAME', (4, 0), (-1, -1), 'Helvetica-Bold'),
             ('FONTSIZE', (4, 0), (-1, -1), 11),
@@ -1458,44 +1800,161 @@ class PDFGenerator:
             ('RIGHTPADDING', (4, 0), (-1, -1), 8),
             ('TOPPADDING', (4, 0), (-1, -1), 8),
             ('BOTTOMPADDING', (4, 0), (-1, -1), 8),
-        ]))
-        
-        elements.append(totals_table)
-        elements.append(Spacer(1, 30))
-        
-        # Terms and Conditions
-        terms_text = """
+        ])
+    
+    # Paragraphs keep layout state once drawn, so each render builds fresh
+    # flowables from this text instead of sharing instances
+    TERMS_TEXT = """
         <b>Terms & Conditions:</b><br/>
         1. Payment to be made within 30 days from the date of invoice.<br/>
         2. All disputes subject to Bangalore jurisdiction.<br/>
         3. Goods once sold will not be taken back.<br/>
         """
-        elements.append(Paragraph(terms_text, styles['Normal']))
-        elements.append(Spacer(1, 20))
-        
-        # Footer
-        footer_text = """
+    
+    FOOTER_TEXT = """
         <para alignment="center">
         <b>Thank you for your business!</b><br/>
         <b>ACTIVUS INDUSTRIAL DESIGN & BUILD LLP</b><br/>
         For any queries, please contact us at info@activusdesign.com | +91-XXXXXXXXXX
         </para>
         """
-        elements.append(Paragraph(footer_text, styles['Normal']))
+    
+    def header_flowables(self, invoice_type: str) -> List:
+        title = "TAX INVOICE" if invoice_type == "tax_invoice" else "PROFORMA INVOICE"
+        return [
+            Paragraph("ACTIVUS INDUSTRIAL DESIGN & BUILD LLP", self.title_style),
+            Paragraph("One Stop Solution for Industrial Projects", self.subtitle_style),
+            Paragraph(title, self.header_style),
+            Spacer(1, 20)
+        ]
+    
+    def footer_flowables(self) -> List:
+        return [
+            Paragraph(self.TERMS_TEXT, self.normal_style),
+            Spacer(1, 20),
+            Paragraph(self.FOOTER_TEXT, self.normal_style)
+        ]
+
+_invoice_pdf_template: Optional[InvoicePDFTemplate] = None
+
+def get_invoice_pdf_template() -> InvoicePDFTemplate:
+    global _invoice_pdf_template
+    if _invoice_pdf_template is None:
+        _invoice_pdf_template = InvoicePDFTemplate()
+    return _invoice_pdf_template
+
+# PDF Generator Class
+class PDFGenerator:
+    def __init__(self):
+        self.page_size = A4
+        self.margin = 20 * mm
+        
+    async def generate_invoice_pdf(self, invoice: Invoice, project: Project, client: ClientInfo) -> BytesIO:
+        pdf_bytes = await worker_pool.run_in_process(self.render_invoice_pdf, invoice, project, client)
+        return BytesIO(pdf_bytes)
+    
+    def render_invoice_pdf(self, invoice: Invoice, project: Project, client: ClientInfo) -> bytes:
+        """Render the invoice PDF synchronously (runs in a worker process)"""
+        template = get_invoice_pdf_template()
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=self.page_size,
+            rightMargin=self.margin,
+            leftMargin=self.margin,
+            topMargin=self.margin,
+            bottomMargin=self.margin
+        )
+        
+        # Company Header and Invoice Title
+        elements = template.header_flowables(invoice.invoice_type.value)
+        
+        # Invoice Details Table
+        details_data = [
+            ['Invoice Number:', invoice.invoice_number, 'Date:', invoice.invoice_date.strftime('%d/%m/%Y')],
+            ['Project:', project.project_name, 'Client:', client.name],
+            ['Architect:', project.architect, '', '']
+        ]
+        details_table = Table(details_data, colWidths=template.details_col_widths)
+        details_table.setStyle(template.details_table_style)
+        elements.append(details_table)
+        elements.append(Spacer(1, 20))
+        
+        # Bill To Section
+        elements.append(Paragraph("Bill To:", template.header_style))
+        bill_to_text = f"""
+        <b>{xml_escape(client.name)}</b><br/>
+        {xml_escape(client.bill_to_address)}<br/>
+        <b>GST No:</b> {xml_escape(client.gst_no) if client.gst_no else 'Not Available'}
+        """
+        elements.append(Paragraph(bill_to_text, template.normal_style))
+        elements.append(Spacer(1, 20))
+        
+        # Items Table; Paragraph wraps descriptions to the column width
+        table_data = [template.items_header]
+        normal_style = template.normal_style
+        for idx, item in enumerate(invoice.items, 1):
+            table_data.append([
+                str(idx),
+                Paragraph(xml_escape(item.description), normal_style),
+                item.unit,
+                f"{item.quantity:,.1f}",
+                f"Rs {item.rate:,.2f}",
+                f"Rs {item.amount:,.2f}"
+            ])
+        
+        items_table = Table(table_data, colWidths=template.items_col_widths)
+        items_table.setStyle(template.items_table_style)
+        elements.append(items_table)
+        elements.append(Spacer(1, 20))
+        
+        # Determine GST breakdown
+        gst_info = invoice.gst_info if hasattr(invoice, 'gst_info') else {"gst_type": "IGST"}
+        
+        # Totals Table with proper GST display
+        if gst_info.get("gst_type") == "CGST+SGST":
+            totals_data = [
+                ['', '', '', '', 'Subtotal:', f"Rs {invoice.subtotal:,.2f}"],
+                ['', '', '', '', 'CGST (9%):', f"Rs {invoice.total_gst_amount/2:,.2f}"],
+                ['', '', '', '', 'SGST (9%):', f"Rs {invoice.total_gst_amount/2:,.2f}"],
+                ['', '', '', '', 'Total Amount:', f"Rs {invoice.total_amount:,.2f}"]
+            ]
+        else:
+            # IGST
+            gst_rate = 18  # Default, could be calculated from items
+            totals_data = [
+                ['', '', '', '', 'Subtotal:', f"Rs {invoice.subtotal:,.2f}"],
+                ['', '', '', '', f'IGST ({gst_rate}%):', f"Rs {invoice.total_gst_amount:,.2f}"],
+                ['', '', '', '', 'Total Amount:', f"Rs {invoice.total_amount:,.2f}"]
+            ]
+        
+        totals_table = Table(totals_data, colWidths=template.items_col_widths)
+        totals_table.setStyle(template.totals_table_style)
+        elements.append(totals_table)
+        elements.append(Spacer(1, 30))
+        
+        # Terms and Conditions, Footer
+        elements.extend(template.footer_flowables())
         
         # Build PDF
         doc.build(elements)
-        buffer.seek(0)
-        return buffer
+        return buffer.getvalue()
 
 # Authentication functions
-async def hash_password(password: str) -> str:
+def _hash_password_sync(password: str) -> str:
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
-async def verify_password(password: str, hashed: str) -> bool:
+def _verify_password_sync(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def hash_password(password: str) -> str:
+    # bcrypt releases the GIL, so the thread lane is enough
+    return await worker_pool.run_in_thread(_hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await worker_pool.run_in_thread(_verify_password_sync, password, hashed)
+
 async def create_token(user_id: str, email: str, role: str) -> str:
     payload = {
         'user_id': user_id,
@@ -1514,12 +1973,279 @@ async def verify_token(token: str) -> Dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# In-process TTL/LRU cache
+class TTLCache:
+    """Small LRU cache whose entries expire after ttl seconds; tracks hits and misses"""
+    
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+    
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Authenticated users, keyed by user id; invalidated by the user admin endpoints
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "1024"))
+user_cache = TTLCache("users", USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     payload = await verify_token(credentials.credentials)
-    user = await db.users.find_one({"id": payload["user_id"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    user = user_cache.get(payload["user_id"])
+    if user is None:
+        user = await db.users.find_one({"id": payload["user_id"]})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_cache.set(payload["user_id"], user)
+    # Handlers may mutate the returned document; never hand out the cached one
+    return copy.deepcopy(user)
+
+# Activity log writer
+ACTIVITY_LOG_QUEUE_SIZE = int(os.environ.get("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get("ACTIVITY_LOG_BATCH_SIZE", "200"))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get("ACTIVITY_LOG_FLUSH_INTERVAL", "1.0"))
+
+class ActivityLogWriter:
+    """Buffers activity log entries in a bounded queue and writes them with insert_many
+    
+    Requests only enqueue. A background task flushes when a batch fills or the
+    flush interval passes, and stop() drains whatever is left. When the queue is
+    full new entries are dropped and counted rather than slowing the request.
+    """
+    
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float):
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._drain())
+    
+    def enqueue(self, entry: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Activity log queue full; {self.dropped} entries dropped so far")
+            return False
+        self.enqueued += 1
+        return True
+    
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            await db.activity_logs.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} activity log entries: {str(e)}")
+        self.batches += 1
+    
+    def _take_available(self, batch: List[Dict[str, Any]]):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+    
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    self._take_available(batch)
+                    remaining = deadline - loop.time()
+                    if len(batch) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                pending, batch = batch, []
+                # Shielded so shutdown cannot abort an insert halfway
+                self._inflight = asyncio.ensure_future(self._write(pending))
+                await asyncio.shield(self._inflight)
+        except asyncio.CancelledError:
+            if batch:
+                await self._write(batch)
+            raise
+    
+    async def stop(self):
+        """Stop the drain task and flush everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None and not self._inflight.done():
+            await self._inflight
+        while self._queue is not None and not self._queue.empty():
+            batch = []
+            self._take_available(batch)
+            await self._write(batch)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches
+        }
+
+activity_log_writer = ActivityLogWriter(ACTIVITY_LOG_QUEUE_SIZE, ACTIVITY_LOG_BATCH_SIZE, ACTIVITY_LOG_FLUSH_INTERVAL)
+
+# Fire-and-forget jobs keep a reference here (so they are not garbage collected)
+# and report failures from a done-callback
+_background_tasks: set = set()
+
+def _log_background_result(label: str, task: asyncio.Task):
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(f"Background task {label} failed: {error!r}")
+
+def run_in_background(coro, label: str) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(lambda t: _log_background_result(label, t))
+    return task
+
+class PeriodicTask:
+    """Runs a coroutine function every interval seconds in the background; interval 0 disables it"""
+    
+    def __init__(self, name: str, interval: float, job):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._loop())
+    
+    async def run_once(self):
+        try:
+            self.last_result = await self.job()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Periodic task {self.name} failed: {str(e)}")
+        self.runs += 1
+        self.last_run_at = datetime.utcnow()
+        return self.last_result
+    
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_result": self.last_result,
+            "last_error": self.last_error
+        }
 
 async def log_activity(user_id: str, user_email: str, user_role: str, action: str, description: str, 
                       project_id: Optional[str] = None, invoice_id: Optional[str] = None):
@@ -1532,7 +2258,11 @@ async def log_activity(user_id: str, user_email: str, user_role: str, action: st
         project_id=project_id,
         invoice_id=invoice_id
     )
-    await db.activity_logs.insert_one(log_entry.dict())
+    if activity_log_writer.running:
+        activity_log_writer.enqueue(log_entry.dict())
+    else:
+        # Before startup / after shutdown there is no drain task to hand off to
+        await db.activity_logs.insert_one(log_entry.dict())
 
 # Initialize super admin
 async def init_super_admin():
@@ -1550,6 +2280,622 @@ async def init_super_admin():
         await db.users.insert_one(super_admin.dict())
         logger.info("Super admin created successfully")
 
+# MongoDB index registry
+# Every collection is keyed by the application-level "id"; the remaining entries
+# back the filters and sorts used by the handlers below. Index names are fixed
+# so drift can be detected by name.
+MONGO_INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "users": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+        {"name": "role", "keys": [("role", ASCENDING)]},
+    ],
+    "projects": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "client_id_created_at_id", "keys": [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "created_at_id", "keys": [("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "company_profile_id", "keys": [("company_profile_id", ASCENDING)]},
+    ],
+    "invoices": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "project_id_created_at_id", "keys": [("project_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "client_id_created_at_id", "keys": [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "status_created_at_id", "keys": [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "invoice_type_created_at_id", "keys": [("invoice_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "created_at_id", "keys": [("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"name": "search_tokens", "keys": [("search_tokens", ASCENDING)]},
+    ],
+    "clients": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "name", "keys": [("name", ASCENDING)]},
+        {"name": "created_at_id", "keys": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    ],
+    "activity_logs": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "timestamp", "keys": [("timestamp", DESCENDING)]},
+        {"name": "user_id_timestamp", "keys": [("user_id", ASCENDING), ("timestamp", DESCENDING)]},
+        {"name": "project_id_timestamp", "keys": [("project_id", ASCENDING), ("timestamp", DESCENDING)]},
+    ],
+    "master_items": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "category_description", "keys": [("category", ASCENDING), ("description", ASCENDING)]},
+        {"name": "description", "keys": [("description", ASCENDING)]},
+        {"name": "description_key_unit_unique", "keys": [("description_key", ASCENDING), ("unit", ASCENDING)], "unique": True,
+         "partialFilterExpression": {"description_key": {"$type": "string"}}},
+    ],
+    "bank_guarantees": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "project_id_created_at", "keys": [("project_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "status_created_at", "keys": [("status", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "status_validity_date", "keys": [("status", ASCENDING), ("validity_date", ASCENDING)]},
+        {"name": "created_at", "keys": [("created_at", DESCENDING)]},
+    ],
+    "pdf_extractions": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "processed_at", "keys": [("processed_at", DESCENDING)]},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+    ],
+    "company_profiles": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "created_at", "keys": [("created_at", DESCENDING)]},
+    ],
+    "workflow_configs": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "workflow_type_active_created_at", "keys": [("workflow_type", ASCENDING), ("active", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "system_configs": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "config_category", "keys": [("config_category", ASCENDING)]},
+    ],
+    "boq_billing_ledger": [
+        {"name": "project_id_boq_item_id_unique", "keys": [("project_id", ASCENDING), ("boq_item_id", ASCENDING)], "unique": True},
+    ],
+    "gst_rollups": [
+        {"name": "kind_month", "keys": [("kind", ASCENDING), ("month", ASCENDING)]},
+        {"name": "month", "keys": [("month", ASCENDING)]},
+    ],
+    "search_index": [
+        {"name": "entity_type_tokens", "keys": [("entity_type", ASCENDING), ("tokens", ASCENDING)]},
+        {"name": "entity_type_grams", "keys": [("entity_type", ASCENDING), ("grams", ASCENDING)]},
+        {"name": "indexed_at", "keys": [("indexed_at", ASCENDING)]},
+    ],
+}
+
+# Outcome of the last ensure_indexes() run, surfaced by /admin/system-health
+index_bootstrap_status: Dict[str, Any] = {"ran_at": None, "created": [], "errors": []}
+
+def _index_options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Index options that take part in drift comparison"""
+    options = {"unique": bool(spec.get("unique", False))}
+    if spec.get("partialFilterExpression"):
+        options["partialFilterExpression"] = spec["partialFilterExpression"]
+    return options
+
+async def ensure_indexes() -> Dict[str, Any]:
+    """Create any registry index that is missing; existing indexes are never dropped"""
+    created = []
+    errors = []
+    for collection_name, specs in MONGO_INDEXES.items():
+        try:
+            existing = await db[collection_name].index_information()
+        except Exception as e:
+            errors.append({"collection": collection_name, "error": str(e)})
+            continue
+        
+        for spec in specs:
+            if spec["name"] in existing:
+                continue
+            try:
+                await db[collection_name].create_indexes([
+                    IndexModel(spec["keys"], name=spec["name"], **_index_options(spec))
+                ])
+                created.append(f"{collection_name}.{spec['name']}")
+            except Exception as e:
+                # e.g. duplicate values blocking a unique index; reported as drift
+                logger.error(f"Failed to create index {collection_name}.{spec['name']}: {str(e)}")
+                errors.append({"collection": collection_name, "index": spec["name"], "error": str(e)})
+    
+    index_bootstrap_status.update({"ran_at": datetime.utcnow(), "created": created, "errors": errors})
+    if created:
+        logger.info(f"Created {len(created)} MongoDB indexes: {', '.join(created)}")
+    return index_bootstrap_status
+
+async def get_index_drift() -> Dict[str, Any]:
+    """Compare live indexes with the registry: missing, mismatched and unregistered extras"""
+    drift = {"in_sync": True, "missing": [], "mismatched": [], "extra": [], "errors": []}
+    for collection_name, specs in MONGO_INDEXES.items():
+        try:
+            existing = await db[collection_name].index_information()
+        except Exception as e:
+            drift["errors"].append({"collection": collection_name, "error": str(e)})
+            continue
+        
+        expected_names = set()
+        for spec in specs:
+            expected_names.add(spec["name"])
+            live = existing.get(spec["name"])
+            if live is None:
+                drift["missing"].append(f"{collection_name}.{spec['name']}")
+                continue
+            
+            live_keys = [(field, direction) for field, direction in live.get("key", [])]
+            live_options = {"unique": bool(live.get("unique", False))}
+            if live.get("partialFilterExpression"):
+                live_options["partialFilterExpression"] = live["partialFilterExpression"]
+            if live_keys != list(spec["keys"]) or live_options != _index_options(spec):
+                drift["mismatched"].append({
+                    "index": f"{collection_name}.{spec['name']}",
+                    "expected": {"keys": spec["keys"], **_index_options(spec)},
+                    "actual": {"keys": live_keys, **live_options}
+                })
+        
+        for name in existing:
+            if name != "_id_" and name not in expected_names:
+                drift["extra"].append(f"{collection_name}.{name}")
+    
+    drift["in_sync"] = not (drift["missing"] or drift["mismatched"] or drift["errors"])
+    drift["last_bootstrap"] = index_bootstrap_status
+    return drift
+
+# Keyset pagination for list endpoints
+# Pages are ordered by (created_at desc, id desc); the cursor is an opaque token
+# holding the sort key of the last document returned.
+PAGE_SIZE_DEFAULT = 1000
+PAGE_SIZE_MAX = 1000
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+def _encode_cursor(payload: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+def encode_page_cursor(doc: Dict[str, Any]) -> str:
+    created_at = doc.get("created_at")
+    return _encode_cursor({
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else None,
+        "i": doc.get("id")
+    })
+
+def decode_page_cursor(cursor: str) -> tuple:
+    try:
+        payload = _decode_cursor(cursor)
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("c") else None
+        return created_at, payload["i"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    """Ranked results (search) page by offset rather than by sort key"""
+    if not cursor:
+        return 0
+    try:
+        offset = int(_decode_cursor(cursor)["o"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return offset
+
+def keyset_after(cursor: Optional[str]) -> Dict[str, Any]:
+    """Filter matching documents that sort strictly after the cursor"""
+    if not cursor:
+        return {}
+    return keyset_after_key(*decode_page_cursor(cursor))
+
+def keyset_after_key(created_at: Optional[datetime], last_id: str) -> Dict[str, Any]:
+    """Filter matching documents that sort strictly after (created_at, id)"""
+    if created_at is None:
+        # Documents without created_at sort last; page through them by id
+        return {"created_at": None, "id": {"$lt": last_id}}
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": last_id}},
+        {"created_at": None}
+    ]}
+
+async def fetch_keyset_page(collection, query: Dict[str, Any], limit: int, cursor: Optional[str] = None, projection: Optional[Dict[str, Any]] = None) -> tuple:
+    """Return (documents, next_cursor) for one page; next_cursor is None on the last page"""
+    after = keyset_after(cursor)
+    if after:
+        query = {"$and": [query, after]} if query else after
+    
+    docs = await collection.find(query, projection).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_page_cursor(docs[-1])
+    return docs, next_cursor
+
+# Invoice search
+# Each invoice carries search_tokens: the lowercased alphanumeric words of its
+# searchable fields plus the compacted field value (so "INV2025" finds
+# "INV-2025-001"). Queries match every term as a token prefix through the
+# multikey index and rank by exact token hits, then recency. Ranking only ever
+# sees a bounded window: the newest matches with an exact token hit plus the
+# newest prefix matches, INVOICE_SEARCH_MAX_CANDIDATES of each at most. Once the
+# ranked window is exhausted, the remaining matches follow in recency order with
+# keyset paging, so broad queries still reach every match.
+INVOICE_SEARCH_FIELDS = ("project_name", "client_name", "invoice_number", "ra_number")
+INVOICE_SEARCH_MAX_CANDIDATES = int(os.environ.get("INVOICE_SEARCH_MAX_CANDIDATES", "1000"))
+SEARCH_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def search_terms(text: str) -> List[str]:
+    return SEARCH_TOKEN_PATTERN.findall((text or "").lower())
+
+def document_search_tokens(doc: Dict[str, Any], fields) -> List[str]:
+    tokens = set()
+    for field in fields:
+        words = search_terms(str(doc.get(field) or ""))
+        tokens.update(words)
+        if len(words) > 1:
+            tokens.add("".join(words))
+    return sorted(tokens)
+
+def invoice_search_tokens(invoice: Dict[str, Any]) -> List[str]:
+    return document_search_tokens(invoice, INVOICE_SEARCH_FIELDS)
+
+def _search_key(doc: Dict[str, Any]) -> Dict[str, Any]:
+    created_at = doc.get("created_at")
+    return {"c": created_at.isoformat() if isinstance(created_at, datetime) else None, "i": doc.get("id")}
+
+def _search_key_after(key: Dict[str, Any]) -> Dict[str, Any]:
+    return keyset_after_key(datetime.fromisoformat(key["c"]) if key.get("c") else None, key["i"])
+
+async def _search_window_edge(match: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Sort key of the oldest match inside the ranked window, or None when every match fits"""
+    edge = await db.invoices.find(match, {"_id": 0, "created_at": 1, "id": 1}).sort(KEYSET_SORT) \
+        .skip(INVOICE_SEARCH_MAX_CANDIDATES - 1).limit(2).to_list(2)
+    return _search_key(edge[0]) if len(edge) == 2 else None
+
+async def _search_tail_page(match: Dict[str, Any], terms: List[str], tail: Dict[str, Any], limit: int, projection: Optional[Dict[str, Any]]) -> tuple:
+    """Matches past the ranked window, newest first; returns (documents, next tail state)
+    
+    The window held every match down to the edge key "a", and the exact-hit matches
+    down to "x", so the tail is what sorts after "a" minus exact hits not after "x".
+    """
+    beyond_window = {"search_tokens": {"$nin": terms}}
+    if tail.get("x"):
+        beyond_window = {"$or": [beyond_window, _search_key_after(tail["x"])]}
+    query = {"$and": [match, _search_key_after(tail["a"]), beyond_window]}
+    docs = await db.invoices.find(query, projection if projection else {"search_tokens": 0}) \
+        .sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, {**tail, "a": _search_key(docs[-1])} if docs else tail
+    return docs, None
+
+async def search_invoices(query_filter: Dict[str, Any], search: str, limit: int, cursor: Optional[str] = None, projection: Optional[Dict[str, Any]] = None) -> tuple:
+    """Ranked invoice search; returns (documents, next_cursor) like fetch_keyset_page"""
+    terms = list(dict.fromkeys(search_terms(search)))
+    if not terms:
+        return [], None
+    
+    prefixes = [re.compile("^" + re.escape(term)) for term in terms]
+    match = {**query_filter, "search_tokens": {"$all": prefixes}}
+    exact_match = {**query_filter, "search_tokens": {"$all": prefixes, "$in": terms}}
+    
+    # Tail cursors carry the window edges; ranked cursors carry an offset
+    tail = None
+    if cursor:
+        try:
+            tail = _decode_cursor(cursor).get("t")
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if tail:
+        docs, tail = await _search_tail_page(match, terms, tail, limit, projection)
+        return docs, _encode_cursor({"t": tail}) if tail else None
+    
+    offset = decode_offset_cursor(cursor)
+    window = min(offset + limit + 1, INVOICE_SEARCH_MAX_CANDIDATES)
+    recency = {"$sort": {"created_at": -1, "id": -1}}
+    
+    pipeline = [
+        {"$match": exact_match},
+        recency,
+        {"$limit": window},
+        {"$unionWith": {"coll": "invoices", "pipeline": [{"$match": match}, recency, {"$limit": window}]}},
+        {"$group": {"_id": "$_id", "doc": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+        {"$addFields": {"_search_score": {"$size": {"$setIntersection": ["$search_tokens", terms]}}}},
+        {"$sort": {"_search_score": -1, "created_at": -1, "id": -1}},
+        {"$skip": offset},
+        {"$limit": limit + 1},
+        {"$project": projection if projection else {"search_tokens": 0, "_search_score": 0}}
+    ]
+    docs = await db.invoices.aggregate(pipeline, allowDiskUse=True).to_list(limit + 1)
+    
+    if len(docs) > limit:
+        return docs[:limit], _encode_cursor({"o": offset + limit})
+    
+    # Ranked window exhausted; continue with the matches it could not hold
+    edge = await _search_window_edge(match)
+    if edge is None:
+        return docs, None
+    tail = {"a": edge, "x": await _search_window_edge(exact_match)}
+    tail_docs, tail = await _search_tail_page(match, terms, tail, limit - len(docs), projection)
+    docs += tail_docs
+    next_cursor = _encode_cursor({"t": tail}) if tail else None
+    return docs, next_cursor
+
+async def backfill_invoice_search_tokens(batch_size: int = 500) -> int:
+    """Populate search_tokens on invoices written before the field existed"""
+    updated = 0
+    batch = []
+    projection = {field: 1 for field in INVOICE_SEARCH_FIELDS}
+    async for invoice in db.invoices.find({"search_tokens": {"$exists": False}}, projection):
+        batch.append(UpdateOne({"_id": invoice["_id"]}, {"$set": {"search_tokens": invoice_search_tokens(invoice)}}))
+        if len(batch) >= batch_size:
+            await db.invoices.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.invoices.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    if updated:
+        logger.info(f"Backfilled search tokens on {updated} invoices")
+    return updated
+
+# Global search index
+# search_index holds one entry per project, client and invoice: prefix tokens,
+# trigrams for typo tolerance and the payload returned by /search. Entries are
+# written alongside every create and can be rebuilt from the source collections.
+SEARCH_LATENCY_BUDGET_MS = int(os.environ.get("SEARCH_LATENCY_BUDGET_MS", "250"))
+SEARCH_FUZZY_CANDIDATES = int(os.environ.get("SEARCH_FUZZY_CANDIDATES", "200"))
+SEARCH_FUZZY_MIN_SIMILARITY = float(os.environ.get("SEARCH_FUZZY_MIN_SIMILARITY", "0.7"))
+SEARCH_PREFIX_CANDIDATES = int(os.environ.get("SEARCH_PREFIX_CANDIDATES", "200"))
+
+SEARCH_ENTITIES = {
+    "projects": {
+        "collection": "projects",
+        "fields": ("project_name", "client_name", "architect"),
+        "payload": lambda p: {
+            "id": p.get("id"),
+            "project_name": p.get("project_name"),
+            "client_name": p.get("client_name"),
+            "architect": p.get("architect"),
+            "total_value": p.get("total_project_value", 0),
+            "type": "project"
+        }
+    },
+    "clients": {
+        "collection": "clients",
+        "fields": ("name", "bill_to_address", "gst_no"),
+        "payload": lambda c: {
+            "id": c.get("id"),
+            "name": c.get("name"),
+            "bill_to_address": c.get("bill_to_address"),
+            "gst_no": c.get("gst_no"),
+            "type": "client"
+        }
+    },
+    "invoices": {
+        "collection": "invoices",
+        "fields": INVOICE_SEARCH_FIELDS,
+        "payload": lambda i: {
+            "id": i.get("id"),
+            "invoice_number": i.get("invoice_number"),
+            "ra_number": i.get("ra_number"),
+            "project_name": i.get("project_name"),
+            "client_name": i.get("client_name"),
+            "total_amount": i.get("total_amount", 0),
+            "status": i.get("status"),
+            "type": "invoice"
+        }
+    }
+}
+
+def search_trigrams(tokens: List[str]) -> List[str]:
+    grams = set()
+    for token in tokens:
+        if len(token) < 3:
+            continue
+        grams.update(token[i:i + 3] for i in range(len(token) - 2))
+    return sorted(grams)
+
+def build_search_entry(entity_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    entity = SEARCH_ENTITIES[entity_type]
+    tokens = document_search_tokens(doc, entity["fields"])
+    return {
+        "_id": f"{entity_type}:{doc.get('id')}",
+        "entity_type": entity_type,
+        "entity_id": doc.get("id"),
+        "tokens": tokens,
+        "grams": search_trigrams(tokens),
+        "payload": entity["payload"](doc),
+        "indexed_at": datetime.utcnow()
+    }
+
+async def index_search_entity(entity_type: str, doc: Dict[str, Any]):
+    """Upsert one search entry; failures are logged and never fail the write path"""
+    try:
+        entry = build_search_entry(entity_type, doc)
+        await db.search_index.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+    except Exception as e:
+        logger.error(f"Failed to index {entity_type} {doc.get('id')} for search: {str(e)}")
+
+async def rebuild_search_index(batch_size: int = 500) -> Dict[str, int]:
+    """Re-index every project, client and invoice and drop entries for missing documents"""
+    started_at = datetime.utcnow()
+    counts = {}
+    for entity_type, entity in SEARCH_ENTITIES.items():
+        batch = []
+        counts[entity_type] = 0
+        async for doc in db[entity["collection"]].find({}, {"_id": 0, "boq_items": 0, "items": 0}):
+            entry = build_search_entry(entity_type, doc)
+            batch.append(ReplaceOne({"_id": entry["_id"]}, entry, upsert=True))
+            if len(batch) >= batch_size:
+                await db.search_index.bulk_write(batch, ordered=False)
+                counts[entity_type] += len(batch)
+                batch = []
+        if batch:
+            await db.search_index.bulk_write(batch, ordered=False)
+            counts[entity_type] += len(batch)
+    
+    stale = await db.search_index.delete_many({"indexed_at": {"$lt": started_at}})
+    counts["removed"] = stale.deleted_count
+    logger.info(f"Rebuilt search index: {counts}")
+    return counts
+
+def _term_similarity(term: str, tokens: List[str]) -> float:
+    best = 0.0
+    for token in tokens:
+        for candidate in (token, token[:len(term)]):
+            ratio = difflib.SequenceMatcher(None, term, candidate).ratio()
+            if ratio > best:
+                best = ratio
+    return best
+
+def _remaining_ms(deadline: float) -> int:
+    return int((deadline - time.monotonic()) * 1000)
+
+async def _search_entity_type(entity_type: str, terms: List[str], limit: int, deadline: float) -> tuple:
+    """Prefix matches first, then typo-tolerant matches; returns (payloads, partial)"""
+    scored = []
+    seen = set()
+    try:
+        remaining = _remaining_ms(deadline)
+        if remaining <= 0:
+            return [], True
+        # Entries holding every term as a whole token share the top score, so they are
+        # read first; prefix matches are over-fetched and ranked to fill the rest
+        exact_query = {"entity_type": entity_type, "tokens": {"$all": terms}}
+        async for entry in db.search_index.find(exact_query, {"payload": 1}).limit(limit).max_time_ms(remaining):
+            scored.append((2.0 * len(terms), entry["payload"]))
+            seen.add(entry["_id"])
+        
+        if len(scored) < limit:
+            remaining = _remaining_ms(deadline)
+            if remaining <= 0:
+                return [payload for _, payload in scored], True
+            prefix_query = {
+                "entity_type": entity_type,
+                "tokens": {"$all": [re.compile("^" + re.escape(term)) for term in terms]},
+                "_id": {"$nin": list(seen)}
+            }
+            candidates = max(limit, SEARCH_PREFIX_CANDIDATES)
+            async for entry in db.search_index.find(prefix_query, {"tokens": 1, "payload": 1}).limit(candidates).max_time_ms(remaining):
+                token_set = set(entry["tokens"])
+                score = sum(2.0 if term in token_set else 1.0 for term in terms)
+                scored.append((score, entry["payload"]))
+                seen.add(entry["_id"])
+        
+        fuzzy_terms = [term for term in terms if len(term) >= 3]
+        if len(scored) < limit and fuzzy_terms:
+            remaining = _remaining_ms(deadline)
+            if remaining <= 0:
+                return [payload for _, payload in sorted(scored, key=lambda x: -x[0])][:limit], True
+            query_grams = search_trigrams(fuzzy_terms)
+            # Entries sharing the most trigrams are scored first, so a typo still finds
+            # its target when common trigrams match far more than the candidate limit
+            pipeline = [
+                {"$match": {"entity_type": entity_type, "grams": {"$in": query_grams}, "_id": {"$nin": list(seen)}}},
+                {"$project": {"tokens": 1, "payload": 1, "shared": {"$size": {"$setIntersection": ["$grams", query_grams]}}}},
+                {"$sort": {"shared": -1}},
+                {"$limit": SEARCH_FUZZY_CANDIDATES}
+            ]
+            async for entry in db.search_index.aggregate(pipeline, maxTimeMS=remaining):
+                similarities = [_term_similarity(term, entry["tokens"]) for term in terms]
+                if min(similarities) >= SEARCH_FUZZY_MIN_SIMILARITY:
+                    # Always ranks below an exact or prefix hit
+                    scored.append((sum(similarities) / len(terms), entry["payload"]))
+    except ExecutionTimeout:
+        return [payload for _, payload in sorted(scored, key=lambda x: -x[0])][:limit], True
+    
+    scored.sort(key=lambda x: -x[0])
+    return [payload for _, payload in scored[:limit]], False
+
+# Summary views for list endpoints
+# view=summary or fields=a,b,c switch a list endpoint to a Mongo projection so the
+# heavy arrays (boq_items, items) are never read from the database or serialized.
+PROJECT_SUMMARY_DEFAULTS = {
+    "id": None,
+    "project_name": "Untitled Project",
+    "architect": "Unknown Architect",
+    "client_id": "",
+    "client_name": "Unknown Client",
+    "location": None,
+    "metadata": {},
+    "total_project_value": 0.0,
+    "advance_received": 0.0,
+    "pending_payment": 0.0,
+    "created_by": None,
+    "created_at": None,
+    "updated_at": None
+}
+
+INVOICE_SUMMARY_DEFAULTS = {
+    "id": None,
+    "invoice_number": "",
+    "ra_number": "",
+    "project_id": "",
+    "project_name": "",
+    "client_id": "",
+    "client_name": "",
+    "invoice_type": "proforma",
+    "subtotal": 0.0,
+    "total_gst_amount": 0.0,
+    "total_amount": 0.0,
+    "is_partial": True,
+    "billing_percentage": None,
+    "cumulative_billed": None,
+    "status": "draft",
+    "created_by": None,
+    "reviewed_by": None,
+    "approved_by": None,
+    "invoice_date": None,
+    "due_date": None,
+    "created_at": None,
+    "updated_at": None
+}
+
+def resolve_summary_fields(view: Optional[str], fields: Optional[str], defaults: Dict[str, Any]) -> Optional[List[str]]:
+    """Fields to return for a summary listing, or None for the full documents"""
+    if view not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in defaults]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(defaults)}"
+            )
+        return list(dict.fromkeys(["id"] + requested))
+    
+    if view == "summary":
+        return list(defaults)
+    return None
+
+def summary_projection(summary_fields: List[str]) -> Dict[str, int]:
+    # created_at and id are always read so the keyset cursor can be built
+    projection = {field: 1 for field in summary_fields}
+    projection.update({"_id": 0, "id": 1, "created_at": 1})
+    if "total_gst_amount" in summary_fields:
+        projection["gst_amount"] = 1
+    return projection
+
+def summary_rows(docs: List[Dict[str, Any]], summary_fields: List[str], defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for doc in docs:
+        row = {}
+        for field in summary_fields:
+            value = doc.get(field, defaults[field])
+            if isinstance(defaults[field], float) and value is not None:
+                value = float(value)
+            row[field] = value
+        # Older invoices stored the tax total as gst_amount
+        if "total_gst_amount" in row and "total_gst_amount" not in doc:
+            row["total_gst_amount"] = float(doc.get("gst_amount", 0))
+        rows.append(row)
+    return rows
+
+def summary_response(rows: List[Dict[str, Any]], next_cursor: Optional[str] = None) -> JSONResponse:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(content=jsonable_encoder(rows), headers=headers)
+
 # API Routes
 @api_router.post("/auth/login")
 async def login(user_data: UserLogin):
@@ -1671,6 +3017,7 @@ async def update_user(
             {"id": user_id},
             {"$set": filtered_data}
         )
+        user_cache.invalidate(user_id)
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -1707,6 +3054,7 @@ async def deactivate_user(user_id: str, current_user: dict = Depends(get_current
             {"id": user_id},
             {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
         )
+        user_cache.invalidate(user_id)
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -1749,6 +3097,7 @@ async def reset_user_password(
             {"id": user_id},
             {"$set": {"password_hash": password_hash, "updated_at": datetime.utcnow()}}
         )
+        user_cache.invalidate(user_id)
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -1820,6 +3169,7 @@ async def upload_boq(
 @api_router.post("/clients", response_model=dict)
 async def create_client(client_data: ClientInfo, current_user: dict = Depends(get_current_user)):
     await db.clients.insert_one(client_data.dict())
+    await index_search_entity("clients", client_data.dict())
     
     await log_activity(
         current_user["id"], current_user["email"], current_user["role"],
@@ -1829,8 +3179,15 @@ async def create_client(client_data: ClientInfo, current_user: dict = Depends(ge
     return {"message": "Client created successfully", "client_id": client_data.id}
 
 @api_router.get("/clients", response_model=List[ClientInfo])
-async def get_clients(current_user: dict = Depends(get_current_user)):
-    clients = await db.clients.find().to_list(1000)
+async def get_clients(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None
+):
+    clients, next_cursor = await fetch_keyset_page(db.clients, {}, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [ClientInfo(**client) for client in clients]
 
 @api_router.post("/projects", response_model=dict)
@@ -1847,6 +3204,8 @@ async def create_project(project_data: Project, current_user: dict = Depends(get
         
         # Insert into database
         await db.projects.insert_one(project_data.dict())
+        await index_search_entity("projects", project_data.dict())
+        await apply_dashboard_delta(total_projects=1, advance_received=project_data.advance_received)
         
         # Log activity
         await log_activity(
@@ -1865,9 +3224,25 @@ async def create_project(project_data: Project, current_user: dict = Depends(get
         raise HTTPException(status_code=500, detail=f"Failed to create project: {str(e)}")
 
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects(current_user: dict = Depends(get_current_user)):
+async def get_projects(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    view: Optional[str] = None,
+    fields: Optional[str] = None
+):
     try:
-        projects = await db.projects.find().to_list(1000)
+        summary_fields = resolve_summary_fields(view, fields, PROJECT_SUMMARY_DEFAULTS)
+        if summary_fields:
+            projects, next_cursor = await fetch_keyset_page(
+                db.projects, {}, limit, cursor, projection=summary_projection(summary_fields)
+            )
+            return summary_response(summary_rows(projects, summary_fields, PROJECT_SUMMARY_DEFAULTS), next_cursor)
+        
+        projects, next_cursor = await fetch_keyset_page(db.projects, {}, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         # Filter and validate projects to prevent null errors
         valid_projects = []
@@ -1901,6 +3276,8 @@ async def get_projects(current_user: dict = Depends(get_current_user)):
         
         return valid_projects
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching projects: {str(e)}")
         return []
@@ -1989,19 +3366,254 @@ async def get_project_details(project_id: str, current_user: dict = Depends(get_
             },
             "invoices": cleaned_invoices
         }
-        
-        await log_activity(
-            current_user["id"], current_user["email"], current_user["role"],
-            "project_details_viewed", f"Viewed detailed information for project: {project.get('project_name')}"
+        
+        await log_activity(
+            current_user["id"], current_user["email"], current_user["role"],
+            "project_details_viewed", f"Viewed detailed information for project: {project.get('project_name')}"
+        )
+        
+        return project_details
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting project details: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get project details: {str(e)}")
+
+# Invoice and RA number sequences
+INVOICE_SEQUENCE_BLOCK_SIZE = int(os.environ.get("INVOICE_SEQUENCE_BLOCK_SIZE", "1"))
+
+class SequenceService:
+    """Monotonic named sequences stored in the counters collection
+    
+    Each value comes from an atomic find_one_and_update($inc), so concurrent
+    callers never share a number. A key is seeded once per process with $max
+    from existing data, which is safe to repeat. With block_size > 1 a process
+    reserves a range in one round trip and hands it out locally; unused numbers
+    in a block are skipped if the process restarts.
+    """
+    
+    def __init__(self, collection_name: str = "counters"):
+        self.collection_name = collection_name
+        self._seeded = set()
+        self._blocks: Dict[str, List[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    async def _reserve(self, key: str, count: int) -> int:
+        """Advance the stored counter by count and return the new high-water mark"""
+        doc = await db[self.collection_name].find_one_and_update(
+            {"_id": key},
+            {"$inc": {"value": count}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["value"]
+    
+    async def next(self, key: str, seed=None, block_size: int = 1) -> int:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._seeded:
+                if seed is not None:
+                    floor = await seed()
+                    await db[self.collection_name].update_one(
+                        {"_id": key}, {"$max": {"value": floor}}, upsert=True
+                    )
+                self._seeded.add(key)
+            
+            block = self._blocks.get(key)
+            if block and block[0] <= block[1]:
+                value = block[0]
+                block[0] += 1
+                return value
+            
+            block_size = max(1, block_size)
+            high = await self._reserve(key, block_size)
+            if block_size > 1:
+                self._blocks[key] = [high - block_size + 2, high]
+            return high - block_size + 1
+    
+    def reset(self):
+        """Forget seeds and reserved blocks, e.g. after the counters were cleared"""
+        self._seeded.clear()
+        self._blocks.clear()
+
+sequence_service = SequenceService()
+
+async def peek_ra_number(project_id: str) -> str:
+    """The RA number the project's next tax invoice will get, without reserving it"""
+    year = datetime.now().year
+    counter = await db.counters.find_one({"_id": f"ra_number:{project_id}:{year}"})
+    current = counter["value"] if counter else await _max_project_ra_number(project_id, year)
+    return f"RA{current + 1}"
+
+async def _max_invoice_number_suffix(year: int) -> int:
+    rows = await db.invoices.aggregate([
+        {"$match": {"invoice_number": {"$regex": f"^INV-{year}-"}}},
+        {"$group": {"_id": None, "max": {"$max": {"$convert": {
+            "input": {"$arrayElemAt": [{"$split": ["$invoice_number", "-"]}, 2]},
+            "to": "long", "onError": 0, "onNull": 0
+        }}}}}
+    ]).to_list(1)
+    return int(rows[0]["max"]) if rows else 0
+
+async def _max_project_ra_number(project_id: str, year: int) -> int:
+    rows = await db.invoices.aggregate([
+        {"$match": {
+            "project_id": project_id,
+            "ra_number": {"$regex": "^RA[0-9]+$"},
+            "created_at": {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}
+        }},
+        {"$group": {"_id": None, "max": {"$max": {"$convert": {
+            "input": {"$substrCP": ["$ra_number", 2, 20]},
+            "to": "long", "onError": 0, "onNull": 0
+        }}}}}
+    ]).to_list(1)
+    return int(rows[0]["max"]) if rows else 0
+
+async def next_invoice_number() -> str:
+    year = datetime.now().year
+    value = await sequence_service.next(
+        f"invoice_number:{year}",
+        seed=lambda: _max_invoice_number_suffix(year),
+        block_size=INVOICE_SEQUENCE_BLOCK_SIZE
+    )
+    return f"INV-{year}-{value:04d}"
+
+async def next_ra_number(project_id: str) -> str:
+    # RA bills restart at RA1 for each project every calendar year
+    year = datetime.now().year
+    value = await sequence_service.next(
+        f"ra_number:{project_id}:{year}",
+        seed=lambda: _max_project_ra_number(project_id, year)
+    )
+    return f"RA{value}"
+
+# BOQ billing ledger
+# boq_billing_ledger keeps the billed quantity per (project_id, boq_item_id) plus
+# one project totals row, so boq-status never has to walk every invoice line.
+# create_invoice applies $inc deltas; a project's ledger is rebuilt from the
+# invoices collection when its totals row is missing or on demand.
+LEDGER_PROJECT_TOTALS_KEY = "__project__"
+
+# Invoices carry ledger_applied once their quantities are in the ledger. Create
+# paths set it on insert; invoices from before the ledger are claimed one at a
+# time with find_one_and_update, so concurrent builders never count one twice.
+LEDGER_RECONCILE_ATTEMPTS = 5
+
+async def _ledger_totals_row(project_id: str):
+    # Upserted so even a project with no invoices is marked as having a ledger
+    await db.boq_billing_ledger.update_one(
+        {"project_id": project_id, "boq_item_id": LEDGER_PROJECT_TOTALS_KEY},
+        {"$setOnInsert": {"total_billed_value": 0.0, "invoice_count": 0, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def claim_unledgered_invoices(project_id: str) -> int:
+    """Add invoices that predate the ledger, each claimed exactly once"""
+    claimed = 0
+    while True:
+        invoice = await db.invoices.find_one_and_update(
+            {"project_id": project_id, "ledger_applied": {"$exists": False}},
+            {"$set": {"ledger_applied": True}},
+            projection={"_id": 0, "project_id": 1, "subtotal": 1, "items.boq_item_id": 1, "items.quantity": 1}
+        )
+        if invoice is None:
+            break
+        await apply_invoice_to_ledger(invoice)
+        claimed += 1
+    await _ledger_totals_row(project_id)
+    return claimed
+
+async def rebuild_project_ledger(project_id: str) -> Dict[str, Any]:
+    """Reconcile one project's ledger with its invoices by applying the difference as $inc
+    
+    Concurrent invoice creates keep incrementing while this runs, so nothing is
+    replaced. Expected values are aggregated before the ledger is read; when the
+    invoice counts disagree an increment is still in flight and we retry.
+    """
+    claimed = await claim_unledgered_invoices(project_id)
+    applied = {"project_id": project_id, "ledger_applied": True}
+    
+    for attempt in range(LEDGER_RECONCILE_ATTEMPTS):
+        quantities = await db.invoices.aggregate([
+            {"$match": applied},
+            {"$unwind": "$items"},
+            {"$group": {"_id": "$items.boq_item_id", "billed_quantity": {"$sum": "$items.quantity"}}}
+        ]).to_list(None)
+        totals = await db.invoices.aggregate([
+            {"$match": applied},
+            {"$group": {"_id": None, "total_billed_value": {"$sum": "$subtotal"}, "invoice_count": {"$sum": 1}}}
+        ]).to_list(1)
+        stored = {
+            row["boq_item_id"]: row
+            for row in await db.boq_billing_ledger.find({"project_id": project_id}, {"_id": 0}).to_list(None)
+        }
+        expected_totals = totals[0] if totals else {"total_billed_value": 0.0, "invoice_count": 0}
+        stored_totals = stored.get(LEDGER_PROJECT_TOTALS_KEY, {})
+        if stored_totals.get("invoice_count", 0) == expected_totals["invoice_count"]:
+            break
+        await asyncio.sleep(0.05 * (attempt + 1))
+    
+    expected = {row["_id"]: row["billed_quantity"] for row in quantities}
+    now = datetime.utcnow()
+    operations = []
+    for boq_item_id in set(expected) | (set(stored) - {LEDGER_PROJECT_TOTALS_KEY}):
+        delta = expected.get(boq_item_id, 0.0) - stored.get(boq_item_id, {}).get("billed_quantity", 0.0)
+        if abs(delta) > 1e-9:
+            operations.append(UpdateOne(
+                {"project_id": project_id, "boq_item_id": boq_item_id},
+                {"$inc": {"billed_quantity": delta}, "$set": {"updated_at": now}},
+                upsert=True
+            ))
+    value_delta = expected_totals["total_billed_value"] - stored_totals.get("total_billed_value", 0.0)
+    count_delta = expected_totals["invoice_count"] - stored_totals.get("invoice_count", 0)
+    if abs(value_delta) > 1e-9 or count_delta:
+        operations.append(UpdateOne(
+            {"project_id": project_id, "boq_item_id": LEDGER_PROJECT_TOTALS_KEY},
+            {"$inc": {"total_billed_value": value_delta, "invoice_count": count_delta}, "$set": {"updated_at": now}},
+            upsert=True
+        ))
+    if operations:
+        await db.boq_billing_ledger.bulk_write(operations, ordered=False)
+    
+    return {
+        "project_id": project_id,
+        "boq_items": len(quantities),
+        "invoice_count": expected_totals["invoice_count"],
+        "claimed_invoices": claimed,
+        "corrected_rows": len(operations)
+    }
+
+async def ensure_project_ledger(project_id: str):
+    """Build the ledger for projects invoiced before it existed"""
+    exists = await db.boq_billing_ledger.find_one(
+        {"project_id": project_id, "boq_item_id": LEDGER_PROJECT_TOTALS_KEY}, {"_id": 1}
+    )
+    if not exists:
+        await claim_unledgered_invoices(project_id)
+
+async def apply_invoice_to_ledger(invoice: Dict[str, Any]):
+    """Add one new invoice's quantities and subtotal to its project's ledger"""
+    project_id = invoice["project_id"]
+    deltas = {}
+    for item in invoice.get("items", []):
+        deltas[item.get("boq_item_id")] = deltas.get(item.get("boq_item_id"), 0.0) + item.get("quantity", 0)
+    
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"project_id": project_id, "boq_item_id": boq_item_id},
+            {"$inc": {"billed_quantity": quantity}, "$set": {"updated_at": now}},
+            upsert=True
         )
-        
-        return project_details
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting project details: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get project details: {str(e)}")
+        for boq_item_id, quantity in deltas.items()
+    ]
+    operations.append(UpdateOne(
+        {"project_id": project_id, "boq_item_id": LEDGER_PROJECT_TOTALS_KEY},
+        {"$inc": {"total_billed_value": invoice.get("subtotal", 0), "invoice_count": 1}, "$set": {"updated_at": now}},
+        upsert=True
+    ))
+    await db.boq_billing_ledger.bulk_write(operations, ordered=False)
 
 @api_router.get("/projects/{project_id}/boq-status")
 async def get_project_boq_status(project_id: str, current_user: dict = Depends(get_current_user)):
@@ -2011,20 +3623,22 @@ async def get_project_boq_status(project_id: str, current_user: dict = Depends(g
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        # Get all invoices for this project
-        invoices = await db.invoices.find({"project_id": project_id}).to_list(1000)
+        await ensure_project_ledger(project_id)
+        ledger_rows = await db.boq_billing_ledger.find({"project_id": project_id}, {"_id": 0}).to_list(None)
+        
+        billed_quantities = {}
+        project_totals = {}
+        for row in ledger_rows:
+            if row["boq_item_id"] == LEDGER_PROJECT_TOTALS_KEY:
+                project_totals = row
+            else:
+                billed_quantities[row["boq_item_id"]] = row.get("billed_quantity", 0.0)
         
         # Calculate billing status for each BOQ item
         boq_items_with_status = []
         for boq_item in project.get("boq_items", []):
             item_id = boq_item.get("id", boq_item.get("serial_number"))
-            total_billed = 0.0
-            
-            # Calculate total billed quantity for this item
-            for invoice in invoices:
-                for inv_item in invoice.get("items", []):
-                    if inv_item.get("boq_item_id") == item_id:
-                        total_billed += inv_item.get("quantity", 0)
+            total_billed = billed_quantities.get(item_id, 0.0)
             
             original_quantity = boq_item.get("quantity", 0)
             remaining_quantity = max(0, original_quantity - total_billed)
@@ -2043,7 +3657,8 @@ async def get_project_boq_status(project_id: str, current_user: dict = Depends(g
         
         # Calculate project-level billing status
         project_total_value = project.get("total_project_value", 0)
-        total_billed_value = sum(invoice.get("subtotal", 0) for invoice in invoices)
+        total_billed_value = project_totals.get("total_billed_value", 0.0)
+        invoice_count = project_totals.get("invoice_count", 0)
         project_billing_percentage = (total_billed_value / project_total_value * 100) if project_total_value > 0 else 0
         
         return {
@@ -2053,8 +3668,8 @@ async def get_project_boq_status(project_id: str, current_user: dict = Depends(g
             "total_billed_value": total_billed_value,
             "remaining_value": project_total_value - total_billed_value,
             "project_billing_percentage": round(project_billing_percentage, 2),
-            "total_invoices": len(invoices),
-            "next_ra_number": f"RA{len(invoices) + 1}",
+            "total_invoices": invoice_count,
+            "next_ra_number": await peek_ra_number(project_id),
             "boq_items": boq_items_with_status
         }
         
@@ -2064,6 +3679,35 @@ async def get_project_boq_status(project_id: str, current_user: dict = Depends(g
         logger.error(f"Error getting BOQ status: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get BOQ status")
 
+@api_router.post("/admin/billing-ledger/rebuild")
+async def rebuild_billing_ledger(project_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Rebuild the BOQ billing ledger from invoices for one project or all projects"""
+    try:
+        if current_user["role"] != UserRole.SUPER_ADMIN:
+            raise HTTPException(status_code=403, detail="Only super admin can rebuild the billing ledger")
+        
+        if project_id:
+            project_ids = [project_id]
+        else:
+            project_ids = list(set(await db.projects.distinct("id")) | set(await db.invoices.distinct("project_id")))
+            # Drop rows for projects that no longer exist
+            await db.boq_billing_ledger.delete_many({"project_id": {"$nin": project_ids}})
+        
+        rebuilt = [await rebuild_project_ledger(pid) for pid in project_ids]
+        
+        await log_activity(
+            current_user["id"], current_user["email"], current_user["role"],
+            "billing_ledger_rebuilt", f"Rebuilt billing ledger for {len(rebuilt)} project(s)"
+        )
+        
+        return {"message": "Billing ledger rebuilt successfully", "projects": rebuilt}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rebuilding billing ledger: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild billing ledger: {str(e)}")
+
 @api_router.post("/invoices", response_model=dict)
 async def create_invoice(invoice_data: dict, current_user: dict = Depends(get_current_user)):
     try:
@@ -2129,15 +3773,12 @@ async def create_invoice(invoice_data: dict, current_user: dict = Depends(get_cu
         grand_total = basic_total + total_gst_amount
         
         # Generate invoice and RA numbers
-        invoice_count = await db.invoices.count_documents({}) + 1
-        invoice_number = f"INV-{datetime.now().year}-{invoice_count:04d}"
+        invoice_number = await next_invoice_number()
         
-        # RA numbers only for tax invoices
+        # RA numbers only for tax invoices, numbered per project
         ra_number = ""
         if invoice_data["invoice_type"] == "tax_invoice":
-            # Count existing tax invoices to get next RA number
-            tax_invoice_count = await db.invoices.count_documents({"invoice_type": "tax_invoice"}) + 1
-            ra_number = f"RA{tax_invoice_count}"
+            ra_number = await next_ra_number(invoice_data["project_id"])
         
         # Payment terms
         payment_terms = invoice_data.get("payment_terms", "Payment due within 30 days from invoice date")
@@ -2174,16 +3815,31 @@ async def create_invoice(invoice_data: dict, current_user: dict = Depends(get_cu
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
+        new_invoice["search_tokens"] = invoice_search_tokens(new_invoice)
+        # Counted by the $inc paths below, never by a ledger or rollup build
+        new_invoice["ledger_applied"] = True
+        new_invoice["gst_rollup_applied"] = True
+        
+        await ensure_project_ledger(invoice_data["project_id"])
         
         # Save to database
         await db.invoices.insert_one(new_invoice)
+        await apply_invoice_to_ledger(new_invoice)
+        await apply_invoice_to_gst_rollups(new_invoice)
+        await index_search_entity("invoices", new_invoice)
         
         # Update project advance if advance received against invoice
+        advance_applied = 0.0
         if advance_received_invoice > 0:
-            await db.projects.update_one(
+            result = await db.projects.update_one(
                 {"id": invoice_data["project_id"]},
                 {"$inc": {"advance_received": advance_received_invoice}}
             )
+            if result.modified_count:
+                advance_applied = advance_received_invoice
+        await apply_dashboard_delta(
+            total_invoices=1, total_invoiced_value=new_invoice.get("total_amount", 0), advance_received=advance_applied
+        )
         
         # Log activity
         tax_status = "with Tax" if include_tax else "without Tax"
@@ -2209,12 +3865,17 @@ async def create_invoice(invoice_data: dict, current_user: dict = Depends(get_cu
 
 @api_router.get("/invoices", response_model=List[Invoice])
 async def get_invoices(
+    response: Response,
     current_user: dict = Depends(get_current_user),
     search: Optional[str] = None,
     type: Optional[str] = None,
     project_id: Optional[str] = None,
     status: Optional[str] = None,
-    client_id: Optional[str] = None
+    client_id: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    view: Optional[str] = None,
+    fields: Optional[str] = None
 ):
     try:
         # Build query filters
@@ -2229,19 +3890,20 @@ async def get_invoices(
         if client_id:
             query_filter["client_id"] = client_id
         
-        invoices = await db.invoices.find(query_filter).to_list(1000)
+        summary_fields = resolve_summary_fields(view, fields, INVOICE_SUMMARY_DEFAULTS)
+        projection = summary_projection(summary_fields) if summary_fields else None
         
-        # Apply search filter if provided
+        # Search is ranked and served from the search_tokens index
         if search:
-            search_lower = search.lower()
-            filtered_invoices = []
-            for invoice in invoices:
-                if (search_lower in invoice.get("project_name", "").lower() or
-                    search_lower in invoice.get("client_name", "").lower() or
-                    search_lower in invoice.get("invoice_number", "").lower() or
-                    search_lower in invoice.get("ra_number", "").lower()):
-                    filtered_invoices.append(invoice)
-            invoices = filtered_invoices
+            invoices, next_cursor = await search_invoices(query_filter, search, limit, cursor, projection)
+        else:
+            invoices, next_cursor = await fetch_keyset_page(db.invoices, query_filter, limit, cursor, projection=projection)
+        
+        if summary_fields:
+            return summary_response(summary_rows(invoices, summary_fields, INVOICE_SUMMARY_DEFAULTS), next_cursor)
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         # Filter and validate invoices to prevent validation errors
         valid_invoices = []
@@ -2303,10 +3965,172 @@ async def get_invoices(
         
         return valid_invoices
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching invoices: {str(e)}")
         return []
 
+# Bulk invoice PDF export
+# Exports take at most half the process lane so interactive renders and parsing keep
+# running; a render that finds the lane saturated backs off (0.5s doubling to 8s)
+# and the export is aborted if it still cannot get a slot.
+PDF_EXPORT_CONCURRENCY = int(os.environ.get("PDF_EXPORT_CONCURRENCY", str(max(1, WORKER_PROCESS_POOL_SIZE // 2))))
+PDF_EXPORT_SATURATED_RETRIES = 6
+PDF_EXPORT_RETRY_BASE_SECONDS = 0.5
+PDF_EXPORT_RETRY_MAX_SECONDS = 8.0
+
+class _ZipChunkWriter:
+    """Write-only sink for ZipFile; without tell() zipfile writes streaming data descriptors"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _export_filename(invoice_data: Dict[str, Any], used_names: set) -> str:
+    base = re.sub(r"[^A-Za-z0-9._-]+", "_", invoice_data.get("invoice_number") or invoice_data.get("id", "invoice"))
+    name = f"{base}.pdf"
+    suffix = 2
+    while name in used_names:
+        name = f"{base}_{suffix}.pdf"
+        suffix += 1
+    used_names.add(name)
+    return name
+
+async def _render_export_pdf(invoice_data: Dict[str, Any], related: Dict[tuple, Optional[Dict[str, Any]]]) -> bytes:
+    """Render one invoice for an export; failures become an error page instead of aborting the ZIP
+    
+    A saturated worker pool is not a render failure: it is retried with backoff and,
+    once retries run out, raised so the export aborts rather than ship error pages.
+    """
+    for attempt in range(PDF_EXPORT_SATURATED_RETRIES):
+        try:
+            return await _render_export_pdf_once(invoice_data, related)
+        except WorkerPoolSaturated:
+            await asyncio.sleep(min(PDF_EXPORT_RETRY_BASE_SECONDS * (2 ** attempt), PDF_EXPORT_RETRY_MAX_SECONDS))
+    return await _render_export_pdf_once(invoice_data, related)
+
+async def _render_export_pdf_once(invoice_data: Dict[str, Any], related: Dict[tuple, Optional[Dict[str, Any]]]) -> bytes:
+    try:
+        project_key = ("project", invoice_data.get("project_id"))
+        if project_key not in related:
+            related[project_key] = await db.projects.find_one({"id": project_key[1]}, {"_id": 0, "boq_items": 0})
+        client_key = ("client", invoice_data.get("client_id"))
+        if client_key not in related:
+            related[client_key] = await db.clients.find_one({"id": client_key[1]}, {"_id": 0})
+        
+        invoice, project, client = _prepare_invoice_pdf_models(invoice_data, related[project_key], related[client_key])
+        return await render_invoice_pdf_cached(invoice, project, client)
+    except WorkerPoolSaturated:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk export failed to render invoice {invoice_data.get('id')}: {str(e)}")
+        return create_error_pdf(f"Invoice {invoice_data.get('invoice_number', 'Unknown')}", f"PDF generation failed: {str(e)}")
+
+async def _stream_invoice_zip(query: Dict[str, Any], concurrency: int):
+    """Yield ZIP bytes while at most `concurrency` renders are in flight"""
+    sink = _ZipChunkWriter()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    related: Dict[tuple, Optional[Dict[str, Any]]] = {}
+    used_names = set()
+    pending = deque()
+    cursor = db.invoices.find(query, {"_id": 0, "search_tokens": 0}).sort(KEYSET_SORT).batch_size(concurrency * 2)
+    
+    try:
+        exhausted = False
+        while not exhausted or pending:
+            # Keep the render window full; results are written in query order
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    invoice_data = await cursor.next()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                name = _export_filename(invoice_data, used_names)
+                pending.append((name, asyncio.ensure_future(_render_export_pdf(invoice_data, related))))
+            
+            if pending:
+                name, task = pending.popleft()
+                archive.writestr(name, await task)
+                yield sink.drain()
+        
+        archive.close()
+        yield sink.drain()
+    except WorkerPoolSaturated:
+        # Headers are already sent; dropping the connection leaves an incomplete ZIP the client rejects
+        logger.error("Bulk PDF export aborted: worker pool stayed saturated")
+        raise
+    finally:
+        # Client went away or rendering failed: stop the renders still queued
+        for _, task in pending:
+            task.cancel()
+        await cursor.close()
+
+@api_router.get("/invoices/export-pdf")
+async def export_invoice_pdfs(
+    project_id: Optional[str] = None,
+    client_id: Optional[str] = None,
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the PDFs of every matching invoice as one ZIP archive"""
+    try:
+        query = {}
+        if project_id:
+            query["project_id"] = project_id
+        if client_id:
+            query["client_id"] = client_id
+        if status:
+            query["status"] = status
+        if type:
+            query["invoice_type"] = type
+        if date_from or date_to:
+            date_query = {}
+            try:
+                if date_from:
+                    date_query["$gte"] = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
+                if date_to:
+                    date_query["$lte"] = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="date_from and date_to must be ISO dates")
+            query["created_at"] = date_query
+        
+        if not await db.invoices.find_one(query, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="No invoices match the export filter")
+        
+        await log_activity(
+            current_user["id"], current_user["email"], current_user["role"],
+            "invoices_exported", f"Exported invoice PDFs with filter: {query}",
+            project_id=project_id
+        )
+        
+        filename = f"invoices_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+        return StreamingResponse(
+            _stream_invoice_zip(query, max(1, PDF_EXPORT_CONCURRENCY)),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting invoice PDFs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to export invoice PDFs: {str(e)}")
+
 @api_router.get("/invoices/{invoice_id}", response_model=Invoice)
 async def get_invoice(invoice_id: str, current_user: dict = Depends(get_current_user)):
     """Get individual invoice by ID"""
@@ -2370,103 +4194,256 @@ async def get_invoice(invoice_id: str, current_user: dict = Depends(get_current_
         logger.error(f"Error fetching invoice {invoice_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+# Rendered invoice PDF cache
+# Keys are a hash of exactly the invoice, project and client fields PDFGenerator
+# reads (plus a template version), so any change to those fields yields a new key
+# and stale renders are never served. A byte-bounded in-memory LRU sits in front
+# of an optional directory of rendered files.
+PDF_TEMPLATE_VERSION = "2"
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "")
+
+PDF_INVOICE_FIELDS = ("invoice_number", "ra_number", "invoice_type", "invoice_date", "due_date", "items", "subtotal", "total_gst_amount", "total_amount")
+PDF_PROJECT_FIELDS = ("project_name", "architect", "location")
+PDF_CLIENT_FIELDS = ("name", "bill_to_address", "ship_to_address", "gst_no")
+
+def pdf_cache_key(invoice: Invoice, project: Project, client: ClientInfo) -> str:
+    material = {
+        "template": PDF_TEMPLATE_VERSION,
+        "invoice": invoice.dict(include=set(PDF_INVOICE_FIELDS)),
+        "project": project.dict(include=set(PDF_PROJECT_FIELDS)),
+        "client": client.dict(include=set(PDF_CLIENT_FIELDS))
+    }
+    encoded = json.dumps(jsonable_encoder(material), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class RenderedPDFCache:
+    """Two-tier cache of rendered PDFs: memory LRU bounded by bytes, then an optional directory"""
+    
+    def __init__(self, max_bytes: int, directory: str = ""):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._keys_by_invoice: Dict[str, str] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+    
+    def _remember(self, key: str, content: bytes):
+        if len(content) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = content
+        self._bytes += len(content)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+    
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    def _write_file(self, key: str, content: bytes):
+        # Write-then-rename so readers never see a partial file
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+    
+    async def _track(self, key: str, invoice_id: Optional[str]):
+        """Remember an invoice's current key and drop its superseded render"""
+        if not invoice_id:
+            return
+        previous = self._keys_by_invoice.get(invoice_id)
+        if previous and previous != key:
+            await self._discard(previous)
+        self._keys_by_invoice[invoice_id] = key
+    
+    async def get(self, key: str, invoice_id: Optional[str] = None) -> Optional[bytes]:
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+        elif self.directory:
+            content = await worker_pool.run_in_thread(self._read_file, key)
+            if content is not None:
+                self._remember(key, content)
+                self.disk_hits += 1
+        if content is None:
+            self.misses += 1
+            return None
+        await self._track(key, invoice_id)
+        return content
+    
+    async def put(self, key: str, content: bytes, invoice_id: Optional[str] = None):
+        await self._track(key, invoice_id)
+        self._remember(key, content)
+        if self.directory:
+            try:
+                await worker_pool.run_in_thread(self._write_file, key, content)
+            except Exception as e:
+                logger.warning(f"Failed to write PDF cache file for {key}: {str(e)}")
+    
+    async def _discard(self, key: str):
+        content = self._entries.pop(key, None)
+        if content is not None:
+            self._bytes -= len(content)
+        if self.directory:
+            await worker_pool.run_in_thread(self._path(key).unlink, True)
+    
+    async def invalidate_invoice(self, invoice_id: str):
+        """Drop the last render of an invoice, e.g. after it was modified"""
+        key = self._keys_by_invoice.pop(invoice_id, None)
+        if key:
+            await self._discard(key)
+    
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._keys_by_invoice.clear()
+        if self.directory:
+            for path in self.directory.glob("*.pdf"):
+                await worker_pool.run_in_thread(path.unlink, True)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "directory": str(self.directory) if self.directory else None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+pdf_cache = RenderedPDFCache(PDF_CACHE_MAX_BYTES, PDF_CACHE_DIR)
+
+def _prepare_invoice_pdf_models(invoice_data: Dict[str, Any], project_data: Optional[Dict[str, Any]], client_data: Optional[Dict[str, Any]], created_by: Optional[str] = None) -> tuple:
+    """Fill defaults for missing or legacy records and build the models PDFGenerator takes"""
+    invoice_id = invoice_data.get("id")
+    if not project_data:
+        # Create minimal project data if not found
+        project_data = {
+            "id": invoice_data.get("project_id", "unknown"),
+            "project_name": invoice_data.get("project_name", "Unknown Project"),
+            "architect": "Unknown Architect",
+            "location": "Unknown Location",
+            "client_id": invoice_data.get("client_id"),
+            "boq_items": [],
+            "total_project_value": 0,
+            "advance_received": 0,
+            "pending_payment": 0,
+            "created_by": created_by,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+    
+    if not client_data:
+        # Create minimal client data if not found
+        client_data = {
+            "id": invoice_data.get("client_id", "unknown"),
+            "name": invoice_data.get("client_name", "Unknown Client"),
+            "bill_to_address": "Unknown Address",
+            "ship_to_address": "Unknown Address",
+            "gst_no": "",
+            "contact_person": "",
+            "phone": "",
+            "email": "",
+            "created_at": datetime.utcnow()
+        }
+    
+    # Ensure required fields exist with defaults
+    cleaned_invoice = {
+        "id": invoice_id,
+        "invoice_number": invoice_data.get("invoice_number", "Unknown"),
+        "ra_number": invoice_data.get("ra_number", "Unknown"),
+        "project_id": invoice_data.get("project_id", ""),
+        "project_name": invoice_data.get("project_name", "Unknown Project"),
+        "client_id": invoice_data.get("client_id", ""),
+        "client_name": invoice_data.get("client_name", "Unknown Client"),
+        "invoice_type": invoice_data.get("invoice_type", "proforma"),
+        "items": [],
+        "subtotal": float(invoice_data.get("subtotal", 0)),
+        "total_gst_amount": float(invoice_data.get("total_gst_amount", 0)),
+        "total_amount": float(invoice_data.get("total_amount", 0)),
+        "is_partial": invoice_data.get("is_partial", True),
+        "billing_percentage": invoice_data.get("billing_percentage"),
+        "cumulative_billed": invoice_data.get("cumulative_billed"),
+        "status": invoice_data.get("status", "draft"),
+        "created_by": invoice_data.get("created_by"),
+        "reviewed_by": invoice_data.get("reviewed_by"),
+        "approved_by": invoice_data.get("approved_by"),
+        "invoice_date": invoice_data.get("invoice_date", datetime.utcnow()),
+        "due_date": invoice_data.get("due_date"),
+        "created_at": invoice_data.get("created_at", datetime.utcnow()),
+        "updated_at": invoice_data.get("updated_at", datetime.utcnow())
+    }
+    
+    # Clean items data
+    for item in invoice_data.get("items", []):
+        if isinstance(item, dict):
+            cleaned_item = {
+                "boq_item_id": item.get("boq_item_id", item.get("serial_number", str(len(cleaned_invoice["items"]) + 1))),
+                "serial_number": str(item.get("serial_number", len(cleaned_invoice["items"]) + 1)),
+                "description": str(item.get("description", "Unknown Item")),
+                "unit": str(item.get("unit", "nos")),
+                "quantity": float(item.get("quantity", 0)),
+                "rate": float(item.get("rate", 0)),
+                "amount": float(item.get("amount", 0)),
+                "gst_rate": float(item.get("gst_rate", 18.0)),
+                "gst_amount": float(item.get("gst_amount", 0)),
+                "total_with_gst": float(item.get("total_with_gst", 0))
+            }
+            cleaned_invoice["items"].append(cleaned_item)
+    
+    return Invoice(**cleaned_invoice), Project(**project_data), ClientInfo(**client_data)
+
+async def render_invoice_pdf_cached(invoice: Invoice, project: Project, client: ClientInfo, cache_key: Optional[str] = None) -> bytes:
+    """Serve a render from the PDF cache, rendering and storing it on a miss"""
+    cache_key = cache_key or pdf_cache_key(invoice, project, client)
+    pdf_content = await pdf_cache.get(cache_key, invoice_id=invoice.id)
+    if pdf_content is None:
+        pdf_buffer = await PDFGenerator().generate_invoice_pdf(invoice, project, client)
+        pdf_content = pdf_buffer.getvalue()
+        if len(pdf_content) < 100:  # Check if PDF is too small (likely an error)
+            raise Exception("Generated PDF is too small - likely incomplete")
+        await pdf_cache.put(cache_key, pdf_content, invoice_id=invoice.id)
+    return pdf_content
+
 @api_router.get("/invoices/{invoice_id}/pdf")
-async def download_invoice_pdf(invoice_id: str, current_user: dict = Depends(get_current_user)):
+async def download_invoice_pdf(invoice_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     try:
         if not invoice_id or len(invoice_id.strip()) == 0:
             raise HTTPException(status_code=400, detail="Invoice ID is required")
         
         # Get invoice data
-        invoice_data = await db.invoices.find_one({"id": invoice_id})
+        invoice_data = await db.invoices.find_one({"id": invoice_id}, {"_id": 0, "search_tokens": 0})
         if not invoice_data:
             raise HTTPException(status_code=404, detail=f"Invoice with ID {invoice_id} not found")
+        invoice_data.setdefault("id", invoice_id)
         
-        # Get related project data
-        project_data = await db.projects.find_one({"id": invoice_data.get("project_id")})
-        if not project_data:
-            # Create minimal project data if not found
-            project_data = {
-                "id": invoice_data.get("project_id", "unknown"),
-                "project_name": invoice_data.get("project_name", "Unknown Project"),
-                "architect": "Unknown Architect",
-                "location": "Unknown Location",
-                "client_id": invoice_data.get("client_id"),
-                "boq_items": [],
-                "total_project_value": 0,
-                "advance_received": 0,
-                "pending_payment": 0,
-                "created_by": current_user["id"],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-        # Get related client data
-        client_data = await db.clients.find_one({"id": invoice_data.get("client_id")})
-        if not client_data:
-            # Create minimal client data if not found
-            client_data = {
-                "id": invoice_data.get("client_id", "unknown"),
-                "name": invoice_data.get("client_name", "Unknown Client"),
-                "bill_to_address": "Unknown Address",
-                "ship_to_address": "Unknown Address",
-                "gst_no": "",
-                "contact_person": "",
-                "phone": "",
-                "email": "",
-                "created_at": datetime.utcnow()
-            }
+        # Related project (without its BOQ, which the PDF never reads) and client
+        project_data = await db.projects.find_one({"id": invoice_data.get("project_id")}, {"_id": 0, "boq_items": 0})
+        client_data = await db.clients.find_one({"id": invoice_data.get("client_id")}, {"_id": 0})
         
         # Clean and validate data before PDF generation
         try:
-            # Ensure required fields exist with defaults
-            cleaned_invoice = {
-                "id": invoice_data.get("id", invoice_id),
-                "invoice_number": invoice_data.get("invoice_number", "Unknown"),
-                "ra_number": invoice_data.get("ra_number", "Unknown"),
-                "project_id": invoice_data.get("project_id", ""),
-                "project_name": invoice_data.get("project_name", "Unknown Project"),
-                "client_id": invoice_data.get("client_id", ""),
-                "client_name": invoice_data.get("client_name", "Unknown Client"),
-                "invoice_type": invoice_data.get("invoice_type", "proforma"),
-                "items": [],
-                "subtotal": float(invoice_data.get("subtotal", 0)),
-                "total_gst_amount": float(invoice_data.get("total_gst_amount", 0)),
-                "total_amount": float(invoice_data.get("total_amount", 0)),
-                "is_partial": invoice_data.get("is_partial", True),
-                "billing_percentage": invoice_data.get("billing_percentage"),
-                "cumulative_billed": invoice_data.get("cumulative_billed"),
-                "status": invoice_data.get("status", "draft"),
-                "created_by": invoice_data.get("created_by"),
-                "reviewed_by": invoice_data.get("reviewed_by"),
-                "approved_by": invoice_data.get("approved_by"),
-                "invoice_date": invoice_data.get("invoice_date", datetime.utcnow()),
-                "due_date": invoice_data.get("due_date"),
-                "created_at": invoice_data.get("created_at", datetime.utcnow()),
-                "updated_at": invoice_data.get("updated_at", datetime.utcnow())
-            }
-            
-            # Clean items data
-            for item in invoice_data.get("items", []):
-                if isinstance(item, dict):
-                    cleaned_item = {
-                        "boq_item_id": item.get("boq_item_id", item.get("serial_number", str(len(cleaned_invoice["items"]) + 1))),
-                        "serial_number": str(item.get("serial_number", len(cleaned_invoice["items"]) + 1)),
-                        "description": str(item.get("description", "Unknown Item")),
-                        "unit": str(item.get("unit", "nos")),
-                        "quantity": float(item.get("quantity", 0)),
-                        "rate": float(item.get("rate", 0)),
-                        "amount": float(item.get("amount", 0)),
-                        "gst_rate": float(item.get("gst_rate", 18.0)),
-                        "gst_amount": float(item.get("gst_amount", 0)),
-                        "total_with_gst": float(item.get("total_with_gst", 0))
-                    }
-                    cleaned_invoice["items"].append(cleaned_item)
-            
-            # Create model instances with error handling
-            invoice = Invoice(**cleaned_invoice)
-            project = Project(**project_data)
-            client = ClientInfo(**client_data)
-            
+            invoice, project, client = _prepare_invoice_pdf_models(
+                invoice_data, project_data, client_data, created_by=current_user["id"]
+            )
         except Exception as validation_error:
             logger.error(f"Data validation error for invoice {invoice_id}: {str(validation_error)}")
             # Return a simple error PDF instead of failing
@@ -2481,16 +4458,15 @@ async def download_invoice_pdf(invoice_id: str, current_user: dict = Depends(get
                 }
             )
         
-        # Generate PDF
+        cache_key = pdf_cache_key(invoice, project, client)
+        etag = f'"{cache_key}"'
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        
+        # Generate PDF (or reuse an identical earlier render)
         try:
-            pdf_generator = PDFGenerator()
-            pdf_buffer = await pdf_generator.generate_invoice_pdf(invoice, project, client)
-            
-            # Convert BytesIO to bytes for response
-            pdf_content = pdf_buffer.getvalue()
-            
-            if len(pdf_content) < 100:  # Check if PDF is too small (likely an error)
-                raise Exception("Generated PDF is too small - likely incomplete")
+            pdf_content = await render_invoice_pdf_cached(invoice, project, client, cache_key)
             
             await log_activity(
                 current_user["id"], current_user["email"], current_user["role"],
@@ -2506,10 +4482,13 @@ async def download_invoice_pdf(invoice_id: str, current_user: dict = Depends(get
                     "Content-Type": "application/pdf",
                     "Content-Disposition": f"inline; filename=invoice_{invoice.invoice_number}.pdf",
                     "Content-Length": str(len(pdf_content)),
-                    "Cache-Control": "no-cache"
+                    "Cache-Control": "no-cache",
+                    "ETag": etag
                 }
             )
             
+        except WorkerPoolSaturated:
+            raise
         except Exception as pdf_error:
             logger.error(f"PDF generation error for invoice {invoice_id}: {str(pdf_error)}")
             # Return a simple error PDF
@@ -2591,34 +4570,142 @@ def create_error_pdf(title: str, error_message: str) -> bytes:
         # If even error PDF creation fails, return minimal PDF
         return b"%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n/Pages 2 0 R\n>>\nendobj\n2 0 obj\n<<\n/Type /Pages\n/Kids [3 0 R]\n/Count 1\n>>\nendobj\n3 0 obj\n<<\n/Type /Page\n/Parent 2 0 R\n/Resources <<\n/Font <<\n/F1 4 0 R\n>>\n>>\n/MediaBox [0 0 612 792]\n/Contents 5 0 R\n>>\nendobj\n4 0 obj\n<<\n/Type /Font\n/Subtype /Type1\n/BaseFont /Times-Roman\n>>\nendobj\n5 0 obj\n<<\n/Length 44\n>>\nstream\nBT\n/F1 12 Tf\n72 720 Td\n(PDF Generation Error) Tj\nET\nendstream\nendobj\nxref\n0 6\n0000000000 65535 f \n0000000010 00000 n \n0000000079 00000 n \n0000000173 00000 n \n0000000301 00000 n \n0000000380 00000 n \ntrailer\n<<\n/Size 6\n/Root 1 0 R\n>>\nstartxref\n492\n%%EOF"
 
-@api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    total_projects = await db.projects.count_documents({})
-    total_invoices = await db.invoices.count_documents({})
+# Dashboard counters, a single document kept current by the project and invoice create paths
+DASHBOARD_COUNTERS_ID = "global"
+DASHBOARD_RECONCILE_INTERVAL_SECONDS = float(os.environ.get("DASHBOARD_RECONCILE_INTERVAL_SECONDS", "900"))
+DASHBOARD_COUNTER_FIELDS = ("total_projects", "total_invoices", "total_invoiced_value", "advance_received")
+
+async def apply_dashboard_delta(**deltas):
+    """Increment dashboard counters, e.g. apply_dashboard_delta(total_projects=1)
     
-    # Calculate financial stats
-    pipeline = [
-        {"$group": {
-            "_id": None,
-            "total_invoiced": {"$sum": "$total_amount"},
-            "total_advance": {"$sum": "$advance_received"}
-        }}
-    ]
+    No upsert: while the document is missing the next rebuild counts the change from
+    the source collections, so a partial document is never started from zero.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    await db.dashboard_counters.update_one(
+        {"_id": DASHBOARD_COUNTERS_ID},
+        {"$inc": deltas, "$set": {"updated_at": datetime.utcnow()}}
+    )
+
+DASHBOARD_RECONCILE_ATTEMPTS = 5
+dashboard_rebuild_lock = asyncio.Lock()
+
+async def _expected_dashboard_counters() -> Dict[str, Any]:
+    invoice_totals = await db.invoices.aggregate([
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total_invoiced_value": {"$sum": "$total_amount"}}}
+    ]).to_list(1)
+    project_totals = await db.projects.aggregate([
+        {"$group": {"_id": None, "count": {"$sum": 1}, "advance_received": {"$sum": "$advance_received"}}}
+    ]).to_list(1)
+    invoice_totals = invoice_totals[0] if invoice_totals else {}
+    project_totals = project_totals[0] if project_totals else {}
+    return {
+        "total_projects": project_totals.get("count", 0),
+        "total_invoices": invoice_totals.get("count", 0),
+        "total_invoiced_value": invoice_totals.get("total_invoiced_value", 0),
+        "advance_received": project_totals.get("advance_received", 0)
+    }
+
+async def rebuild_dashboard_counters() -> Dict[str, Any]:
+    """Reconcile the counters with the source collections by applying the difference as $inc
+    
+    Creates keep incrementing while this runs, so the document is never replaced.
+    Expected values are aggregated before the counters are read; when the document
+    counts disagree a create is between its insert and its increment, and we retry.
+    A missing document is created whole with insert_one (a concurrent creator wins
+    the _id and we reconcile against it), then verified like any stored document.
+    """
+    for attempt in range(DASHBOARD_RECONCILE_ATTEMPTS):
+        expected = await _expected_dashboard_counters()
+        stored = await db.dashboard_counters.find_one({"_id": DASHBOARD_COUNTERS_ID})
+        if stored is None:
+            now = datetime.utcnow()
+            try:
+                await db.dashboard_counters.insert_one(
+                    {"_id": DASHBOARD_COUNTERS_ID, **expected, "updated_at": now, "reconciled_at": now}
+                )
+            except DuplicateKeyError:
+                pass
+            continue
+        if all(stored.get(field) == expected[field] for field in ("total_projects", "total_invoices")):
+            break
+        await asyncio.sleep(0.05 * (attempt + 1))
+    
+    if stored is None:
+        # Still racing another creator after every attempt; the periodic reconcile catches up
+        return {"drift": {}, "counters": expected}
     
-    financial_stats = await db.projects.aggregate(pipeline).to_list(1)
-    total_invoiced = financial_stats[0]["total_invoiced"] if financial_stats else 0
-    total_advance = financial_stats[0]["total_advance"] if financial_stats else 0
+    # Fields missing from an older document are set outright, never incremented from nothing
+    missing = {field: expected[field] for field in DASHBOARD_COUNTER_FIELDS if field not in stored}
+    deltas = {
+        field: expected[field] - stored[field]
+        for field in DASHBOARD_COUNTER_FIELDS
+        if field in stored and abs((stored[field] or 0) - expected[field]) > 0.005
+    }
+    drift = {field: {"stored": stored.get(field), "expected": expected[field]} for field in {**missing, **deltas}}
+    if deltas or missing:
+        now = datetime.utcnow()
+        update = {"$set": {**missing, "updated_at": now, "reconciled_at": now}}
+        if deltas:
+            update["$inc"] = deltas
+        await db.dashboard_counters.update_one({"_id": DASHBOARD_COUNTERS_ID}, update)
+        logger.warning(f"Dashboard counters drifted and were corrected: {drift}")
+    return {"drift": drift, "counters": expected}
+
+async def ensure_dashboard_counters() -> Dict[str, Any]:
+    """Return the counters, building them once if the document is missing or incomplete"""
+    counters = await db.dashboard_counters.find_one({"_id": DASHBOARD_COUNTERS_ID})
+    if counters is not None and all(field in counters for field in DASHBOARD_COUNTER_FIELDS):
+        return counters
+    # Concurrent dashboard loads wait for one rebuild instead of each running their own
+    async with dashboard_rebuild_lock:
+        counters = await db.dashboard_counters.find_one({"_id": DASHBOARD_COUNTERS_ID})
+        if counters is not None and all(field in counters for field in DASHBOARD_COUNTER_FIELDS):
+            return counters
+        return (await rebuild_dashboard_counters())["counters"]
+
+dashboard_reconciler = PeriodicTask("dashboard_counters", DASHBOARD_RECONCILE_INTERVAL_SECONDS, rebuild_dashboard_counters)
+
+@api_router.get("/dashboard/stats")
+async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
+    counters = await ensure_dashboard_counters()
     
+    total_invoiced = counters.get("total_invoiced_value", 0)
+    total_advance = counters.get("advance_received", 0)
     pending_payment = total_invoiced - total_advance
     
     return {
-        "total_projects": total_projects,
-        "total_invoices": total_invoices,
+        "total_projects": counters.get("total_projects", 0),
+        "total_invoices": counters.get("total_invoices", 0),
         "total_invoiced_value": total_invoiced,
         "advance_received": total_advance,
         "pending_payment": pending_payment
     }
 
+@api_router.post("/admin/dashboard-counters/rebuild")
+async def rebuild_dashboard_counters_endpoint(current_user: dict = Depends(get_current_user)):
+    """Reconcile the dashboard counters against projects and invoices now"""
+    try:
+        if current_user["role"] != UserRole.SUPER_ADMIN:
+            raise HTTPException(status_code=403, detail="Only super admin can rebuild dashboard counters")
+        
+        result = await rebuild_dashboard_counters()
+        
+        await log_activity(
+            current_user["id"], current_user["email"], current_user["role"],
+            "dashboard_counters_rebuilt", f"Rebuilt dashboard counters ({len(result['drift'])} fields drifted)"
+        )
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rebuilding dashboard counters: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild dashboard counters: {str(e)}")
+
 @api_router.get("/activity-logs")
 async def get_activity_logs(
     skip: int = 0, 
@@ -2632,6 +4719,238 @@ async def get_activity_logs(
     return [ActivityLog(**log) for log in logs]
 
 # Item Master Management
+# Master items are unique per (description_key, unit), where description_key is the
+# description lowercased with whitespace collapsed; the unique index enforces it.
+MASTER_ITEM_BULK_BATCH_SIZE = 500
+
+def master_item_key(description: str) -> str:
+    return " ".join((description or "").split()).lower()
+
+async def backfill_master_item_keys() -> Dict[str, int]:
+    """Set description_key on master items written before the field existed
+    
+    Items that collide with an already keyed item are left without a key (and so
+    outside the unique index) and reported, rather than deleted.
+    """
+    seen = set()
+    pending = []
+    async for item in db.master_items.find({}, {"description": 1, "unit": 1, "description_key": 1}).sort("created_at", 1):
+        if isinstance(item.get("description_key"), str):
+            seen.add((item["description_key"], item.get("unit")))
+        else:
+            pending.append(item)
+    
+    batch = []
+    keyed = 0
+    duplicates = 0
+    for item in pending:
+        key = master_item_key(item.get("description", ""))
+        if (key, item.get("unit")) in seen:
+            duplicates += 1
+            continue
+        seen.add((key, item.get("unit")))
+        batch.append(UpdateOne({"_id": item["_id"]}, {"$set": {"description_key": key}}))
+        if len(batch) >= MASTER_ITEM_BULK_BATCH_SIZE:
+            await db.master_items.bulk_write(batch, ordered=False)
+            keyed += len(batch)
+            batch = []
+    if batch:
+        await db.master_items.bulk_write(batch, ordered=False)
+        keyed += len(batch)
+    if keyed or duplicates:
+        logger.info(f"Backfilled description_key on {keyed} master items ({duplicates} duplicates left unkeyed)")
+    return {"keyed": keyed, "duplicates": duplicates}
+
+def master_item_upsert(key: str, unit: str, description: str, usage_count: int, rate_sum: float, rate_count: int, user_id: str, now: datetime) -> UpdateOne:
+    """Upsert one master item from BOQ usage, merging into an existing item
+    
+    The scan is a full recount, so only usage beyond the stored usage_count is
+    added; the standard rate moves towards the BOQ average in proportion to it.
+    Re-running over unchanged projects leaves items untouched.
+    """
+    avg_rate = rate_sum / rate_count if rate_count else 0.0
+    prev_usage = "$_prev_usage"
+    prev_rate = "$_prev_rate"
+    extra = "$_extra"
+    stored_weight = {"$cond": [{"$gt": [prev_rate, 0]}, {"$max": [prev_usage, 1]}, 0]}
+    merged_rate = {"$cond": [
+        {"$and": [{"$gt": [avg_rate, 0]}, {"$gt": [extra, 0]}]},
+        {"$divide": [
+            {"$add": [{"$multiply": [prev_rate, stored_weight]}, {"$multiply": [avg_rate, extra]}]},
+            {"$add": [stored_weight, extra]}
+        ]},
+        {"$cond": [{"$gt": [prev_rate, 0]}, prev_rate, avg_rate]}
+    ]}
+    return UpdateOne(
+        {"description_key": key, "unit": unit},
+        [
+            {"$set": {
+                "_prev_usage": {"$ifNull": ["$usage_count", 0]},
+                "_prev_rate": {"$ifNull": ["$standard_rate", 0]}
+            }},
+            {"$set": {"_extra": {"$max": [{"$subtract": [usage_count, prev_usage]}, 0]}}},
+            {"$set": {
+                "id": {"$ifNull": ["$id", {"$literal": str(uuid.uuid4())}]},
+                "description": {"$ifNull": ["$description", {"$literal": description}]},
+                "description_key": {"$literal": key},
+                "unit": {"$literal": unit},
+                "category": {"$ifNull": ["$category", None]},
+                "last_used_date": {"$ifNull": ["$last_used_date", None]},
+                "created_by": {"$ifNull": ["$created_by", {"$literal": user_id}]},
+                "created_at": {"$ifNull": ["$created_at", now]},
+                "standard_rate": merged_rate,
+                "usage_count": {"$add": [prev_usage, extra]},
+                "updated_at": {"$cond": [{"$gt": [extra, 0]}, now, {"$ifNull": ["$updated_at", now]}]}
+            }},
+            {"$unset": ["_prev_usage", "_prev_rate", "_extra"]}
+        ],
+        upsert=True
+    )
+
+# Master item autocomplete
+# Each worker keeps a trigram index of master item descriptions and categories in
+# memory. Writes through this worker update it in place; a periodic reload picks
+# up changes made through other workers.
+MASTER_ITEM_SUGGEST_REFRESH_SECONDS = float(os.environ.get("MASTER_ITEM_SUGGEST_REFRESH_SECONDS", "300"))
+MASTER_ITEM_SUGGEST_MIN_SCORE = float(os.environ.get("MASTER_ITEM_SUGGEST_MIN_SCORE", "0.3"))
+MASTER_ITEM_SUGGEST_FIELDS = ("id", "description", "unit", "standard_rate", "category", "usage_count")
+
+def suggest_grams(text: str) -> set:
+    """Trigrams of each word padded with spaces, so short words and word starts count"""
+    grams = set()
+    for term in search_terms(text):
+        padded = f" {term} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class MasterItemSuggestIndex:
+    """In-memory trigram index over master item description and category"""
+    
+    CATEGORY_WEIGHT = 0.5
+    PREFIX_BONUS = 0.25
+    
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._item_grams: Dict[str, tuple] = {}
+        self._description_postings: Dict[str, set] = {}
+        self._category_postings: Dict[str, set] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.queries = 0
+    
+    def _stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.refresh_interval > 0 and time.monotonic() - self._loaded_at > self.refresh_interval
+    
+    async def ensure_loaded(self):
+        if not self._stale():
+            return
+        async with self._lock:
+            if not self._stale():
+                return
+            projection = {field: 1 for field in MASTER_ITEM_SUGGEST_FIELDS}
+            projection["_id"] = 0
+            items = await db.master_items.find({}, projection).to_list(None)
+            self._reset()
+            for item in items:
+                self.upsert(item)
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+    
+    def _reset(self):
+        self._items = {}
+        self._item_grams = {}
+        self._description_postings = {}
+        self._category_postings = {}
+    
+    def invalidate(self):
+        """Force a full reload on the next query"""
+        self._loaded_at = None
+    
+    def upsert(self, item: Dict[str, Any]):
+        item_id = item.get("id")
+        if not item_id:
+            return
+        self.remove(item_id)
+        payload = {field: item.get(field) for field in MASTER_ITEM_SUGGEST_FIELDS}
+        description_grams = suggest_grams(payload.get("description") or "")
+        category_grams = suggest_grams(payload.get("category") or "")
+        for gram in description_grams:
+            self._description_postings.setdefault(gram, set()).add(item_id)
+        for gram in category_grams:
+            self._category_postings.setdefault(gram, set()).add(item_id)
+        self._items[item_id] = payload
+        self._item_grams[item_id] = (description_grams, category_grams, search_terms(payload.get("description") or ""))
+    
+    def remove(self, item_id: str):
+        if item_id not in self._items:
+            return
+        description_grams, category_grams, _ = self._item_grams.pop(item_id)
+        for grams, postings in ((description_grams, self._description_postings), (category_grams, self._category_postings)):
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(item_id)
+                    if not ids:
+                        del postings[gram]
+        del self._items[item_id]
+    
+    def suggest(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Top matches by trigram overlap with the query, description weighted over category"""
+        self.queries += 1
+        query_grams = suggest_grams(query)
+        if not query_grams:
+            return []
+        terms = search_terms(query)
+        
+        description_hits = Counter()
+        category_hits = Counter()
+        for gram in query_grams:
+            description_hits.update(self._description_postings.get(gram, ()))
+            category_hits.update(self._category_postings.get(gram, ()))
+        
+        gram_count = len(query_grams)
+        base_scores = dict(category_hits)
+        for item_id, hits in base_scores.items():
+            base_scores[item_id] = self.CATEGORY_WEIGHT * hits / gram_count
+        for item_id, hits in description_hits.items():
+            score = hits / gram_count
+            if score > base_scores.get(item_id, 0):
+                base_scores[item_id] = score
+        
+        # The prefix bonus is only worth checking for items it could lift into the top results
+        floor = MASTER_ITEM_SUGGEST_MIN_SCORE - self.PREFIX_BONUS
+        if len(base_scores) > limit:
+            floor = max(floor, heapq.nlargest(limit, base_scores.values())[-1] - self.PREFIX_BONUS)
+        
+        scored = []
+        for item_id, score in base_scores.items():
+            if score < floor:
+                continue
+            words = self._item_grams[item_id][2]
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                score += self.PREFIX_BONUS
+            if score >= MASTER_ITEM_SUGGEST_MIN_SCORE:
+                scored.append((score, self._items[item_id].get("usage_count") or 0, item_id))
+        
+        top = heapq.nlargest(limit, scored)
+        return [{**self._items[item_id], "score": round(score, 4)} for score, _, item_id in top]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._items),
+            "grams": len(self._description_postings) + len(self._category_postings),
+            "loaded": self._loaded_at is not None,
+            "refresh_interval_seconds": self.refresh_interval,
+            "loads": self.loads,
+            "queries": self.queries
+        }
+
+master_item_suggest_index = MasterItemSuggestIndex(MASTER_ITEM_SUGGEST_REFRESH_SECONDS)
+
 @api_router.post("/item-master", response_model=dict)
 async def create_master_item(item_data: MasterItem, current_user: dict = Depends(get_current_user)):
     """Create a new master item"""
@@ -2640,17 +4959,17 @@ async def create_master_item(item_data: MasterItem, current_user: dict = Depends
         item_data.updated_at = datetime.utcnow()
         
         # Check if similar item already exists
-        import re as regex_module
-        escaped_description = regex_module.escape(item_data.description)
-        existing_item = await db.master_items.find_one({
-            "description": {"$regex": f"^{escaped_description}$", "$options": "i"},
-            "unit": item_data.unit
-        })
+        description_key = master_item_key(item_data.description)
+        existing_item = await db.master_items.find_one({"description_key": description_key, "unit": item_data.unit})
         
         if existing_item:
             raise HTTPException(status_code=400, detail="Similar item already exists in master")
         
-        await db.master_items.insert_one(item_data.dict())
+        try:
+            await db.master_items.insert_one({**item_data.dict(), "description_key": description_key})
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Similar item already exists in master")
+        master_item_suggest_index.upsert(item_data.dict())
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -2691,6 +5010,21 @@ async def get_master_items(
         logger.error(f"Error fetching master items: {str(e)}")
         return []
 
+@api_router.get("/item-master/suggest")
+async def suggest_master_items(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """Ranked master item matches for BOQ description autocomplete (typo tolerant)"""
+    try:
+        await master_item_suggest_index.ensure_loaded()
+        return master_item_suggest_index.suggest(q, limit)
+        
+    except Exception as e:
+        logger.error(f"Error suggesting master items: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to suggest master items: {str(e)}")
+
 @api_router.put("/item-master/{item_id}", response_model=dict)
 async def update_master_item(
     item_id: str, 
@@ -2709,12 +5043,18 @@ async def update_master_item(
         # Update only allowed fields
         allowed_fields = ["description", "unit", "standard_rate", "category"]
         update_data = {k: v for k, v in updated_data.items() if k in allowed_fields}
+        if "description" in update_data:
+            update_data["description_key"] = master_item_key(update_data["description"])
         update_data["updated_at"] = datetime.utcnow()
         
-        await db.master_items.update_one(
-            {"id": item_id},
-            {"$set": update_data}
-        )
+        try:
+            await db.master_items.update_one(
+                {"id": item_id},
+                {"$set": update_data}
+            )
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Similar item already exists in master")
+        master_item_suggest_index.upsert({**item, **update_data})
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -2741,6 +5081,7 @@ async def delete_master_item(item_id: str, current_user: dict = Depends(get_curr
             raise HTTPException(status_code=404, detail="Master item not found")
         
         await db.master_items.delete_one({"id": item_id})
+        master_item_suggest_index.remove(item_id)
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -2762,56 +5103,43 @@ async def auto_populate_master_items(current_user: dict = Depends(get_current_us
         if current_user["role"] not in [UserRole.SUPER_ADMIN, UserRole.INVOICE_CREATOR]:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         
-        # Get all projects and extract unique BOQ items
-        projects = await db.projects.find().to_list(1000)
+        # Stream BOQ lines from every project and fold them per (description_key, unit)
         unique_items = {}
-        
-        for project in projects:
-            for boq_item in project.get("boq_items", []):
-                description = boq_item.get("description", "").strip()
-                unit = boq_item.get("unit", "nos").strip()
-                rate = boq_item.get("rate", 0)
-                
-                if description and len(description) > 3:
-                    key = f"{description.lower()}_{unit.lower()}"
-                    
-                    if key not in unique_items:
-                        unique_items[key] = {
-                            "description": description,
-                            "unit": unit,
-                            "rates": [rate],
-                            "count": 1
-                        }
-                    else:
-                        unique_items[key]["rates"].append(rate)
-                        unique_items[key]["count"] += 1
-        
-        # Create master items
-        created_count = 0
-        for item_data in unique_items.values():
-            # Calculate average rate
-            valid_rates = [r for r in item_data["rates"] if r > 0]
-            avg_rate = sum(valid_rates) / len(valid_rates) if valid_rates else 0
-            
-            # Check if item already exists
-            import re as regex_module
-            escaped_description = regex_module.escape(item_data['description'])
-            existing = await db.master_items.find_one({
-                "description": {"$regex": f"^{escaped_description}$", "$options": "i"},
-                "unit": item_data["unit"]
-            })
-            
-            if not existing:
-                master_item = MasterItem(
-                    description=item_data["description"],
-                    unit=item_data["unit"],
-                    standard_rate=avg_rate,
-                    usage_count=item_data["count"],
-                    created_by=current_user["id"]
-                )
+        async for project in db.projects.find({}, {"_id": 0, "boq_items.description": 1, "boq_items.unit": 1, "boq_items.rate": 1}):
+            for boq_item in project.get("boq_items") or []:
+                description = str(boq_item.get("description") or "").strip()
+                unit = str(boq_item.get("unit") or "nos").strip()
+                try:
+                    rate = float(boq_item.get("rate") or 0)
+                except (TypeError, ValueError):
+                    rate = 0.0
                 
-                await db.master_items.insert_one(master_item.dict())
-                created_count += 1
+                if description and len(description) > 3:
+                    entry = unique_items.setdefault((master_item_key(description), unit), {
+                        "description": description, "count": 0, "rate_sum": 0.0, "rate_count": 0
+                    })
+                    entry["count"] += 1
+                    if rate > 0:
+                        entry["rate_sum"] += rate
+                        entry["rate_count"] += 1
+        
+        # Upsert in batches; the unique (description_key, unit) index makes this safe to run concurrently
+        created_count = 0
+        updated_count = 0
+        now = datetime.utcnow()
+        batch = []
+        for index, ((key, unit), entry) in enumerate(unique_items.items(), start=1):
+            batch.append(master_item_upsert(
+                key, unit, entry["description"], entry["count"], entry["rate_sum"], entry["rate_count"],
+                current_user["id"], now
+            ))
+            if len(batch) >= MASTER_ITEM_BULK_BATCH_SIZE or index == len(unique_items):
+                result = await db.master_items.bulk_write(batch, ordered=False)
+                created_count += result.upserted_count
+                updated_count += result.modified_count
+                batch = []
+        if created_count or updated_count:
+            master_item_suggest_index.invalidate()
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -2821,6 +5149,7 @@ async def auto_populate_master_items(current_user: dict = Depends(get_current_us
         return {
             "message": f"Successfully created {created_count} master items",
             "created_count": created_count,
+            "updated_count": updated_count,
             "total_unique_items": len(unique_items)
         }
         
@@ -2842,79 +5171,56 @@ async def global_search(
     try:
         results = {"projects": [], "clients": [], "invoices": [], "total_count": 0}
         
-        search_regex = {"$regex": query, "$options": "i"}
-        
-        # Search projects
-        if not entity_type or entity_type in ["projects", "all"]:
-            project_query = {"$or": [
-                {"project_name": search_regex},
-                {"client_name": search_regex},
-                {"architect": search_regex}
-            ]}
-            projects = await db.projects.find(project_query).limit(limit).to_list(limit)
-            results["projects"] = [
-                {
-                    "id": p.get("id"),
-                    "project_name": p.get("project_name"),
-                    "client_name": p.get("client_name"),
-                    "architect": p.get("architect"),
-                    "total_value": p.get("total_project_value", 0),
-                    "type": "project"
-                } for p in projects
-            ]
+        if entity_type and entity_type != "all" and entity_type not in SEARCH_ENTITIES:
+            raise HTTPException(status_code=400, detail="entity_type must be projects, clients, invoices or all")
         
-        # Search clients
-        if not entity_type or entity_type in ["clients", "all"]:
-            client_query = {"$or": [
-                {"name": search_regex},
-                {"bill_to_address": search_regex},
-                {"gst_no": search_regex}
-            ]}
-            clients = await db.clients.find(client_query).limit(limit).to_list(limit)
-            results["clients"] = [
-                {
-                    "id": c.get("id"),
-                    "name": c.get("name"),
-                    "bill_to_address": c.get("bill_to_address"),
-                    "gst_no": c.get("gst_no"),
-                    "type": "client"
-                } for c in clients
-            ]
+        terms = list(dict.fromkeys(search_terms(query)))
+        if not terms:
+            return results
         
-        # Search invoices
-        if not entity_type or entity_type in ["invoices", "all"]:
-            invoice_query = {"$or": [
-                {"invoice_number": search_regex},
-                {"ra_number": search_regex},
-                {"project_name": search_regex},
-                {"client_name": search_regex}
-            ]}
-            invoices = await db.invoices.find(invoice_query).limit(limit).to_list(limit)
-            results["invoices"] = [
-                {
-                    "id": i.get("id"),
-                    "invoice_number": i.get("invoice_number"),
-                    "ra_number": i.get("ra_number"),
-                    "project_name": i.get("project_name"),
-                    "client_name": i.get("client_name"),
-                    "total_amount": i.get("total_amount", 0),
-                    "status": i.get("status"),
-                    "type": "invoice"
-                } for i in invoices
-            ]
+        entity_types = [entity_type] if entity_type in SEARCH_ENTITIES else list(SEARCH_ENTITIES)
+        deadline = time.monotonic() + SEARCH_LATENCY_BUDGET_MS / 1000
+        outcomes = await asyncio.gather(*[
+            _search_entity_type(name, terms, limit, deadline) for name in entity_types
+        ])
+        
+        partial = False
+        for name, (payloads, truncated) in zip(entity_types, outcomes):
+            results[name] = payloads
+            partial = partial or truncated
         
         results["total_count"] = len(results["projects"]) + len(results["clients"]) + len(results["invoices"])
+        results["partial"] = partial
+        
+        return results
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in global search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@api_router.post("/admin/search-index/rebuild")
+async def rebuild_search_index_endpoint(current_user: dict = Depends(get_current_user)):
+    """Rebuild the global search index from projects, clients and invoices"""
+    try:
+        if current_user["role"] != UserRole.SUPER_ADMIN:
+            raise HTTPException(status_code=403, detail="Only super admin can rebuild the search index")
+        
+        counts = await rebuild_search_index()
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
-            "global_search", f"Performed global search for: {query}"
+            "search_index_rebuilt", f"Rebuilt search index: {counts}"
         )
         
-        return results
+        return {"message": "Search index rebuilt successfully", "counts": counts}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in global search: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+        logger.error(f"Error rebuilding search index: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild search index: {str(e)}")
 
 @api_router.get("/filters/projects")
 async def get_filtered_projects(
@@ -2925,10 +5231,13 @@ async def get_filtered_projects(
     min_value: Optional[float] = None,
     max_value: Optional[float] = None,
     status: Optional[str] = None,
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """Get filtered projects with advanced filtering"""
     try:
+        summary_fields = resolve_summary_fields(view, fields, PROJECT_SUMMARY_DEFAULTS)
         query = {}
         
         if client_id:
@@ -2953,6 +5262,10 @@ async def get_filtered_projects(
                 value_query["$lte"] = max_value
             query["total_project_value"] = value_query
             
+        if summary_fields:
+            projects = await db.projects.find(query, summary_projection(summary_fields)).sort("created_at", -1).to_list(1000)
+            return summary_response(summary_rows(projects, summary_fields, PROJECT_SUMMARY_DEFAULTS))
+        
         projects = await db.projects.find(query).sort("created_at", -1).to_list(1000)
         
         # Filter and validate projects (same as get_projects endpoint)
@@ -2986,6 +5299,8 @@ async def get_filtered_projects(
         
         return valid_projects
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error filtering projects: {str(e)}")
         return []
@@ -3099,6 +5414,236 @@ async def get_filtered_invoices(
         logger.error(f"Error filtering invoices: {str(e)}")
         return []
 
+# GST rollups
+# gst_rollups holds running totals per month x invoice type x status ("invoice"
+# rows) and per month x GST rate x invoice type x status ("item" rows). They are
+# maintained with $inc on invoice create, so the GST report reads a handful of
+# documents; months only partly covered by a date filter are aggregated from the
+# raw invoices instead. As with the billing ledger, invoices carry
+# gst_rollup_applied once counted, and older invoices are claimed one at a time.
+GST_ROLLUP_AMOUNT_FIELDS = ("taxable_amount", "gst_amount", "total_amount")
+GST_ROLLUP_RECONCILE_ATTEMPTS = 5
+
+def _month_key(value) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if not isinstance(value, datetime):
+        value = datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m")
+
+def _month_bounds(month: str) -> tuple:
+    start = datetime.strptime(month, "%Y-%m")
+    end = datetime(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start, end
+
+def _gst_rollup_id(row: Dict[str, Any]) -> str:
+    if row["kind"] == "item":
+        return f"item|{row['month']}|{float(row['gst_rate'])}|{row['invoice_type']}|{row['status']}"
+    return f"invoice|{row['month']}|{row['invoice_type']}|{row['status']}"
+
+def _gst_rows_for_invoice(invoice: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rollup deltas contributed by one invoice"""
+    month = _month_key(invoice.get("created_at"))
+    invoice_type = invoice.get("invoice_type", "proforma")
+    status = invoice.get("status", "draft")
+    rows = [{
+        "kind": "invoice", "month": month, "invoice_type": invoice_type, "status": status,
+        "invoice_count": 1,
+        "taxable_amount": invoice.get("subtotal", 0),
+        "gst_amount": invoice.get("total_gst_amount", invoice.get("gst_amount", 0)),
+        "total_amount": invoice.get("total_amount", 0)
+    }]
+    items_by_rate = {}
+    for item in invoice.get("items", []):
+        rate = float(item.get("gst_rate", 18.0))
+        row = items_by_rate.setdefault(rate, {
+            "kind": "item", "month": month, "gst_rate": rate, "invoice_type": invoice_type, "status": status,
+            "taxable_amount": 0.0, "gst_amount": 0.0, "total_amount": 0.0
+        })
+        row["taxable_amount"] += item.get("amount", 0)
+        row["gst_amount"] += item.get("gst_amount", 0)
+        row["total_amount"] += item.get("total_with_gst", 0)
+    rows.extend(items_by_rate.values())
+    return rows
+
+async def _apply_gst_rows(rows: List[Dict[str, Any]]):
+    now = datetime.utcnow()
+    operations = []
+    for row in rows:
+        amounts = {field: row[field] for field in GST_ROLLUP_AMOUNT_FIELDS + ("invoice_count",) if field in row}
+        keys = {field: value for field, value in row.items() if field not in amounts}
+        operations.append(UpdateOne(
+            {"_id": _gst_rollup_id(row)},
+            {"$inc": amounts, "$set": {**keys, "updated_at": now}},
+            upsert=True
+        ))
+    if operations:
+        await db.gst_rollups.bulk_write(operations, ordered=False)
+
+async def apply_invoice_to_gst_rollups(invoice: Dict[str, Any]):
+    await _apply_gst_rows(_gst_rows_for_invoice(invoice))
+
+async def claim_unrolled_invoices() -> int:
+    """Add invoices that predate the rollups, each claimed exactly once"""
+    claimed = 0
+    async for candidate in db.invoices.find({"gst_rollup_applied": {"$exists": False}}, {"_id": 1}):
+        invoice = await db.invoices.find_one_and_update(
+            {"_id": candidate["_id"], "gst_rollup_applied": {"$exists": False}},
+            {"$set": {"gst_rollup_applied": True}},
+            projection={"_id": 0, "search_tokens": 0}
+        )
+        if invoice is not None:
+            await apply_invoice_to_gst_rollups(invoice)
+            claimed += 1
+    if claimed:
+        logger.info(f"Added {claimed} existing invoices to the GST rollups")
+    return claimed
+
+async def aggregate_gst_rows(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compute rollup rows straight from the invoices collection"""
+    month_expr = {"$dateToString": {"format": "%Y-%m", "date": {"$ifNull": [
+        {"$convert": {"input": "$created_at", "to": "date", "onError": None, "onNull": None}}, "$$NOW"
+    ]}}}
+    group_keys = {
+        "month": month_expr,
+        "invoice_type": {"$ifNull": ["$invoice_type", "proforma"]},
+        "status": {"$ifNull": ["$status", "draft"]}
+    }
+    invoice_rows = await db.invoices.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": group_keys,
+            "invoice_count": {"$sum": 1},
+            "taxable_amount": {"$sum": "$subtotal"},
+            "gst_amount": {"$sum": {"$ifNull": ["$total_gst_amount", {"$ifNull": ["$gst_amount", 0]}]}},
+            "total_amount": {"$sum": "$total_amount"}
+        }}
+    ]).to_list(None)
+    item_rows = await db.invoices.aggregate([
+        {"$match": match},
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": {**group_keys, "gst_rate": {"$toDouble": {"$ifNull": ["$items.gst_rate", 18.0]}}},
+            "taxable_amount": {"$sum": "$items.amount"},
+            "gst_amount": {"$sum": "$items.gst_amount"},
+            "total_amount": {"$sum": "$items.total_with_gst"}
+        }}
+    ]).to_list(None)
+    
+    rows = []
+    for kind, grouped in (("invoice", invoice_rows), ("item", item_rows)):
+        for row in grouped:
+            keys = row.pop("_id")
+            rows.append({"kind": kind, **keys, **row})
+    return rows
+
+def _gst_rollup_drift(expected: Dict[str, Dict[str, Any]], stored: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    mismatched = []
+    for rollup_id, row in expected.items():
+        current = stored.get(rollup_id)
+        for field in GST_ROLLUP_AMOUNT_FIELDS + ("invoice_count",):
+            if field not in row:
+                continue
+            if current is None or abs(current.get(field, 0) - row[field]) > 0.01:
+                mismatched.append({"id": rollup_id, "field": field, "expected": row[field], "stored": (current or {}).get(field)})
+                break
+    return mismatched
+
+async def rebuild_gst_rollups(apply: bool = True) -> Dict[str, Any]:
+    """Recompute rollups from raw invoices, report drift and optionally correct it
+    
+    Corrections are written as $inc of (expected - stored) so increments from
+    invoices created meanwhile survive. Expected rows are aggregated before the
+    stored ones are read; if the invoice counts disagree an increment is still in
+    flight and we retry.
+    """
+    claimed = await claim_unrolled_invoices() if apply else 0
+    applied = {"gst_rollup_applied": True} if apply else {}
+    
+    for attempt in range(GST_ROLLUP_RECONCILE_ATTEMPTS):
+        expected = {_gst_rollup_id(row): row for row in await aggregate_gst_rows(applied)}
+        stored = {row["_id"]: row async for row in db.gst_rollups.find({})}
+        expected_count = sum(row.get("invoice_count", 0) for row in expected.values())
+        stored_count = sum(row.get("invoice_count", 0) for row in stored.values())
+        if expected_count == stored_count:
+            break
+        await asyncio.sleep(0.05 * (attempt + 1))
+    
+    mismatched = _gst_rollup_drift(expected, stored)
+    # Stale rows are zeroed rather than deleted, which could race a create's $inc
+    stale = [
+        rollup_id for rollup_id, row in stored.items()
+        if rollup_id not in expected and any(abs(row.get(field, 0)) > 0.01 for field in GST_ROLLUP_AMOUNT_FIELDS + ("invoice_count",))
+    ]
+    
+    if apply and (mismatched or stale):
+        now = datetime.utcnow()
+        operations = []
+        for rollup_id in {entry["id"] for entry in mismatched} | set(stale):
+            current = stored.get(rollup_id, {})
+            row = expected.get(rollup_id, {})
+            deltas = {
+                field: row.get(field, 0) - current.get(field, 0)
+                for field in GST_ROLLUP_AMOUNT_FIELDS + ("invoice_count",)
+                if field in row or field in current
+            }
+            keys = {field: value for field, value in (row or current).items() if field not in deltas and field not in ("_id", "updated_at")}
+            operations.append(UpdateOne(
+                {"_id": rollup_id},
+                {"$inc": deltas, "$set": {**keys, "updated_at": now}},
+                upsert=True
+            ))
+        await db.gst_rollups.bulk_write(operations, ordered=False)
+    
+    return {
+        "rollups": len(expected),
+        "in_sync": not mismatched and not stale,
+        "mismatched": mismatched[:100],
+        "mismatched_count": len(mismatched),
+        "stale": stale[:100],
+        "stale_count": len(stale),
+        "claimed_invoices": claimed,
+        "applied": apply
+    }
+
+async def _load_gst_rows(start: Optional[datetime], end: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Rollup rows for whole months in [start, end]; boundary months are aggregated from invoices"""
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    partial_months = []
+    month_filter = {}
+    if start is not None:
+        month = _month_key(start)
+        if start > _month_bounds(month)[0]:
+            partial_months.append(month)
+            month_filter["$gt"] = month
+        else:
+            month_filter["$gte"] = month
+    if end is not None:
+        month = _month_key(end)
+        if end < _month_bounds(month)[1] - timedelta(milliseconds=1):
+            if month not in partial_months:
+                partial_months.append(month)
+            month_filter["$lt"] = month
+        else:
+            month_filter["$lte"] = month
+    
+    rollup_query = {"month": month_filter} if month_filter else {}
+    rows = [row async for row in db.gst_rollups.find(rollup_query, {"_id": 0})]
+    
+    for month in partial_months:
+        month_start, month_end = _month_bounds(month)
+        created_at = {"$gte": max(month_start, start) if start else month_start, "$lt": month_end}
+        if end is not None and end < month_end:
+            created_at = {"$gte": created_at["$gte"], "$lte": end}
+        rows.extend(await aggregate_gst_rows({"created_at": created_at}))
+    return rows
+
 # Reports and Insights
 @api_router.get("/reports/gst-summary")
 async def get_gst_summary(
@@ -3117,10 +5662,10 @@ async def get_gst_summary(
                 date_query["$lte"] = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
             query["created_at"] = date_query
         
-        invoices = await db.invoices.find(query).to_list(1000)
+        rows = await _load_gst_rows(query.get("created_at", {}).get("$gte"), query.get("created_at", {}).get("$lte"))
         
         gst_summary = {
-            "total_invoices": len(invoices),
+            "total_invoices": 0,
             "total_taxable_amount": 0,
             "total_gst_amount": 0,
             "total_amount_with_gst": 0,
@@ -3129,42 +5674,34 @@ async def get_gst_summary(
             "invoice_type_breakdown": {"proforma": 0, "tax_invoice": 0}
         }
         
-        for invoice in invoices:
-            subtotal = invoice.get("subtotal", 0)
-            gst_amount = invoice.get("total_gst_amount", invoice.get("gst_amount", 0))
-            total_amount = invoice.get("total_amount", 0)
-            invoice_type = invoice.get("invoice_type", "proforma")
-            
-            gst_summary["total_taxable_amount"] += subtotal
-            gst_summary["total_gst_amount"] += gst_amount
-            gst_summary["total_amount_with_gst"] += total_amount
-            gst_summary["invoice_type_breakdown"][invoice_type] += total_amount
-            
-            # Monthly breakdown
-            created_at = invoice.get("created_at", datetime.utcnow())
-            if isinstance(created_at, str):
-                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            
-            month_key = created_at.strftime("%Y-%m")
-            if month_key not in gst_summary["monthly_breakdown"]:
-                gst_summary["monthly_breakdown"][month_key] = {
-                    "month": created_at.strftime("%B %Y"),
-                    "total_invoices": 0,
-                    "taxable_amount": 0,
-                    "gst_amount": 0,
-                    "total_amount": 0
-                }
-            
-            gst_summary["monthly_breakdown"][month_key]["total_invoices"] += 1
-            gst_summary["monthly_breakdown"][month_key]["taxable_amount"] += subtotal
-            gst_summary["monthly_breakdown"][month_key]["gst_amount"] += gst_amount
-            gst_summary["monthly_breakdown"][month_key]["total_amount"] += total_amount
-            
-            # GST rate breakdown
-            for item in invoice.get("items", []):
-                gst_rate = item.get("gst_rate", 18.0)
-                item_gst_amount = item.get("gst_amount", 0)
+        for row in sorted(rows, key=lambda r: r["month"]):
+            if row["kind"] == "invoice":
+                gst_summary["total_invoices"] += row["invoice_count"]
+                gst_summary["total_taxable_amount"] += row["taxable_amount"]
+                gst_summary["total_gst_amount"] += row["gst_amount"]
+                gst_summary["total_amount_with_gst"] += row["total_amount"]
+                gst_summary["invoice_type_breakdown"][row["invoice_type"]] = (
+                    gst_summary["invoice_type_breakdown"].get(row["invoice_type"], 0) + row["total_amount"]
+                )
+                
+                # Monthly breakdown
+                month_key = row["month"]
+                if month_key not in gst_summary["monthly_breakdown"]:
+                    gst_summary["monthly_breakdown"][month_key] = {
+                        "month": datetime.strptime(month_key, "%Y-%m").strftime("%B %Y"),
+                        "total_invoices": 0,
+                        "taxable_amount": 0,
+                        "gst_amount": 0,
+                        "total_amount": 0
+                    }
                 
+                gst_summary["monthly_breakdown"][month_key]["total_invoices"] += row["invoice_count"]
+                gst_summary["monthly_breakdown"][month_key]["taxable_amount"] += row["taxable_amount"]
+                gst_summary["monthly_breakdown"][month_key]["gst_amount"] += row["gst_amount"]
+                gst_summary["monthly_breakdown"][month_key]["total_amount"] += row["total_amount"]
+            else:
+                # GST rate breakdown
+                gst_rate = row["gst_rate"]
                 if gst_rate not in gst_summary["gst_breakdown"]:
                     gst_summary["gst_breakdown"][gst_rate] = {
                         "rate": gst_rate,
@@ -3173,9 +5710,14 @@ async def get_gst_summary(
                         "total_amount": 0
                     }
                 
-                gst_summary["gst_breakdown"][gst_rate]["taxable_amount"] += item.get("amount", 0)
-                gst_summary["gst_breakdown"][gst_rate]["gst_amount"] += item_gst_amount
-                gst_summary["gst_breakdown"][gst_rate]["total_amount"] += item.get("total_with_gst", 0)
+                gst_summary["gst_breakdown"][gst_rate]["taxable_amount"] += row["taxable_amount"]
+                gst_summary["gst_breakdown"][gst_rate]["gst_amount"] += row["gst_amount"]
+                gst_summary["gst_breakdown"][gst_rate]["total_amount"] += row["total_amount"]
+        
+        # Skip months whose rollups have been zeroed out
+        gst_summary["monthly_breakdown"] = {
+            key: month for key, month in gst_summary["monthly_breakdown"].items() if month["total_invoices"]
+        }
         
         # Convert dict to list for better frontend handling
         gst_summary["monthly_breakdown"] = list(gst_summary["monthly_breakdown"].values())
@@ -3188,150 +5730,219 @@ async def get_gst_summary(
         
         return gst_summary
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating GST summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate GST summary: {str(e)}")
 
+@api_router.post("/admin/gst-rollups/rebuild")
+async def rebuild_gst_rollups_endpoint(verify_only: bool = False, current_user: dict = Depends(get_current_user)):
+    """Recompute GST rollups from invoices and report any drift (verify_only leaves them untouched)"""
+    try:
+        if current_user["role"] != UserRole.SUPER_ADMIN:
+            raise HTTPException(status_code=403, detail="Only super admin can rebuild GST rollups")
+        
+        result = await rebuild_gst_rollups(apply=not verify_only)
+        
+        if not verify_only:
+            await log_activity(
+                current_user["id"], current_user["email"], current_user["role"],
+                "gst_rollups_rebuilt", f"Rebuilt GST rollups ({result['mismatched_count']} mismatched, {result['stale_count']} stale)"
+            )
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rebuilding GST rollups: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild GST rollups: {str(e)}")
+
+# Insights report, shared across users; 0 disables
+INSIGHTS_CACHE_TTL_SECONDS = float(os.environ.get("INSIGHTS_CACHE_TTL_SECONDS", "60"))
+insights_cache = TTLCache("insights", INSIGHTS_CACHE_TTL_SECONDS, 1)
+INSIGHTS_TREND_MONTHS = 6
+
+def _recent_month_starts(now: datetime, count: int) -> List[datetime]:
+    """First day of the current calendar month and the count-1 before it, newest first"""
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(count):
+        starts.append(datetime(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return starts
+
+async def compute_insights() -> Dict[str, Any]:
+    """Build the insights report with one aggregation per collection"""
+    now = datetime.utcnow()
+    month_starts = _recent_month_starts(now, INSIGHTS_TREND_MONTHS)
+    month_keys = [m.strftime("%Y-%m") for m in month_starts]
+    month_expr = {"$dateToString": {"format": "%Y-%m", "date": {"$ifNull": [
+        {"$convert": {"input": "$created_at", "to": "date", "onError": None, "onNull": None}}, "$$NOW"
+    ]}}}
+    
+    project_facets = await db.projects.aggregate([
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "total_project_value": {"$sum": "$total_project_value"},
+                "total_advance_received": {"$sum": "$advance_received"},
+                "total_pending_payment": {"$sum": "$pending_payment"}
+            }}],
+            "top_clients": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$client_name", "Unknown"]},
+                    "total_value": {"$sum": "$total_project_value"}
+                }},
+                {"$sort": {"total_value": -1, "_id": 1}},
+                {"$limit": 5}
+            ]
+        }}
+    ]).to_list(1)
+    invoice_facets = await db.invoices.aggregate([
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "total_invoiced_value": {"$sum": "$total_amount"}
+            }}],
+            "monthly": [
+                {"$project": {"month": month_expr, "total_amount": 1}},
+                {"$match": {"month": {"$in": month_keys}}},
+                {"$group": {
+                    "_id": "$month",
+                    "invoices_count": {"$sum": 1},
+                    "invoices_value": {"$sum": "$total_amount"}
+                }}
+            ]
+        }}
+    ]).to_list(1)
+    active_user_rows = await db.activity_logs.aggregate([
+        {"$match": {"timestamp": {"$gte": now - timedelta(days=30)}}},
+        {"$group": {"_id": "$user_email"}},
+        {"$count": "active_users"}
+    ]).to_list(1)
+    total_clients = await db.clients.count_documents({})
+    
+    project_facets = project_facets[0] if project_facets else {}
+    invoice_facets = invoice_facets[0] if invoice_facets else {}
+    project_totals = (project_facets.get("totals") or [{}])[0]
+    invoice_totals = (invoice_facets.get("totals") or [{}])[0]
+    total_projects = project_totals.get("count", 0)
+    total_invoices = invoice_totals.get("count", 0)
+    total_project_value = project_totals.get("total_project_value", 0)
+    total_advance_received = project_totals.get("total_advance_received", 0)
+    total_pending_payment = project_totals.get("total_pending_payment", 0)
+    total_invoiced_value = invoice_totals.get("total_invoiced_value", 0)
+    active_users = active_user_rows[0]["active_users"] if active_user_rows else 0
+    
+    monthly = {row["_id"]: row for row in invoice_facets.get("monthly", [])}
+    monthly_data = [
+        {
+            "month": month_start.strftime("%B %Y"),
+            "invoices_count": monthly.get(key, {}).get("invoices_count", 0),
+            "invoices_value": monthly.get(key, {}).get("invoices_value", 0)
+        }
+        for month_start, key in zip(month_starts, month_keys)
+    ]
+    top_clients = [
+        {"name": row["_id"], "total_value": row["total_value"]}
+        for row in project_facets.get("top_clients", [])
+    ]
+    
+    return {
+        "overview": {
+            "total_projects": total_projects,
+            "total_clients": total_clients,
+            "total_invoices": total_invoices,
+            "active_users": active_users
+        },
+        "financial": {
+            "total_project_value": total_project_value,
+            "total_advance_received": total_advance_received,
+            "total_pending_payment": total_pending_payment,
+            "total_invoiced_value": total_invoiced_value,
+            "collection_percentage": (total_advance_received / total_project_value * 100) if total_project_value > 0 else 0
+        },
+        "trends": {
+            "monthly_data": monthly_data,
+            "top_clients": top_clients
+        },
+        "performance": {
+            "avg_project_value": total_project_value / total_projects if total_projects > 0 else 0,
+            "avg_invoice_value": total_invoiced_value / total_invoices if total_invoices > 0 else 0,
+            "projects_per_client": total_projects / total_clients if total_clients > 0 else 0
+        }
+    }
+
 @api_router.get("/reports/insights")
 async def get_insights(current_user: dict = Depends(get_current_user)):
     """Get business insights and analytics"""
     try:
-        # Get current date
-        now = datetime.utcnow()
-        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_month = (current_month - timedelta(days=1)).replace(day=1)
-        
-        # Basic counts
-        total_projects = await db.projects.count_documents({})
-        total_clients = await db.clients.count_documents({})
-        total_invoices = await db.invoices.count_documents({})
-        
-        # Financial data
-        projects = await db.projects.find().to_list(1000)
-        invoices = await db.invoices.find().to_list(1000)
-        
-        # Calculate project insights
-        total_project_value = sum(p.get("total_project_value", 0) for p in projects)
-        total_advance_received = sum(p.get("advance_received", 0) for p in projects)
-        total_pending_payment = sum(p.get("pending_payment", 0) for p in projects)
-        
-        # Calculate invoice insights
-        total_invoiced_value = sum(i.get("total_amount", 0) for i in invoices)
-        
-        # Monthly trends (last 6 months)
-        monthly_data = {}
-        for i in range(6):
-            month_start = (current_month - timedelta(days=i * 30)).replace(day=1)
-            month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(seconds=1)
-            month_key = month_start.strftime("%Y-%m")
-            
-            monthly_invoices = [
-                inv for inv in invoices 
-                if month_start <= datetime.fromisoformat(str(inv.get("created_at", now)).replace('Z', '+00:00')) <= month_end
-            ]
-            
-            monthly_data[month_key] = {
-                "month": month_start.strftime("%B %Y"),
-                "invoices_count": len(monthly_invoices),
-                "invoices_value": sum(inv.get("total_amount", 0) for inv in monthly_invoices)
-            }
-        
-        # Top clients by value
-        client_values = {}
-        for project in projects:
-            client_name = project.get("client_name", "Unknown")
-            client_values[client_name] = client_values.get(client_name, 0) + project.get("total_project_value", 0)
-        
-        top_clients = sorted(
-            [{"name": k, "total_value": v} for k, v in client_values.items()],
-            key=lambda x: x["total_value"],
-            reverse=True
-        )[:5]
-        
-        # Active users (users who performed actions in last 30 days)
-        thirty_days_ago = now - timedelta(days=30)
-        recent_logs = await db.activity_logs.find({
-            "timestamp": {"$gte": thirty_days_ago}
-        }).to_list(1000)
-        
-        active_users = len(set(log.get("user_email") for log in recent_logs))
-        
-        insights = {
-            "overview": {
-                "total_projects": total_projects,
-                "total_clients": total_clients,
-                "total_invoices": total_invoices,
-                "active_users": active_users
-            },
-            "financial": {
-                "total_project_value": total_project_value,
-                "total_advance_received": total_advance_received,
-                "total_pending_payment": total_pending_payment,
-                "total_invoiced_value": total_invoiced_value,
-                "collection_percentage": (total_advance_received / total_project_value * 100) if total_project_value > 0 else 0
-            },
-            "trends": {
-                "monthly_data": list(monthly_data.values()),
-                "top_clients": top_clients
-            },
-            "performance": {
-                "avg_project_value": total_project_value / total_projects if total_projects > 0 else 0,
-                "avg_invoice_value": total_invoiced_value / total_invoices if total_invoices > 0 else 0,
-                "projects_per_client": total_projects / total_clients if total_clients > 0 else 0
-            }
-        }
+        insights = insights_cache.get("global")
+        if insights is None:
+            insights = await compute_insights()
+            insights_cache.set("global", insights)
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
             "insights_report_generated", f"Generated business insights report"
         )
         
-        return insights
+        return copy.deepcopy(insights)
         
     except Exception as e:
         logger.error(f"Error generating insights: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate insights: {str(e)}")
 
+CLIENT_SUMMARY_RECENT_INVOICES = 5
+
 @api_router.get("/reports/client-summary/{client_id}")
 async def get_client_summary(client_id: str, current_user: dict = Depends(get_current_user)):
-    """Get detailed summary for a specific client"""
+    """Get detailed summary for a specific client
+    
+    Totals are aggregated in the database; the client's projects and invoices are
+    listed page by page from /projects and /invoices under this path.
+    """
     try:
-        client = await db.clients.find_one({"id": client_id})
+        client = await db.clients.find_one({"id": client_id}, {"_id": 0})
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
-        # Get client's projects and invoices
-        projects = await db.projects.find({"client_id": client_id}).to_list(1000)
-        invoices = await db.invoices.find({"client_id": client_id}).to_list(1000)
-        
-        # Clean up data to remove ObjectIds and ensure JSON serialization
-        def clean_data(data):
-            if isinstance(data, list):
-                return [clean_data(item) for item in data]
-            elif isinstance(data, dict):
-                cleaned = {}
-                for k, v in data.items():
-                    if k == '_id':  # Skip MongoDB ObjectId
-                        continue
-                    cleaned[k] = clean_data(v)
-                return cleaned
-            else:
-                return data
-        
-        clean_client = clean_data(client)
-        clean_projects = clean_data(projects)
-        clean_invoices = clean_data(invoices)
+        project_totals = await db.projects.aggregate([
+            {"$match": {"client_id": client_id}},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "total_project_value": {"$sum": "$total_project_value"},
+                "total_advance_received": {"$sum": "$advance_received"},
+                "pending_amount": {"$sum": "$pending_payment"}
+            }}
+        ]).to_list(1)
+        invoice_totals = await db.invoices.aggregate([
+            {"$match": {"client_id": client_id}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "total_invoiced_value": {"$sum": "$total_amount"}}}
+        ]).to_list(1)
+        project_totals = project_totals[0] if project_totals else {}
+        invoice_totals = invoice_totals[0] if invoice_totals else {}
+        
+        recent_fields = list(INVOICE_SUMMARY_DEFAULTS)
+        recent_invoices, _ = await fetch_keyset_page(
+            db.invoices, {"client_id": client_id}, CLIENT_SUMMARY_RECENT_INVOICES,
+            projection=summary_projection(recent_fields)
+        )
         
         summary = {
-            "client_info": clean_client,
-            "projects_count": len(clean_projects),
-            "invoices_count": len(clean_invoices),
-            "total_project_value": sum(p.get("total_project_value", 0) for p in clean_projects),
-            "total_invoiced_value": sum(i.get("total_amount", 0) for i in clean_invoices),
-            "total_advance_received": sum(p.get("advance_received", 0) for p in clean_projects),
-            "pending_amount": sum(p.get("pending_payment", 0) for p in clean_projects),
-            "projects": clean_projects,
-            "recent_invoices": sorted(clean_invoices, key=lambda x: x.get("created_at", datetime.min), reverse=True)[:5]
+            "client_info": client,
+            "projects_count": project_totals.get("count", 0),
+            "invoices_count": invoice_totals.get("count", 0),
+            "total_project_value": project_totals.get("total_project_value", 0),
+            "total_invoiced_value": invoice_totals.get("total_invoiced_value", 0),
+            "total_advance_received": project_totals.get("total_advance_received", 0),
+            "pending_amount": project_totals.get("pending_amount", 0),
+            "recent_invoices": summary_rows(recent_invoices, recent_fields, INVOICE_SUMMARY_DEFAULTS)
         }
         
         return summary
@@ -3342,7 +5953,108 @@ async def get_client_summary(client_id: str, current_user: dict = Depends(get_cu
         logger.error(f"Error generating client summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate client summary: {str(e)}")
 
+@api_router.get("/reports/client-summary/{client_id}/projects")
+async def get_client_summary_projects(
+    client_id: str,
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Page through a client's projects as summary rows (no BOQ items)"""
+    try:
+        summary_fields = resolve_summary_fields("summary", fields, PROJECT_SUMMARY_DEFAULTS)
+        projects, next_cursor = await fetch_keyset_page(
+            db.projects, {"client_id": client_id}, limit, cursor, projection=summary_projection(summary_fields)
+        )
+        return summary_response(summary_rows(projects, summary_fields, PROJECT_SUMMARY_DEFAULTS), next_cursor)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing client projects: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list client projects: {str(e)}")
+
+@api_router.get("/reports/client-summary/{client_id}/invoices")
+async def get_client_summary_invoices(
+    client_id: str,
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Page through a client's invoices, newest first, as summary rows (no line items)"""
+    try:
+        summary_fields = resolve_summary_fields("summary", fields, INVOICE_SUMMARY_DEFAULTS)
+        invoices, next_cursor = await fetch_keyset_page(
+            db.invoices, {"client_id": client_id}, limit, cursor, projection=summary_projection(summary_fields)
+        )
+        return summary_response(summary_rows(invoices, summary_fields, INVOICE_SUMMARY_DEFAULTS), next_cursor)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing client invoices: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list client invoices: {str(e)}")
+
 # Bank Guarantee Management
+# validity_date is always stored as a naive UTC datetime so expiry is a plain
+# indexed range query. A background sweep flips active guarantees past their
+# validity date to expired; reads never write.
+BANK_GUARANTEE_EXPIRY_SWEEP_SECONDS = float(os.environ.get("BANK_GUARANTEE_EXPIRY_SWEEP_SECONDS", "300"))
+
+def normalize_validity_date(value) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid validity_date: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+async def normalize_bank_guarantee_dates(batch_size: int = 500) -> int:
+    """Convert validity_date values stored as strings to datetimes"""
+    updated = 0
+    batch = []
+    async for guarantee in db.bank_guarantees.find({"validity_date": {"$type": "string"}}, {"validity_date": 1}):
+        try:
+            validity_date = normalize_validity_date(guarantee["validity_date"])
+        except ValueError:
+            logger.warning(f"Bank guarantee {guarantee['_id']} has an unparseable validity_date: {guarantee['validity_date']!r}")
+            continue
+        batch.append(UpdateOne({"_id": guarantee["_id"]}, {"$set": {"validity_date": validity_date}}))
+        if len(batch) >= batch_size:
+            await db.bank_guarantees.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.bank_guarantees.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    if updated:
+        logger.info(f"Normalized validity_date on {updated} bank guarantees")
+    return updated
+
+async def expire_bank_guarantees() -> Dict[str, Any]:
+    """Mark every active guarantee past its validity date as expired"""
+    now = datetime.utcnow()
+    result = await db.bank_guarantees.update_many(
+        {"status": "active", "validity_date": {"$lt": now}},
+        {"$set": {"status": "expired", "updated_at": now}}
+    )
+    if result.modified_count:
+        bank_guarantee_summary_cache.clear()
+        logger.info(f"Expired {result.modified_count} bank guarantees")
+    return {"expired": result.modified_count}
+
+# Summaries keyed by expiry horizon; cleared on every guarantee write
+BANK_GUARANTEE_EXPIRY_HORIZONS = (30, 60, 90)
+BANK_GUARANTEE_SUMMARY_CACHE_TTL_SECONDS = float(os.environ.get("BANK_GUARANTEE_SUMMARY_CACHE_TTL_SECONDS", "30"))
+bank_guarantee_summary_cache = TTLCache("bank_guarantee_summary", BANK_GUARANTEE_SUMMARY_CACHE_TTL_SECONDS, len(BANK_GUARANTEE_EXPIRY_HORIZONS))
+
+bank_guarantee_expiry_sweeper = PeriodicTask("bank_guarantee_expiry", BANK_GUARANTEE_EXPIRY_SWEEP_SECONDS, expire_bank_guarantees)
+
 @api_router.post("/bank-guarantees", response_model=dict)
 async def create_bank_guarantee(guarantee_data: BankGuarantee, current_user: dict = Depends(get_current_user)):
     """Create a new bank guarantee"""
@@ -3356,6 +6068,7 @@ async def create_bank_guarantee(guarantee_data: BankGuarantee, current_user: dic
         guarantee_data.updated_at = datetime.utcnow()
         
         await db.bank_guarantees.insert_one(guarantee_data.dict())
+        bank_guarantee_summary_cache.clear()
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -3384,24 +6097,19 @@ async def get_bank_guarantees(
         if project_id:
             query["project_id"] = project_id
             
-        if status:
+        # Guarantees past their validity date count as expired even before the next sweep
+        now = datetime.utcnow()
+        if status == "active":
+            query.update({"status": "active", "validity_date": {"$not": {"$lt": now}}})
+        elif status == "expired":
+            query["$or"] = [{"status": "expired"}, {"status": "active", "validity_date": {"$lt": now}}]
+        elif status:
             query["status"] = status
         
-        guarantees = await db.bank_guarantees.find(query).sort("created_at", -1).to_list(1000)
-        
-        # Add expiry status
-        current_date = datetime.utcnow()
+        guarantees = await db.bank_guarantees.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
         for guarantee in guarantees:
             validity_date = guarantee.get("validity_date")
-            if isinstance(validity_date, str):
-                validity_date = datetime.fromisoformat(validity_date.replace('Z', '+00:00'))
-            
-            if validity_date and validity_date < current_date and guarantee.get("status") == "active":
-                # Update status to expired
-                await db.bank_guarantees.update_one(
-                    {"id": guarantee["id"]},
-                    {"$set": {"status": "expired", "updated_at": datetime.utcnow()}}
-                )
+            if guarantee.get("status") == "active" and isinstance(validity_date, datetime) and validity_date < now:
                 guarantee["status"] = "expired"
         
         return guarantees
@@ -3425,12 +6133,18 @@ async def update_bank_guarantee(
         # Update allowed fields
         allowed_fields = ["guarantee_amount", "guarantee_percentage", "validity_date", "status", "guarantee_details"]
         update_fields = {k: v for k, v in update_data.items() if k in allowed_fields}
+        if "validity_date" in update_fields:
+            try:
+                update_fields["validity_date"] = normalize_validity_date(update_fields["validity_date"])
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="validity_date must be an ISO date")
         update_fields["updated_at"] = datetime.utcnow()
         
         await db.bank_guarantees.update_one(
             {"id": guarantee_id},
             {"$set": update_fields}
         )
+        bank_guarantee_summary_cache.clear()
         
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -3446,68 +6160,292 @@ async def update_bank_guarantee(
         logger.error(f"Error updating bank guarantee: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to update bank guarantee: {str(e)}")
 
+async def compute_bank_guarantee_summary(days: int) -> Dict[str, Any]:
+    """Status and type totals in one $facet pass, plus an indexed range read for the expiry window"""
+    now = datetime.utcnow()
+    # Active guarantees past their date count as expired, as in the list endpoint
+    effective_status = {"$cond": [
+        {"$and": [{"$eq": ["$status", "active"]}, {"$lt": ["$validity_date", now]}, {"$eq": [{"$type": "$validity_date"}, "date"]}]},
+        "expired",
+        "$status"
+    ]}
+    facets = await db.bank_guarantees.aggregate([
+        {"$project": {"_id": 0, "status": effective_status, "guarantee_type": 1, "guarantee_amount": 1}},
+        {"$facet": {
+            "by_status": [{"$group": {
+                "_id": "$status",
+                "count": {"$sum": 1},
+                "total_amount": {"$sum": "$guarantee_amount"}
+            }}],
+            "by_type": [{"$group": {
+                "_id": {"$ifNull": ["$guarantee_type", "Unknown"]},
+                "count": {"$sum": 1},
+                "total_amount": {"$sum": "$guarantee_amount"}
+            }}]
+        }}
+    ]).to_list(1)
+    facets = facets[0] if facets else {}
+    by_status = {row["_id"]: row for row in facets.get("by_status", [])}
+    
+    expiring = await db.bank_guarantees.find(
+        {"status": "active", "validity_date": {"$gt": now, "$lt": now + timedelta(days=days)}},
+        {"_id": 0, "id": 1, "project_name": 1, "guarantee_number": 1, "guarantee_amount": 1, "validity_date": 1}
+    ).sort("validity_date", 1).to_list(None)
+    
+    return {
+        "total_guarantees": sum(row["count"] for row in by_status.values()),
+        "active_guarantees": by_status.get("active", {}).get("count", 0),
+        "expired_guarantees": by_status.get("expired", {}).get("count", 0),
+        "total_guarantee_amount": by_status.get("active", {}).get("total_amount", 0),
+        "guarantees_by_type": {
+            row["_id"]: {"count": row["count"], "total_amount": row["total_amount"]}
+            for row in facets.get("by_type", [])
+        },
+        "expiring_soon": [
+            {**guarantee, "days_remaining": (guarantee["validity_date"] - now).days}
+            for guarantee in expiring
+        ],
+        "expiring_within_days": days
+    }
+
 @api_router.get("/bank-guarantees/summary")
-async def get_bank_guarantees_summary(current_user: dict = Depends(get_current_user)):
-    """Get bank guarantees summary"""
+async def get_bank_guarantees_summary(days: int = 30, current_user: dict = Depends(get_current_user)):
+    """Get bank guarantees summary; days sets the expiring-soon window (30, 60 or 90)"""
     try:
-        guarantees = await db.bank_guarantees.find().to_list(1000)
-        
-        summary = {
-            "total_guarantees": len(guarantees),
-            "active_guarantees": len([g for g in guarantees if g.get("status") == "active"]),
-            "expired_guarantees": len([g for g in guarantees if g.get("status") == "expired"]),
-            "total_guarantee_amount": sum(g.get("guarantee_amount", 0) for g in guarantees if g.get("status") == "active"),
-            "guarantees_by_type": {},
-            "expiring_soon": []
-        }
-        
-        # Group by guarantee type
-        for guarantee in guarantees:
-            gtype = guarantee.get("guarantee_type", "Unknown")
-            if gtype not in summary["guarantees_by_type"]:
-                summary["guarantees_by_type"][gtype] = {
-                    "count": 0,
-                    "total_amount": 0
-                }
-            summary["guarantees_by_type"][gtype]["count"] += 1
-            summary["guarantees_by_type"][gtype]["total_amount"] += guarantee.get("guarantee_amount", 0)
-        
-        # Find guarantees expiring in next 30 days
-        current_date = datetime.utcnow()
-        thirty_days_later = current_date + timedelta(days=30)
+        if days not in BANK_GUARANTEE_EXPIRY_HORIZONS:
+            raise HTTPException(status_code=400, detail=f"days must be one of {', '.join(map(str, BANK_GUARANTEE_EXPIRY_HORIZONS))}")
         
-        for guarantee in guarantees:
-            if guarantee.get("status") != "active":
-                continue
-                
-            validity_date = guarantee.get("validity_date")
-            if isinstance(validity_date, str):
-                validity_date = datetime.fromisoformat(validity_date.replace('Z', '+00:00'))
-            
-            if validity_date and current_date < validity_date < thirty_days_later:
-                summary["expiring_soon"].append({
-                    "id": guarantee["id"],
-                    "project_name": guarantee["project_name"],
-                    "guarantee_number": guarantee["guarantee_number"],
-                    "guarantee_amount": guarantee["guarantee_amount"],
-                    "validity_date": validity_date,
-                    "days_remaining": (validity_date - current_date).days
-                })
+        summary = bank_guarantee_summary_cache.get(days)
+        if summary is None:
+            summary = await compute_bank_guarantee_summary(days)
+            bank_guarantee_summary_cache.set(days, summary)
         
-        return summary
+        return copy.deepcopy(summary)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating bank guarantees summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate summary: {str(e)}")
 
 # PDF Text Extraction Engine for PO Processing
+# Job mode: the upload is stored as a queued pdf_extractions record and the
+# engines run in the background, at most PDF_EXTRACTION_MAX_CONCURRENT_JOBS at a
+# time. The record carries status, per-engine results and, once done, the
+# extracted data; clients poll /pdf-processor/jobs/{job_id}. Each job is stamped
+# with the owning worker, which refreshes heartbeat_at while it is alive; any
+# worker fails active jobs whose heartbeat has gone stale (owner crashed or restarted).
+PDF_EXTRACTION_MAX_CONCURRENT_JOBS = int(os.environ.get("PDF_EXTRACTION_MAX_CONCURRENT_JOBS", "2"))
+PDF_EXTRACTION_HEARTBEAT_SECONDS = float(os.environ.get("PDF_EXTRACTION_HEARTBEAT_SECONDS", "15"))
+PDF_EXTRACTION_ACTIVE_STATUSES = ["queued", "running"]
+# A job that finds the process lane saturated goes back to queued and retries with
+# exponential backoff (1s, 2s, 4s ... capped at 30s) before it is failed
+PDF_EXTRACTION_SATURATED_RETRIES = int(os.environ.get("PDF_EXTRACTION_SATURATED_RETRIES", "6"))
+PDF_EXTRACTION_RETRY_BASE_SECONDS = 1.0
+PDF_EXTRACTION_RETRY_MAX_SECONDS = 30.0
+PDF_EXTRACTION_MAX_PENDING_JOBS = int(os.environ.get("PDF_EXTRACTION_MAX_PENDING_JOBS", "20"))
+
+class PDFExtractionJobQueue:
+    """Runs PO extraction jobs in the background with a concurrency limit"""
+    
+    def __init__(self, max_concurrent: int, max_pending: int, heartbeat_interval: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_pending = max_pending
+        self.heartbeat_interval = max(1.0, heartbeat_interval)
+        self.stale_after = self.heartbeat_interval * 4
+        self.owner = self._new_owner()
+        self._heartbeat = PeriodicTask("pdf_extraction_heartbeat", self.heartbeat_interval, self.heartbeat)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.reaped = 0
+        self.retried = 0
+    
+    @staticmethod
+    def _new_owner() -> str:
+        return f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+    
+    def start(self):
+        # A fresh owner per worker process, even when the app was imported before forking
+        self.owner = self._new_owner()
+        self._heartbeat.start()
+    
+    def stamp(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {**job, "owner": self.owner, "heartbeat_at": datetime.utcnow()}
+    
+    def submit(self, record: Dict[str, Any], file_content: bytes, user: Dict[str, Any]):
+        # Queued uploads are held in memory, so the backlog is bounded
+        if len(self._tasks) >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Too many extraction jobs in progress, please retry shortly")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        task = asyncio.create_task(self._run(record, file_content, user))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.submitted += 1
+    
+    async def _update(self, job_id: str, update: Dict[str, Any]):
+        # Only while this worker still owns the job and it has not been failed as stale
+        await db.pdf_extractions.update_one(
+            {"id": job_id, "owner": self.owner, "status": {"$in": PDF_EXTRACTION_ACTIVE_STATUSES}}, update
+        )
+    
+    async def _run(self, record: Dict[str, Any], file_content: bytes, user: Dict[str, Any]):
+        job_id = record["id"]
+        for attempt in range(PDF_EXTRACTION_SATURATED_RETRIES + 1):
+            if not await self._attempt(record, file_content, user, final=attempt == PDF_EXTRACTION_SATURATED_RETRIES):
+                return
+            self.retried += 1
+            delay = min(PDF_EXTRACTION_RETRY_BASE_SECONDS * (2 ** attempt), PDF_EXTRACTION_RETRY_MAX_SECONDS)
+            logger.info(f"Extraction job {job_id} found the worker pool saturated, retrying in {delay:.0f}s")
+            # Back off without holding a job slot; partial engine results from this attempt are discarded
+            await self._update(job_id, {"$set": {
+                "status": "queued",
+                "progress.engines_done": 0,
+                "engine_results": {},
+                "retries": attempt + 1
+            }})
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.failed += 1
+                await asyncio.shield(self._update(job_id, {"$set": {
+                    "status": "failed", "error": "Extraction was interrupted", "completed_at": datetime.utcnow()
+                }}))
+                raise
+    
+    async def _attempt(self, record: Dict[str, Any], file_content: bytes, user: Dict[str, Any], final: bool) -> bool:
+        """Run one extraction attempt; returns True when it should be retried after a backoff"""
+        job_id = record["id"]
+        filename = record["original_filename"]
+        async with self._semaphore:
+            self.running += 1
+            try:
+                await self._update(job_id, {"$set": {"status": "running", "started_at": datetime.utcnow()}})
+                
+                async def on_engine_result(method: str, outcome: str, detail):
+                    engine_result = {"status": outcome, "finished_at": datetime.utcnow()}
+                    if outcome == "completed":
+                        engine_result["confidence_score"] = detail.get("confidence_score")
+                        engine_result["line_items"] = len(detail.get("line_items") or [])
+                    elif outcome == "failed":
+                        engine_result["error"] = detail
+                    await self._update(job_id, {
+                        "$set": {f"engine_results.{method}": engine_result},
+                        "$inc": {"progress.engines_done": 1}
+                    })
+                
+                parser = POPDFParser()
+                extracted_data = await parser.extract_from_file(file_content, filename, on_engine_result)
+                
+                await self._update(job_id, {"$set": {
+                    "status": "completed",
+                    "extracted_data": extracted_data.dict(),
+                    "processed_at": datetime.utcnow(),
+                    "completed_at": datetime.utcnow()
+                }})
+                self.completed += 1
+                
+                await log_activity(
+                    user["id"], user["email"], user["role"],
+                    "pdf_data_extracted", 
+                    f"Extracted data from PO file: {filename} (Method: {extracted_data.extraction_method}, Confidence: {extracted_data.confidence_score:.2f})"
+                )
+            except WorkerPoolSaturated as e:
+                if not final:
+                    return True
+                self.failed += 1
+                logger.error(f"Extraction job {job_id} for {filename} gave up on a saturated worker pool")
+                await self._update(job_id, {"$set": {
+                    "status": "failed", "error": e.detail, "completed_at": datetime.utcnow()
+                }})
+            except asyncio.CancelledError:
+                self.failed += 1
+                await asyncio.shield(self._update(job_id, {"$set": {
+                    "status": "failed", "error": "Extraction was interrupted", "completed_at": datetime.utcnow()
+                }}))
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Extraction job {job_id} for {filename} failed: {str(e)}")
+                await self._update(job_id, {"$set": {
+                    "status": "failed", "error": str(e), "completed_at": datetime.utcnow()
+                }})
+            finally:
+                self.running -= 1
+        return False
+    
+    async def heartbeat(self) -> Dict[str, int]:
+        """Refresh this worker's active jobs, then fail other workers' jobs that went quiet"""
+        now = datetime.utcnow()
+        if self._tasks:
+            await db.pdf_extractions.update_many(
+                {"owner": self.owner, "status": {"$in": PDF_EXTRACTION_ACTIVE_STATUSES}},
+                {"$set": {"heartbeat_at": now}}
+            )
+        # Their uploads were only held in the owner's memory, so they cannot be resumed
+        result = await db.pdf_extractions.update_many(
+            {
+                "status": {"$in": PDF_EXTRACTION_ACTIVE_STATUSES},
+                "owner": {"$ne": self.owner},
+                "$or": [
+                    {"heartbeat_at": {"$lt": now - timedelta(seconds=self.stale_after)}},
+                    {"heartbeat_at": {"$exists": False}}
+                ]
+            },
+            {"$set": {"status": "failed", "error": "Extraction worker stopped before finishing", "completed_at": now}}
+        )
+        if result.modified_count:
+            self.reaped += result.modified_count
+            logger.warning(f"Marked {result.modified_count} abandoned PDF extraction jobs as failed")
+        return {"reaped": result.modified_count}
+    
+    async def stop(self):
+        await self._heartbeat.stop()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "pending": len(self._tasks),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "reaped": self.reaped,
+            "owner": self.owner,
+            "heartbeat": self._heartbeat.stats()
+        }
+
+pdf_extraction_jobs = PDFExtractionJobQueue(
+    PDF_EXTRACTION_MAX_CONCURRENT_JOBS, PDF_EXTRACTION_MAX_PENDING_JOBS, PDF_EXTRACTION_HEARTBEAT_SECONDS
+)
+
 @api_router.post("/pdf-processor/extract")
 async def extract_pdf_data(
     file: UploadFile = File(...),
+    mode: str = "sync",
     current_user: dict = Depends(get_current_user)
 ):
-    """Extract data from uploaded PDF/DOCX Purchase Order"""
+    """Extract data from uploaded PDF/DOCX Purchase Order
+    
+    mode=job returns a job id straight away (202) and extracts in the background.
+    """
     try:
+        if mode not in ("sync", "job"):
+            raise HTTPException(status_code=400, detail="mode must be 'sync' or 'job'")
+        
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
@@ -3517,6 +6455,37 @@ async def extract_pdf_data(
         if len(file_content) == 0:
             raise HTTPException(status_code=400, detail="Empty file provided")
         
+        if mode == "job":
+            file_extension = Path(file.filename).suffix.lower()
+            if file_extension not in ('.pdf', '.docx'):
+                raise HTTPException(status_code=400, detail=f"Unsupported file format: {file_extension}")
+            
+            engines = POPDFParser().extraction_methods if file_extension == '.pdf' else []
+            job = {
+                "id": str(uuid.uuid4()),
+                "original_filename": file.filename,
+                "status": "queued",
+                "progress": {"engines_total": len(engines), "engines_done": 0},
+                "engine_results": {},
+                "extracted_data": None,
+                "processed_by": current_user["id"],
+                "processed_at": datetime.utcnow(),
+                "file_size": len(file_content)
+            }
+            await db.pdf_extractions.insert_one(pdf_extraction_jobs.stamp(job))
+            try:
+                pdf_extraction_jobs.submit(job, file_content, current_user)
+            except HTTPException:
+                await db.pdf_extractions.delete_one({"id": job["id"]})
+                raise
+            
+            return JSONResponse(status_code=202, content={
+                "job_id": job["id"],
+                "extraction_id": job["id"],
+                "status": "queued",
+                "status_url": f"/api/pdf-processor/jobs/{job['id']}"
+            })
+        
         # Initialize PDF parser
         parser = POPDFParser()
         
@@ -3567,6 +6536,27 @@ async def extract_pdf_data(
         logger.error(f"Error processing PDF file {file.filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
 
+@api_router.get("/pdf-processor/jobs/{job_id}")
+async def get_pdf_extraction_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Status, per-engine progress and, once completed, the result of an extraction job"""
+    try:
+        job = await db.pdf_extractions.find_one({"id": job_id}, {"_id": 0})
+        if not job:
+            raise HTTPException(status_code=404, detail="Extraction job not found")
+        
+        # Synchronous extractions have no job fields but are complete
+        job.setdefault("status", "completed")
+        return job
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching extraction job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch extraction job: {str(e)}")
+
 @api_router.get("/pdf-processor/extractions")
 async def get_pdf_extractions(
     skip: int = 0,
@@ -3628,6 +6618,9 @@ async def convert_extraction_to_project(
         if not extraction:
             raise HTTPException(status_code=404, detail="Extraction not found")
         
+        if extraction.get("status", "completed") != "completed":
+            raise HTTPException(status_code=409, detail=f"Extraction is {extraction['status']}, not completed")
+        
         extracted_data = extraction["extracted_data"]
         
         # Create BOQ items from line items
@@ -3676,6 +6669,8 @@ async def convert_extraction_to_project(
         
         # Create the project
         await db.projects.insert_one(project_data)
+        await index_search_entity("projects", project_data)
+        await apply_dashboard_delta(total_projects=1)
         
         # Update extraction record to mark as converted
         await db.pdf_extractions.update_one(
@@ -4204,7 +7199,8 @@ async def clear_database(
         collections_to_clear = [
             "projects", "invoices", "clients", "bank_guarantees", 
             "pdf_extractions", "master_items", "workflow_configs", 
-            "system_configs", "activity_logs"
+            "system_configs", "activity_logs", "search_index",
+            "boq_billing_ledger", "counters", "gst_rollups", "dashboard_counters"
         ]
         
         stats_before = {}
@@ -4237,6 +7233,12 @@ async def clear_database(
                     "error": str(e)
                 })
         
+        sequence_service.reset()
+        await pdf_cache.clear()
+        insights_cache.clear()
+        master_item_suggest_index.invalidate()
+        bank_guarantee_summary_cache.clear()
+        
         # Log this critical action
         await log_activity(
             current_user["id"], current_user["email"], current_user["role"],
@@ -4311,6 +7313,15 @@ async def get_system_health(current_user: dict = Depends(get_current_user)):
                 "uptime": "Available",  # Could be calculated from startup time
                 "environment": os.environ.get("ENVIRONMENT", "development")
             },
+            "worker_pool": worker_pool.stats(),
+            "caches": {"users": user_cache.stats(), "invoice_pdfs": pdf_cache.stats(), "insights": insights_cache.stats(),
+                       "bank_guarantee_summary": bank_guarantee_summary_cache.stats()},
+            "activity_log_writer": activity_log_writer.stats(),
+            "dashboard_reconciler": dashboard_reconciler.stats(),
+            "bank_guarantee_expiry_sweeper": bank_guarantee_expiry_sweeper.stats(),
+            "pdf_extraction_jobs": pdf_extraction_jobs.stats(),
+            "master_item_suggest_index": master_item_suggest_index.stats(),
+            "indexes": await get_index_drift(),
             "recent_activity": recent_logs,
             "timestamp": datetime.utcnow()
         }
@@ -4328,11 +7339,52 @@ app.include_router(api_router)
 
 @app.on_event("startup")
 async def startup_event():
+    activity_log_writer.start()
+    try:
+        await backfill_invoice_search_tokens()
+    except Exception as e:
+        logger.error(f"Invoice search token backfill failed: {str(e)}")
+    try:
+        await backfill_master_item_keys()
+    except Exception as e:
+        logger.error(f"Master item key backfill failed: {str(e)}")
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {str(e)}")
+    try:
+        if await db.search_index.estimated_document_count() == 0:
+            run_in_background(rebuild_search_index(), "search index rebuild")
+    except Exception as e:
+        logger.error(f"Search index bootstrap failed: {str(e)}")
+    try:
+        if await db.gst_rollups.estimated_document_count() == 0 and await db.invoices.estimated_document_count() > 0:
+            run_in_background(claim_unrolled_invoices(), "GST rollup bootstrap")
+    except Exception as e:
+        logger.error(f"GST rollup bootstrap failed: {str(e)}")
+    try:
+        await ensure_dashboard_counters()
+    except Exception as e:
+        logger.error(f"Dashboard counter bootstrap failed: {str(e)}")
+    dashboard_reconciler.start()
+    pdf_extraction_jobs.start()
+    run_in_background(pdf_extraction_jobs.heartbeat(), "PDF extraction job sweep")
+    try:
+        await normalize_bank_guarantee_dates()
+        await bank_guarantee_expiry_sweeper.run_once()
+    except Exception as e:
+        logger.error(f"Bank guarantee expiry bootstrap failed: {str(e)}")
+    bank_guarantee_expiry_sweeper.start()
     await init_super_admin()
     logger.info("Application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await dashboard_reconciler.stop()
+    await bank_guarantee_expiry_sweeper.stop()
+    await pdf_extraction_jobs.stop()
+    await activity_log_writer.stop()
+    worker_pool.shutdown()
     client.close()
     logger.info("Application shutdown")
 
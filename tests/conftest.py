@@ -0,0 +1,8 @@
+import os
+import sys
+
+# server.py connects lazily, so importing it only needs the settings to exist
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "activus_test")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
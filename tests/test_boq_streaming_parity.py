@@ -0,0 +1,97 @@
+"""The streaming and cell-based BOQ parsers must produce the same output
+
+Sheets are generated from fixed seeds. boq_parity_digests.json holds, per seed, the
+digest of what the parser returned before streaming mode existed, so both modes are
+also checked against the original behaviour.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+
+import openpyxl
+import pytest
+
+import server
+
+SEEDS = range(300)
+DIGESTS_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "boq_parity_digests.json")
+
+HEADERS = [
+    ["S.No", "Description of work", "Unit", "Qty", "Unit Rate", "Amount"],
+    ["Sl", "Item", "UOM", "Quantity", "Price", "Total"],
+    ["Particulars", "Rate", "Qty", "Amount", "x"],
+    ["Description", "Qty", "Rate", "Amount"],
+]
+
+
+def make_sheet(seed: int) -> bytes:
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = rng.choice(["BOQ", "Data", "Sheet1"])
+    for _ in range(rng.randint(0, 6)):
+        sheet.append([
+            rng.choice(["Project Name: Alpha", "Client", "Architect - Bob", "Location", "Date", None, "xx"]),
+            rng.choice([None, "Val", "12"]),
+        ])
+    header = rng.choice(HEADERS)
+    if rng.random() < 0.1:
+        header = ["nothing", "here"]
+    sheet.append(header)
+    for i in range(rng.randint(0, 40)):
+        sheet.append([
+            rng.choice([i, None, "a"]),
+            rng.choice(["Concrete work M20", "ab", None, "Steel rebar fixing", 5]),
+            rng.choice(["cum", "sqm", None, "150", 3.0, "Nos"]),
+            rng.choice([1, 2.5, None, "3", "₹1,200"]),
+            rng.choice([100, None, "Rs 50", "abc"]),
+            rng.choice([None, 500, "1,000"]),
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def parse(data: bytes, streaming: bool) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = server.ExcelParser(streaming=streaming)._parse_workbook(data, "boq.xlsx")
+    summary = result.pop("parse_summary")
+    assert summary["rows_accepted"] == result["items_count"]
+    return result
+
+
+def digest(result: dict) -> str:
+    return hashlib.sha256(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@pytest.fixture(scope="module")
+def expected_digests():
+    with open(DIGESTS_PATH) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_streaming_matches_cell_based_and_original(seed, expected_digests):
+    data = make_sheet(seed)
+    streamed = parse(data, streaming=True)
+    cell_based = parse(data, streaming=False)
+    assert streamed == cell_based
+    assert digest(streamed) == expected_digests[str(seed)]
+
+
+def test_streaming_reads_large_sheet():
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("BOQ")
+    sheet.append(["S.No", "Description", "Unit", "Qty", "Rate", "Amount"])
+    for i in range(2000):
+        sheet.append([i + 1, f"Item {i} concrete work", "cum", 2, 100, 200])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    result = parse(buffer.getvalue(), streaming=True)
+    assert result["items_count"] == 2000
+    assert result["items"][0]["description"] == "Item 0 concrete work"
+    assert result["items"][-1]["quantity"] == 2
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif field == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            if "$lt" in condition and (value is None or not value < condition["$lt"]):
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        # Mongo sorts missing/null values lowest, so they come last in a descending sort
+        for field, direction in reversed(keys):
+            self.docs.sort(
+                key=lambda d: (d.get(field) is not None, d.get(field) or 0),
+                reverse=direction == server.DESCENDING
+            )
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return self.docs[:n]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+
+def make_docs():
+    base = datetime(2025, 1, 1)
+    docs = [{"id": f"d{i:02d}", "created_at": base + timedelta(hours=i // 3), "kind": i % 2} for i in range(25)]
+    docs += [{"id": f"n{i}", "created_at": None, "kind": i % 2} for i in range(4)]
+    return docs
+
+
+def test_page_cursor_round_trip():
+    created_at = datetime(2025, 3, 4, 5, 6, 7, 8000)
+    cursor = server.encode_page_cursor({"created_at": created_at, "id": "abc"})
+    assert server.decode_page_cursor(cursor) == (created_at, "abc")
+    assert "=" not in cursor
+
+
+def test_page_cursor_without_created_at():
+    cursor = server.encode_page_cursor({"id": "abc"})
+    assert server.decode_page_cursor(cursor) == (None, "abc")
+    assert server.keyset_after(cursor) == {"created_at": None, "id": {"$lt": "abc"}}
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", server._encode_cursor({"x": 1})])
+def test_invalid_page_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        server.decode_page_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_offset_cursor():
+    assert server.decode_offset_cursor(None) == 0
+    assert server.decode_offset_cursor(server._encode_cursor({"o": 40})) == 40
+    for bad in (server._encode_cursor({"o": -1}), "garbage"):
+        with pytest.raises(HTTPException):
+            server.decode_offset_cursor(bad)
+
+
+def test_keyset_after_is_empty_without_cursor():
+    assert server.keyset_after(None) == {}
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 29, 50])
+@pytest.mark.parametrize("query", [{}, {"kind": 1}])
+def test_pages_cover_every_document_once(limit, query):
+    docs = make_docs()
+    collection = FakeCollection(docs)
+
+    async def walk():
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = await server.fetch_keyset_page(collection, query, limit, cursor)
+            assert len(page) <= limit
+            seen += [d["id"] for d in page]
+            pages += 1
+            if cursor is None:
+                return seen, pages
+
+    seen, pages = asyncio.run(walk())
+    expected = FakeCursor([d for d in docs if matches(d, query)]).sort(server.KEYSET_SORT).docs
+    assert seen == [d["id"] for d in expected]
+    assert pages == max(1, -(-len(expected) // limit))
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import server
+
+
+class FakeCounters:
+    """Just enough of a Motor collection for SequenceService: $inc, $set and $max with upsert"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await asyncio.sleep(0)
+        doc = self._apply(query["_id"], update, upsert)
+        return dict(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        self._apply(query["_id"], update, upsert)
+
+    def _apply(self, key, update, upsert):
+        if key not in self.docs:
+            assert upsert
+            self.docs[key] = {"_id": key}
+        doc = self.docs[key]
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field, value in update.get("$max", {}).items():
+            doc[field] = max(doc.get(field, value), value)
+        doc.update(update.get("$set", {}))
+        return doc
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    collection = FakeCounters()
+    monkeypatch.setattr(server, "db", FakeDB(counters=collection))
+    return collection
+
+
+def test_values_are_sequential(counters):
+    service = server.SequenceService()
+
+    async def run():
+        return [await service.next("invoice_number:2025") for _ in range(5)]
+
+    assert asyncio.run(run()) == [1, 2, 3, 4, 5]
+    assert counters.docs["invoice_number:2025"]["value"] == 5
+
+
+def test_concurrent_callers_never_share_a_number(counters):
+    services = [server.SequenceService() for _ in range(3)]
+
+    async def run():
+        calls = [services[i % 3].next("invoice_number:2025") for i in range(60)]
+        return await asyncio.gather(*calls)
+
+    assert sorted(asyncio.run(run())) == list(range(1, 61))
+
+
+def test_seed_continues_from_existing_data_once(counters):
+    service = server.SequenceService()
+    seeded = []
+
+    async def seed():
+        seeded.append(True)
+        return 41
+
+    async def run():
+        return [await service.next("ra_number:p1:2025", seed=seed) for _ in range(3)]
+
+    assert asyncio.run(run()) == [42, 43, 44]
+    assert len(seeded) == 1
+
+
+def test_seed_never_moves_the_counter_back(counters):
+    counters.docs["k"] = {"_id": "k", "value": 10}
+
+    async def seed():
+        return 3
+
+    assert asyncio.run(server.SequenceService().next("k", seed=seed)) == 11
+
+
+def test_blocks_are_reserved_per_worker(counters):
+    first, second = server.SequenceService(), server.SequenceService()
+
+    async def run():
+        a = [await first.next("k", block_size=5) for _ in range(3)]
+        b = [await second.next("k", block_size=5) for _ in range(3)]
+        a += [await first.next("k", block_size=5) for _ in range(3)]
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a == [1, 2, 3, 4, 5, 11]
+    assert b == [6, 7, 8]
+    assert counters.docs["k"]["value"] == 15
+
+
+def test_reset_reseeds_after_counters_are_cleared(counters):
+    service = server.SequenceService()
+
+    async def seed():
+        return 7
+
+    async def run():
+        await service.next("k", seed=seed)
+        counters.docs.clear()
+        service.reset()
+        return await service.next("k", seed=seed)
+
+    assert asyncio.run(run()) == 8
+
+
+def test_ra_numbers_are_per_project_and_year(counters, monkeypatch):
+    monkeypatch.setattr(server, "sequence_service", server.SequenceService())
+    seeds = []
+
+    async def max_ra(project_id, year):
+        seeds.append((project_id, year))
+        return 2 if project_id == "p1" else 0
+
+    monkeypatch.setattr(server, "_max_project_ra_number", max_ra)
+
+    async def run():
+        return [
+            await server.next_ra_number("p1"),
+            await server.next_ra_number("p2"),
+            await server.next_ra_number("p1"),
+            await server.peek_ra_number("p1"),
+        ]
+
+    year = datetime.now().year
+    assert asyncio.run(run()) == ["RA3", "RA1", "RA4", "RA5"]
+    assert seeds == [("p1", year), ("p2", year)]
+    assert set(counters.docs) == {f"ra_number:p1:{year}", f"ra_number:p2:{year}"}